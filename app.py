@@ -16,9 +16,14 @@ from pathlib import Path
 from core.config import Config
 from core.i18n import I18n
 from core.cookies import CookieManager
+from core.downloader import Downloader
+from core.watch import WatchFolder, default_inbox
+from core.uiwatch import ui_watchdog
 from pages.menu import MenuPage
 from pages.loader_youtube import YouTubePage
 from pages.loader_tiktok import TikTokPage
+from pages.jobs import JobsPage
+from pages.history import HistoryPage
 from I18N import tr, set_language
 
 
@@ -33,6 +38,8 @@ class VideoDownloaderApp:
         self.config = Config()
         self.i18n = I18n(self.config.get('language', 'ru'))
         self.cookie_manager = CookieManager(self.i18n)
+        # Единый загрузчик: общие очередь, лимиты и состояние для всех страниц
+        self.downloader = Downloader(self.config, self.i18n)
         
         # Текущая страница
         self.current_page = None
@@ -44,6 +51,10 @@ class VideoDownloaderApp:
         # Загрузка страниц
         self.load_pages()
         
+        # Папка входящих файлов со ссылками
+        self.watcher = None
+        self.start_watch_folder()
+        
         # Показать главное меню
         self.show_page('menu')
     
@@ -102,8 +113,34 @@ class VideoDownloaderApp:
         self.pages = {
             'menu': MenuPage(self),
             'youtube': YouTubePage(self),
-            'tiktok': TikTokPage(self)
+            'tiktok': TikTokPage(self),
+            'jobs': JobsPage(self),
+            'history': HistoryPage(self)
         }
+        
+        # Индекс папки загрузки строится в фоне, пока пользователь выбирает видео
+        self.downloader.start_dir_index()
+        # Продолжить фоновые задачи, прерванные закрытием приложения
+        self.downloader.restore_jobs()
+    
+    def start_watch_folder(self):
+        """Запустить наблюдение за папкой входящих, если оно включено"""
+        if not self.config.get('watch_enabled', False):
+            return
+        try:
+            self.watcher = WatchFolder(default_inbox(self.config), self.submit_from_watch,
+                                       poll_interval=self.config.get('watch_poll_seconds', 5))
+            self.watcher.start()
+        except OSError as e:
+            self.watcher = None
+            print(f"Не удалось запустить наблюдение за папкой: {e}")
+    
+    def submit_from_watch(self, url, service, playlist):
+        """Поставить в очередь ссылку из папки входящих"""
+        priority = 'bulk' if playlist else self.config.get('watch_priority', 'normal')
+        cookies_file = self.cookie_manager.get_cookies_file() if self.cookie_manager else None
+        return self.downloader.download(url, service, playlist=playlist,
+                                        cookies_file=cookies_file, priority=priority)
     
     def show_page(self, page_name):
         """Показать указанную страницу"""
@@ -134,6 +171,7 @@ class VideoDownloaderApp:
         if new_dir:
             self.config.set('download_dir', new_dir)
             self.download_path_var.set(new_dir)
+            self.downloader.start_dir_index()
     
     def open_download_dir(self):
         """Открыть папку загрузки"""
@@ -167,6 +205,9 @@ class VideoDownloaderApp:
     
     def run(self):
         """Запуск приложения"""
+        # Контроль задержек цикла событий: такт по root.after и учёт опозданий
+        ui_watchdog.stall_ms = self.config.get('ui_stall_ms', 200)
+        ui_watchdog.start(self.root, self.config.get('ui_heartbeat_ms', 100))
         self.root.mainloop()
 
 
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Замеры Downloader на локальном сервере синтетических медиафайлов.
+
+Задачи проходят весь путь приложения: очередь планировщика, профиль сервиса,
+yt-dlp (generic-экстрактор для локальных ссылок), хуки прогресса и отмену.
+Замеряются скорость, время до первого байта, CPU на МБ, задержка отмены и
+масштабирование по числу рабочих потоков и параллельных фрагментов.
+
+    python benchmarks/bench_downloader.py --quick
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.media_server import MediaServerProcess, MB
+from core import downloader as downloader_module
+from core.downloader import Downloader
+from core.i18n import I18n
+from core.jobs import COMPLETED
+
+
+# Сервис, профиль которого настраивается в каждом замере
+SERVICE = 'youtube'
+TIMEOUT = 300
+
+
+class BenchConfig:
+    """Конфигурация в памяти: замеры не трогают ~/.vd_settings.json"""
+
+    def __init__(self, **data):
+        self.data = dict(data)
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+def make_downloader(directory, max_workers=3, **profile):
+    """Загрузчик с профилем сервиса для замера (файлы — в отдельной папке)"""
+    profile.setdefault('retry_max_attempts', 1)
+    config = BenchConfig(download_dir=tempfile.mkdtemp(dir=directory),
+                         outtmpl='%(id)s.%(ext)s', max_workers=max_workers,
+                         disk_preflight=False, preallocate=False,
+                         service_profiles={SERVICE: profile})
+    return Downloader(config, I18n())
+
+
+def wait_job(job, on_poll=None, timeout=TIMEOUT):
+    """Дождаться завершения задачи, опрашивая её состояние"""
+    deadline = time.monotonic() + timeout
+    while not job.is_finished:
+        if time.monotonic() > deadline:
+            raise Exception(f"Задача {job.id} не завершилась за {timeout} с")
+        if on_poll:
+            on_poll()
+        time.sleep(0.005)
+
+
+def measure_job(downloader, url):
+    """Одна задача: скорость, время до первого байта, CPU на МБ"""
+    first_byte = []
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    job = downloader.download(url, SERVICE)
+
+    def on_poll():
+        if not first_byte and job.downloaded_bytes:
+            first_byte.append(time.perf_counter() - started)
+
+    wait_job(job, on_poll)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    if job.state != COMPLETED:
+        return {'error': job.error or job.state}
+    size = job.downloaded_bytes or job.total_bytes or 0
+    return {
+        'seconds': round(elapsed, 3),
+        'mb_per_s': round(size / elapsed / MB, 2),
+        'ttfb_ms': round(first_byte[0] * 1000, 1) if first_byte else None,
+        'cpu_s_per_mb': round(cpu / (size / MB), 4) if size else None,
+    }
+
+
+def measure_cancel(downloader, url, after=1.0):
+    """Задержка отмены: от cancel_download до завершения задачи"""
+    job = downloader.download(url, SERVICE)
+    deadline = time.monotonic() + TIMEOUT
+    while not job.downloaded_bytes and not job.is_finished:
+        if time.monotonic() > deadline:
+            raise Exception("Загрузка не началась")
+        time.sleep(0.005)
+    time.sleep(after)
+    started = time.perf_counter()
+    downloader.cancel_download(job)
+    wait_job(job)
+    return {'cancel_latency_ms': round((time.perf_counter() - started) * 1000, 1),
+            'state': job.state}
+
+
+def measure_workers(directory, base_url, workers, jobs):
+    """Масштабирование: jobs одновременных задач при max_workers = workers"""
+    downloader = make_downloader(directory, max_workers=workers, max_jobs=workers)
+    started = time.perf_counter()
+    queued = [downloader.download(f"{base_url}/video-{number}.mp4", SERVICE)
+              for number in range(jobs)]
+    for job in queued:
+        wait_job(job)
+    elapsed = time.perf_counter() - started
+    failed = [job for job in queued if job.state != COMPLETED]
+    if failed:
+        return {'error': failed[0].error or failed[0].state}
+    size = sum(job.downloaded_bytes for job in queued)
+    return {'seconds': round(elapsed, 3), 'mb_per_s': round(size / elapsed / MB, 2)}
+
+
+def run(quick=False):
+    """Все замеры загрузчика: {имя: замер}"""
+    if not downloader_module.YT_DLP_AVAILABLE:
+        return {'skipped': "yt-dlp не установлен"}
+
+    size_mb = 8 if quick else 32
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # Без ограничений сервера: накладные расходы самого загрузчика
+        with MediaServerProcess(size_mb=size_mb, fragments=32) as server:
+            for segments in (1, 4):
+                downloader = make_downloader(directory, segments=segments)
+                results[f'progressive_segments_{segments}'] = measure_job(
+                    downloader, server.progressive_url)
+            for frags in (1, 4):
+                downloader = make_downloader(directory, concurrent_frags=frags)
+                results[f'hls_frags_{frags}'] = measure_job(downloader, server.hls_url)
+                results[f'dash_frags_{frags}'] = measure_job(downloader, server.dash_url)
+
+        # Ограничение на соединение и задержка ответа, как у CDN
+        with MediaServerProcess(size_mb=size_mb // 2, fragments=16, per_connection_kbps=4096,
+                                latency_ms=50) as server:
+            for frags in (1, 4):
+                downloader = make_downloader(directory, concurrent_frags=frags)
+                results[f'hls_throttled_frags_{frags}'] = measure_job(downloader, server.hls_url)
+            for segments in (1, 4):
+                downloader = make_downloader(directory, segments=segments)
+                results[f'progressive_throttled_segments_{segments}'] = measure_job(
+                    downloader, server.progressive_url)
+            for workers in (1, 2, 4):
+                results[f'workers_{workers}'] = measure_workers(
+                    directory, server.base_url, workers, jobs=4)
+            results['cancel'] = measure_cancel(make_downloader(directory, segments=1),
+                                               server.progressive_url)
+    return {'size_mb': size_mb, 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры загрузчика")
+    parser.add_argument('--quick', action='store_true', help="Меньшие файлы")
+    args = parser.parse_args(argv)
+    print(json.dumps(run(quick=args.quick), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Замер загрузки одним и несколькими соединениями на локальном сервере с Range.
+
+Сервер ограничивает скорость каждого соединения, как CDN видеосервисов:
+выигрыш от нескольких соединений виден без выхода в сеть.
+
+    python benchmarks/bench_segmented.py --size-mb 32 --per-connection-kbps 4096
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.media_server import MediaServerProcess, MB
+from core.connections import HttpPool
+from core.segmented import SegmentedDownload
+
+
+def measure(url, segments, directory):
+    """Скачать файл и вернуть замер"""
+    path = os.path.join(directory, f'bench-{segments}.part')
+    download = SegmentedDownload(url, path, segments=segments, piece_size=4 * MB,
+                                 pool=HttpPool())
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    size = download.run()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    os.remove(path)
+    return {
+        'segments': segments,
+        'seconds': round(elapsed, 3),
+        'mb_per_s': round(size / elapsed / MB, 2),
+        'cpu_s_per_mb': round(cpu / (size / MB), 4),
+        'connections': download.pool.created,
+    }
+
+
+def run(quick=False, size_mb=None, per_connection_kbps=4096, segments=(1, 2, 4, 8)):
+    """Замер для общего набора: {'segments_<N>': замер}"""
+    size_mb = size_mb or (8 if quick else 32)
+    results = {}
+    with MediaServerProcess(size_mb=size_mb, per_connection_kbps=per_connection_kbps) as server:
+        with tempfile.TemporaryDirectory() as directory:
+            for count in segments:
+                results[f'segments_{count}'] = measure(server.progressive_url, count, directory)
+    return {'size_mb': size_mb, 'per_connection_kbps': per_connection_kbps, 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер многопоточной загрузки")
+    parser.add_argument('--size-mb', type=int, default=32)
+    parser.add_argument('--per-connection-kbps', type=int, default=4096,
+                        help="Лимит скорости одного соединения на сервере")
+    parser.add_argument('--segments', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args(argv)
+
+    data = run(size_mb=args.size_mb, per_connection_kbps=args.per_connection_kbps,
+               segments=args.segments)
+    for result in data['results'].values():
+        print(f"{result['segments']:>2} соединений: {result['seconds']:6.2f} с, "
+              f"{result['mb_per_s']:7.2f} МБ/с")
+    print(json.dumps(data, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
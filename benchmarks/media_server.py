@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Локальный сервер синтетических медиафайлов для замеров.
+
+Отдаёт цельный файл с поддержкой Range (/video.mp4), HLS (/hls/index.m3u8)
+и DASH (/dash/manifest.mpd). Ссылки распознаёт обычный (generic) экстрактор
+yt-dlp, поэтому замеры не выходят в сеть. Можно ограничить скорость каждого
+соединения и добавить задержку перед ответом, как у CDN.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+MB = 1024 * 1024
+
+
+class _MediaUrls:
+    """Ссылки на ресурсы сервера относительно base_url"""
+
+    @property
+    def progressive_url(self):
+        return f"{self.base_url}/video.mp4"
+
+    @property
+    def hls_url(self):
+        return f"{self.base_url}/hls/index.m3u8"
+
+    @property
+    def dash_url(self):
+        return f"{self.base_url}/dash/manifest.mpd"
+
+
+class MediaServer(_MediaUrls):
+    def __init__(self, size_mb=16, fragments=16, per_connection_kbps=0, latency_ms=0,
+                 host='127.0.0.1', port=0):
+        self.size = size_mb * MB
+        self.fragments = fragments
+        self.fragment_size = max(1, self.size // fragments)
+        self.per_connection_bps = per_connection_kbps * 1024
+        self.latency = latency_ms / 1000
+        # Данные одинаковы для всех ресурсов: фрагменты — срезы того же буфера
+        self.body = os.urandom(self.size)
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_HEAD(self):
+                self.respond(head=True)
+
+            def do_GET(self):
+                self.respond(head=False)
+
+            def respond(self, head):
+                if server.latency:
+                    time.sleep(server.latency)
+                resource = server.resource(self.path.split('?', 1)[0])
+                if resource is None:
+                    self.send_error(404)
+                    return
+                body, content_type = resource
+                status = 200
+                spec = self.headers.get('Range')
+                if spec and spec.startswith('bytes='):
+                    start, _, end = spec[len('bytes='):].partition('-')
+                    start = int(start)
+                    end = min(int(end) if end else len(body) - 1, len(body) - 1)
+                    status = 206
+                    content_range = f'bytes {start}-{end}/{len(body)}'
+                    body = body[start:end + 1]
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Accept-Ranges', 'bytes')
+                if status == 206:
+                    self.send_header('Content-Range', content_range)
+                self.end_headers()
+                if not head:
+                    self.send_body(body)
+
+            def send_body(self, body):
+                chunk = 64 * 1024
+                started = time.monotonic()
+                for sent in range(0, len(body), chunk):
+                    self.wfile.write(body[sent:sent + chunk])
+                    if server.per_connection_bps:
+                        delay = (sent + chunk) / server.per_connection_bps - (
+                            time.monotonic() - started)
+                        if delay > 0:
+                            time.sleep(delay)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def fragment(self, index):
+        start = index * self.fragment_size
+        end = self.size if index == self.fragments - 1 else start + self.fragment_size
+        return self.body[start:end]
+
+    def resource(self, path):
+        """Тело и тип ресурса по пути запроса"""
+        # /video.mp4 и /video-<имя>.mp4 — один и тот же файл под разными именами
+        if path.startswith('/video') and path.endswith('.mp4'):
+            return self.body, 'video/mp4'
+        if path == '/hls/index.m3u8':
+            return self.hls_playlist().encode('utf-8'), 'application/vnd.apple.mpegurl'
+        if path == '/dash/manifest.mpd':
+            return self.dash_manifest().encode('utf-8'), 'application/dash+xml'
+        if path == '/dash/init.mp4':
+            return b'\0' * 1024, 'video/mp4'
+        for prefix, extension, content_type in (('/hls/seg', '.ts', 'video/mp2t'),
+                                                ('/dash/seg', '.m4s', 'video/iso.segment')):
+            if path.startswith(prefix) and path.endswith(extension):
+                index = path[len(prefix):-len(extension)]
+                if index.isdigit() and int(index) < self.fragments:
+                    return self.fragment(int(index)), content_type
+        return None
+
+    def hls_playlist(self):
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:4',
+                 '#EXT-X-MEDIA-SEQUENCE:0', '#EXT-X-PLAYLIST-TYPE:VOD']
+        for index in range(self.fragments):
+            lines += ['#EXTINF:4.0,', f'seg{index}.ts']
+        lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines) + '\n'
+
+    def dash_manifest(self):
+        segments = '\n'.join(f'          <SegmentURL media="seg{index}.m4s"/>'
+                             for index in range(self.fragments))
+        duration = self.fragments * 4
+        return f'''<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" minBufferTime="PT2S"
+     mediaPresentationDuration="PT{duration}S" profiles="urn:mpeg:dash:profile:isoff-main:2011">
+  <Period>
+    <AdaptationSet mimeType="video/mp4" codecs="avc1.4d401e,mp4a.40.2">
+      <Representation id="av" bandwidth="1000000" width="640" height="360">
+        <SegmentList timescale="1" duration="4">
+          <Initialization sourceURL="init.mp4"/>
+{segments}
+        </SegmentList>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+'''
+
+    def start(self):
+        """Запустить сервер в фоновом потоке"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _serve(pipe, kwargs):
+    server = MediaServer(**kwargs)
+    pipe.send(server.base_url)
+    server.httpd.serve_forever()
+
+
+class MediaServerProcess(_MediaUrls):
+    """Сервер в отдельном процессе: его работа не попадает в замер CPU загрузчика"""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.process = None
+        self.base_url = None
+
+    def __enter__(self):
+        parent, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve, args=(child, self.kwargs),
+                                               daemon=True)
+        self.process.start()
+        if not parent.poll(30):
+            self.process.terminate()
+            raise Exception("Сервер замеров не запустился")
+        self.base_url = parent.recv()
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.join(5)
+        return False
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Запуск всех замеров и сохранение результатов по коммитам.
+
+Результаты пишутся в benchmarks/results/<коммит>.json; --compare сравнивает
+с результатами другого коммита (или файла).
+
+    python benchmarks/run.py --quick
+    python benchmarks/run.py --compare 1a2b3c4
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import bench_downloader, bench_segmented
+
+
+BENCHMARKS = {
+    'segmented': bench_segmented.run,
+    'downloader': bench_downloader.run,
+}
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def git(*args):
+    """Вывод команды git (пусто, если git недоступен)"""
+    try:
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def current_commit():
+    """Короткий хэш HEAD; '-dirty', если есть незакоммиченные изменения"""
+    commit = git('rev-parse', '--short=12', 'HEAD') or 'unknown'
+    if git('status', '--porcelain', '--untracked-files=no'):
+        commit += '-dirty'
+    return commit
+
+
+def flatten(data, prefix=''):
+    """Числовые значения вложенного словаря: {'a.b.c': число}"""
+    values = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def find_results(ref):
+    """Файл результатов по пути или префиксу коммита"""
+    if os.path.isfile(ref):
+        return ref
+    if os.path.isdir(RESULTS_DIR):
+        for name in sorted(os.listdir(RESULTS_DIR)):
+            if name.startswith(ref) and name.endswith('.json'):
+                return os.path.join(RESULTS_DIR, name)
+    raise Exception(f"Нет сохранённых результатов для {ref}")
+
+
+def compare(old, new):
+    """Строки сравнения общих показателей двух прогонов"""
+    old_values = flatten(old['benchmarks'])
+    new_values = flatten(new['benchmarks'])
+    lines = [f"{old['commit']} -> {new['commit']}"]
+    for name in sorted(set(old_values) & set(new_values)):
+        before, after = old_values[name], new_values[name]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else ''
+        lines.append(f"  {name}: {before} -> {after} {change}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    parser.add_argument('--quick', action='store_true', help="Меньшие файлы, быстрее")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Только эти замеры")
+    parser.add_argument('--compare', metavar='REF',
+                        help="Сравнить с результатами коммита или файла")
+    parser.add_argument('--no-save', action='store_true', help="Не сохранять результаты")
+    args = parser.parse_args(argv)
+
+    report = {
+        'commit': current_commit(),
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': args.quick,
+        'benchmarks': {},
+    }
+    for name in args.only or BENCHMARKS:
+        print(f"Замер {name}...")
+        started = time.perf_counter()
+        report['benchmarks'][name] = BENCHMARKS[name](quick=args.quick)
+        print(f"  {time.perf_counter() - started:.1f} с")
+
+    print(json.dumps(report['benchmarks'], ensure_ascii=False, indent=2))
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены: {path}")
+
+    if args.compare:
+        with open(find_results(args.compare), 'r', encoding='utf-8') as f:
+            print('\n'.join(compare(json.load(f), report)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
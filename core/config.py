@@ -8,6 +8,8 @@ import json
 import os
 from pathlib import Path
 
+from core.uiwatch import ui_watchdog
+
 
 class Config:
     def __init__(self):
@@ -26,7 +28,38 @@ class Config:
             'cookies_profile': 'Default',
             'cookies_txt': '',
             'last_tab': 'menu',
-            'language': 'ru'
+            'language': 'ru',
+            'disk_preflight': True,
+            'disk_full_policy': 'wait',
+            'disk_reserve_margin_mb': 100,
+            'preallocate': True,
+            'staging_dir': '',
+            'service_profiles': {},
+            'circuit_failure_threshold': 3,
+            'circuit_reset_seconds': 120,
+            'max_workers': 3,
+            'bulk_throttle_kbps': 64,
+            'bandwidth_windows': [],
+            'bulk_only_in_windows': True,
+            'sync_stop_after_known': 10,
+            'watch_enabled': False,
+            'watch_dir': '',
+            'watch_poll_seconds': 5,
+            'watch_priority': 'normal',
+            'ui_heartbeat_ms': 100,
+            'ui_stall_ms': 200,
+            'dns_cache_ttl': 300,
+            'profile_jobs': '',
+            'playlist_streaming': True,
+            'progress_half_life_s': 20,
+            'throughput_interval_s': 1.0,
+            'dir_index': True,
+            'verify_downloads': False,
+            'verify_workers': 2,
+            'verify_decode_seconds': 3,
+            'verify_redownloads': 1,
+            'hash_downloads': True,
+            'hash_fallback_read': False
         }
         
         if self.config_path.exists():
@@ -43,6 +76,7 @@ class Config:
         else:
             return defaults
     
+    @ui_watchdog.track('config_save')
     def save(self):
         """Сохранение конфигурации в файл"""
         try:
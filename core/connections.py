@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль общих HTTP-соединений: пул keep-alive по хостам и кэш DNS
+"""
+
+import http.client
+import socket
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from core.metrics import metrics
+
+
+def request_target(url):
+    """Путь и строка запроса для http.client"""
+    parts = urlsplit(url)
+    return (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+
+def host_key(url):
+    """Ключ пула для ссылки: (схема, хост, порт)"""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return parts.scheme, parts.hostname, port
+
+
+class HttpPool:
+    def __init__(self, max_idle_per_host=8, idle_timeout=30.0, timeout=30.0,
+                 clock=time.monotonic):
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.clock = clock
+        self.created = 0
+        self.reused = 0
+        self.expired = 0
+        # Свободные соединения: {(схема, хост, порт): [(соединение, время возврата)]}
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._ssl_context = None
+
+    def get(self, url, timeout=None):
+        """Взять свободное соединение к хосту ссылки или открыть новое"""
+        key = host_key(url)
+        stale = []
+        conn = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            now = self.clock()
+            while idle:
+                candidate, returned = idle.pop()
+                if now - returned <= self.idle_timeout:
+                    conn = candidate
+                    break
+                # Сервер, скорее всего, уже закрыл простаивающее соединение
+                stale.append(candidate)
+            self.expired += len(stale)
+            if conn is not None:
+                self.reused += 1
+            else:
+                self.created += 1
+        for candidate in stale:
+            candidate.close()
+
+        if conn is not None:
+            conn.pool_reused = True
+            conn.timeout = timeout or self.timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+            return conn
+        scheme, host, port = key
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout or self.timeout,
+                                               context=self._context())
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout or self.timeout)
+        conn.pool_reused = False
+        return conn
+
+    def request(self, url, headers=None, method='GET', timeout=None):
+        """Отправить запрос через пул и вернуть (соединение, ответ).
+
+        Если сервер успел закрыть простаивавшее соединение, запрос один раз
+        повторяется на новом.
+        """
+        while True:
+            conn = self.get(url, timeout)
+            try:
+                conn.request(method, request_target(url), headers=headers or {})
+                return conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if not conn.pool_reused:
+                    raise
+            except BaseException:
+                conn.close()
+                raise
+
+    def put(self, url, conn):
+        """Вернуть соединение после полностью прочитанного ответа"""
+        if conn.sock is None:
+            return
+        key = host_key(url)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append((conn, self.clock()))
+                return
+        conn.close()
+
+    def close(self):
+        """Закрыть все свободные соединения"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn, _ in connections:
+                conn.close()
+
+    def _context(self):
+        # Один SSL-контекст на пул: сертификаты загружаются один раз
+        with self._lock:
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            return self._ssl_context
+
+    def to_dict(self):
+        """Счётчики пула"""
+        with self._lock:
+            idle = sum(len(connections) for connections in self._idle.values())
+            created, reused, expired = self.created, self.reused, self.expired
+        total = created + reused
+        return {
+            'connections_created': created,
+            'connections_reused': reused,
+            'connections_expired': expired,
+            'reuse_rate': round(reused / total, 3) if total else None,
+            'idle': idle,
+            'hosts': len(self._idle),
+        }
+
+
+class DnsCache:
+    """Кэш socket.getaddrinfo с временем жизни записей (действует на весь процесс).
+
+    Истёкшие записи удаляются, а при переполнении вытесняются давно не
+    использованные: за долгую работу с множеством хостов CDN кэш не растёт.
+    """
+
+    def __init__(self, ttl=300.0, clock=time.monotonic, max_entries=1024):
+        self.ttl = ttl
+        self.clock = clock
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._original = None
+
+    @property
+    def installed(self):
+        return self._original is not None
+
+    def install(self, ttl=None):
+        """Подменить socket.getaddrinfo кэширующей версией"""
+        if ttl is not None:
+            self.ttl = ttl
+        if self._original is None:
+            self._original = socket.getaddrinfo
+            socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self):
+        """Вернуть исходный socket.getaddrinfo"""
+        if self._original is not None:
+            socket.getaddrinfo = self._original
+            self._original = None
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        resolve = self._original or socket.getaddrinfo
+        key = (host, port, family, type, proto, flags)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return list(entry[1])
+                del self._entries[key]
+                self.evicted += 1
+            self.misses += 1
+        # Ошибки разрешения имён не кэшируются
+        result = resolve(host, port, family, type, proto, flags)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, result)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._evict_locked(now)
+        return list(result)
+
+    def _evict_locked(self, now):
+        """Удалить истёкшие записи, затем давно не использованные сверх max_entries"""
+        for key in [key for key, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[key]
+            self.evicted += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def to_dict(self):
+        """Счётчики кэша"""
+        with self._lock:
+            hits, misses, entries = self.hits, self.misses, len(self._entries)
+            evicted = self.evicted
+        total = hits + misses
+        return {
+            'enabled': self.installed,
+            'ttl': self.ttl,
+            'entries': entries,
+            'evicted': evicted,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 3) if total else None,
+        }
+
+
+# Общие пул соединений и кэш DNS приложения
+http_pool = HttpPool()
+dns_cache = DnsCache()
+metrics.register_section('http', lambda: dict(http_pool.to_dict(), dns=dns_cache.to_dict()))
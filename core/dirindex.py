@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль индекса папки загрузки (быстрая проверка уже скачанных файлов)
+"""
+
+import os
+import re
+import threading
+import time
+
+from core.metrics import metrics
+from core.sections import outtmpl_with_section
+
+
+# Незавершённые и служебные файлы yt-dlp, промежуточной папки и отложенные после проверки
+PARTIAL_SUFFIXES = ('.part', '.ytdl', '.temp', '.tmp', '.vdtmp', '.corrupt')
+_FRAGMENT = re.compile(r'\.part-Frag\d+|\.f\d+\.\w+$')
+# Поле шаблона yt-dlp: %(name)s, %(name>03d)s, %(title).95s, %(a,b|default)s
+_FIELD = re.compile(r'%\((?P<name>[^)]*)\)[-#0+ ]*\d*(?:\.\d+)?[diouxXeEfFgGcrsaBlqDSUj]')
+
+
+def is_partial(name):
+    """Файл ещё не готов (часть загрузки или фрагмент формата до слияния)"""
+    return name.endswith(PARTIAL_SUFFIXES) or _FRAGMENT.search(name) is not None
+
+
+def template_regex(outtmpl):
+    """Регулярное выражение относительного пути по шаблону имени yt-dlp.
+
+    Поле %(id)s становится группой id, границы фрагмента — числами,
+    остальные поля — любым текстом без '/'.
+    Если id в шаблоне нет, возвращает None: по имени файла его не узнать.
+    """
+    outtmpl = outtmpl.replace('\\', '/')
+    if not any(match.group('name') == 'id' for match in _FIELD.finditer(outtmpl)):
+        return None
+    parts = []
+    seen_id = False
+    position = 0
+    for match in _FIELD.finditer(outtmpl):
+        parts.append(re.escape(outtmpl[position:match.start()]))
+        if match.group('name') == 'id':
+            parts.append('(?P=id)' if seen_id else r'(?P<id>[\w-]+)')
+            seen_id = True
+        elif match.group('name') in ('section_start', 'section_end'):
+            parts.append(r'\d+')
+        else:
+            parts.append('[^/]*?')
+        position = match.end()
+    parts.append(re.escape(outtmpl[position:]))
+    return re.compile(''.join(parts))
+
+
+class DirectoryIndex:
+    """Файлы папки загрузки в памяти: путь -> (размер, mtime), id -> путь.
+
+    Папка просматривается один раз (os.scandir, в фоне), дальше
+    индекс пополняется готовыми файлами задач. Проверка «уже скачано» — поиск
+    в словаре без сети и без обращения к диску, кроме одной проверки найденного файла.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.outtmpl = None
+        self._pattern = None
+        self._section_patterns = []
+        self._files = {}
+        self._ids = {}
+        self._lock = threading.Lock()
+        self.ready = threading.Event()
+        self.scan_seconds = None
+        # Номер просмотра: результат устаревшего просмотра отбрасывается
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._files)
+
+    def configure(self, root, outtmpl, background=True):
+        """Индексировать root (повторный вызов с теми же параметрами ничего не делает)"""
+        root = os.path.abspath(root) if root else None
+        with self._lock:
+            if root == self.root and outtmpl == self.outtmpl:
+                return
+            self.root = root
+            self.outtmpl = outtmpl
+            self._pattern = template_regex(outtmpl) if outtmpl else None
+            # Фрагменты видео (имя с границами, см. core.sections) — не видео целиком
+            self._section_patterns = [template_regex(outtmpl_with_section(outtmpl, section))
+                                      for section in ([0, 1], [0, None])] if outtmpl else []
+            self._files = {}
+            self._ids = {}
+            self._generation += 1
+            generation = self._generation
+            self.ready.clear()
+        if not root:
+            return
+        if background:
+            threading.Thread(target=self._scan, args=(root, generation), daemon=True).start()
+        else:
+            self._scan(root, generation)
+
+    def rescan(self, background=True):
+        """Просмотреть папку заново (файлы добавлены или удалены вне приложения)"""
+        root, outtmpl = self.root, self.outtmpl
+        self.root = None
+        self.configure(root, outtmpl, background)
+
+    def _scan(self, root, generation):
+        started = time.monotonic()
+        files = {}
+        ids = {}
+        pattern = self._pattern
+        section_patterns = self._section_patterns
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                iterator = os.scandir(directory)
+            except OSError:
+                continue
+            with iterator:
+                for entry in iterator:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        if is_partial(entry.name):
+                            continue
+                        # На Windows размер и mtime приходят из листинга каталога без stat
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    rel = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                    files[rel] = (stat.st_size, stat.st_mtime)
+                    video_id = self._parse_id(pattern, rel, section_patterns)
+                    if video_id:
+                        ids[video_id] = rel
+        with self._lock:
+            if generation != self._generation:
+                return
+            # Файлы, добавленные задачами во время просмотра, сохраняются
+            files.update(self._files)
+            ids.update(self._ids)
+            self._files = files
+            self._ids = ids
+            self.scan_seconds = time.monotonic() - started
+            self.ready.set()
+
+    @staticmethod
+    def _parse_id(pattern, rel, section_patterns=()):
+        """Id видео по относительному пути (None — не видео целиком)"""
+        if pattern is None:
+            return None
+        if any(section.fullmatch(rel) for section in section_patterns):
+            return None
+        match = pattern.fullmatch(rel)
+        return match.group('id') if match else None
+
+    def _relpath(self, path):
+        """Путь относительно root ('/' как разделитель) или None, если файл вне папки"""
+        if not self.root or not path:
+            return None
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel.startswith(os.pardir):
+            return None
+        return rel.replace(os.sep, '/')
+
+    def add(self, path):
+        """Учесть готовый файл (post_hook yt-dlp или перенос из промежуточной папки)"""
+        rel = self._relpath(path)
+        if rel is None or is_partial(os.path.basename(rel)):
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        video_id = self._parse_id(self._pattern, rel, self._section_patterns)
+        with self._lock:
+            self._files[rel] = (stat.st_size, stat.st_mtime)
+            if video_id:
+                self._ids[video_id] = rel
+
+    def remove(self, path):
+        rel = self._relpath(path)
+        if rel is None:
+            return
+        with self._lock:
+            self._remove_locked(rel)
+
+    def _remove_locked(self, rel):
+        self._files.pop(rel, None)
+        video_id = self._parse_id(self._pattern, rel, self._section_patterns)
+        if video_id and self._ids.get(video_id) == rel:
+            del self._ids[video_id]
+
+    def lookup(self, path):
+        """(размер, mtime) файла из индекса или None"""
+        rel = self._relpath(path)
+        if rel is None:
+            return None
+        with self._lock:
+            return self._files.get(rel)
+
+    def find_id(self, video_id):
+        """Полный путь уже скачанного файла с этим id или None.
+
+        Пока первый просмотр не завершён, ответ всегда None: отсутствие
+        в неполном индексе ничего не значит.
+        """
+        if not video_id or not self.ready.is_set():
+            return None
+        with self._lock:
+            rel = self._ids.get(video_id)
+            root = self.root
+        if rel is None:
+            return None
+        path = os.path.join(root, rel.replace('/', os.sep))
+        if not os.path.exists(path):
+            # Файл удалён вне приложения
+            with self._lock:
+                self._remove_locked(rel)
+            return None
+        return path
+
+    def to_dict(self):
+        return {
+            'root': self.root,
+            'ready': self.ready.is_set(),
+            'files': len(self._files),
+            'ids': len(self._ids),
+            'scan_seconds': round(self.scan_seconds, 3) if self.scan_seconds is not None else None,
+        }
+
+
+# Общий индекс папки загрузки
+dir_index = DirectoryIndex()
+metrics.register_section('dir_index', dir_index.to_dict)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль проверки и резервирования места на диске
+"""
+
+import os
+import shutil
+import threading
+
+
+# Минимальный шаг уменьшения резерва (чтобы не вызывать truncate на каждый хук)
+SHRINK_STEP = 8 * 1024 * 1024
+# Префикс файлов-заполнителей резерва
+PLACEHOLDER_PREFIX = '.vd-reserve-'
+
+
+class InsufficientSpaceError(Exception):
+    """Недостаточно места на диске для задачи"""
+
+
+def existing_parent(path):
+    """Найти ближайший существующий каталог для пути"""
+    path = os.path.abspath(path or '.')
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def preallocate(path, size):
+    """Выделить место под файл заранее (True если ФС поддерживает preallocation)"""
+    if size <= 0:
+        return False
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(fd, 0, size)
+                return True
+            except OSError:
+                pass
+        # Без поддержки preallocation файл остаётся пустым: место не удерживается,
+        # но учёт резервов между задачами продолжает работать
+        return False
+    finally:
+        os.close(fd)
+
+
+class Reservation:
+    def __init__(self, key, directory, device, size, placeholder=None):
+        self.key = key
+        self.directory = directory
+        self.device = device
+        self.size = size
+        self.remaining = size
+        self.placeholder = placeholder
+
+    def _truncate_placeholder(self):
+        """Уменьшить файл-заполнитель до оставшегося резерва"""
+        if not self.placeholder:
+            return
+        try:
+            if self.remaining > 0:
+                os.truncate(self.placeholder, self.remaining)
+            else:
+                os.remove(self.placeholder)
+                self.placeholder = None
+        except OSError:
+            pass
+
+
+class DiskReservations:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._reservations = {}
+
+    def reserved_bytes(self, device):
+        """Сумма активных резервов на устройстве"""
+        with self._lock:
+            return self._reserved_locked(device)
+
+    def _reserved_locked(self, device):
+        return sum(r.remaining for r in self._reservations.values() if r.device == device)
+
+    def available(self, directory):
+        """Свободное место с учётом резервов других задач"""
+        path = existing_parent(directory)
+        device = os.stat(path).st_dev
+        with self._lock:
+            return self._available_locked(path, device)
+
+    def _available_locked(self, path, device):
+        # Файлы-заполнители уже занимают место на диске, поэтому их размер
+        # возвращается к свободному месту перед вычитанием резервов
+        placeholders = 0
+        for r in self._reservations.values():
+            if r.device == device and r.placeholder and os.path.exists(r.placeholder):
+                placeholders += os.path.getsize(r.placeholder)
+        free = shutil.disk_usage(path).free + placeholders
+        return free - self._reserved_locked(device)
+
+    def reserve(self, key, directory, size, margin=0, wait=False,
+                cancel_event=None, on_wait=None, use_placeholder=True):
+        """Зарезервировать место под задачу.
+
+        При нехватке места либо ждёт освобождения резервов других задач (wait=True),
+        либо сразу выбрасывает InsufficientSpaceError.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = existing_parent(directory)
+        device = os.stat(path).st_dev
+        needed = size + margin
+
+        notified = False
+        while True:
+            with self._lock:
+                available = self._available_locked(path, device)
+                if needed <= available:
+                    placeholder = None
+                    if use_placeholder and size > 0:
+                        placeholder = os.path.join(directory, f"{PLACEHOLDER_PREFIX}{key}")
+                    # Место засчитывается за задачей сразу, а файл-заполнитель
+                    # выделяется уже вне блокировки
+                    reservation = Reservation(key, directory, device, size, placeholder)
+                    self._reservations[key] = reservation
+                    break
+                # Если места не хватит даже после освобождения всех резервов — ждать бессмысленно
+                if not wait or needed > available + self._reserved_locked(device):
+                    raise InsufficientSpaceError(
+                        f"Недостаточно места: нужно {needed / 1024 ** 2:.1f} MB, "
+                        f"доступно {max(available, 0) / 1024 ** 2:.1f} MB"
+                    )
+                if cancel_event is not None and cancel_event.is_set():
+                    raise InsufficientSpaceError("Ожидание места отменено")
+                if notified or on_wait is None:
+                    self._released.wait(timeout=1.0)
+                    continue
+            # Колбэк вызывается без блокировки: consume и release других задач его не ждут
+            notified = True
+            on_wait(needed, available)
+
+        if reservation.placeholder:
+            self._allocate_placeholder(reservation)
+        return reservation
+
+    def _allocate_placeholder(self, reservation):
+        """Выделить файл-заполнитель вне блокировки и согласовать его с резервом"""
+        placeholder = reservation.placeholder
+        try:
+            allocated = preallocate(placeholder, reservation.size)
+        except OSError:
+            allocated = False
+        with self._lock:
+            if allocated and self._reservations.get(reservation.key) is reservation:
+                if reservation.remaining < reservation.size:
+                    # Задача успела записать данные, пока выделялось место
+                    reservation._truncate_placeholder()
+                return
+            # ФС без preallocation или резерв уже освобождён
+            reservation.placeholder = None
+            if any(r.placeholder == placeholder for r in self._reservations.values()):
+                return
+            try:
+                os.remove(placeholder)
+            except OSError:
+                pass
+
+    def consume(self, key, written):
+        """Учесть записанные задачей байты: резерв уменьшается на столько же"""
+        with self._lock:
+            reservation = self._reservations.get(key)
+            if reservation is None:
+                return
+            remaining = max(reservation.size - written, 0)
+            if reservation.remaining - remaining < SHRINK_STEP and remaining > 0:
+                return
+            reservation.remaining = remaining
+            reservation._truncate_placeholder()
+            self._released.notify_all()
+
+    def release(self, key):
+        """Освободить резерв задачи (завершение или отмена)"""
+        with self._lock:
+            reservation = self._reservations.pop(key, None)
+            if reservation is None:
+                return
+            reservation.remaining = 0
+            reservation._truncate_placeholder()
+            self._released.notify_all()
+
+    def remove_stale(self, directory):
+        """Удалить заполнители, оставшиеся после аварийного завершения; вернуть их число.
+
+        Заполнитель удаляется только при штатном освобождении резерва, поэтому
+        после сбоя или kill он продолжает занимать место на диске.
+        """
+        if not directory:
+            return 0
+        removed = 0
+        with self._lock:
+            active = {r.placeholder for r in self._reservations.values() if r.placeholder}
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                return 0
+            for entry in entries:
+                if not entry.name.startswith(PLACEHOLDER_PREFIX) or entry.path in active:
+                    continue
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+# Общий реестр резервов для всех загрузчиков приложения
+reservations = DiskReservations()
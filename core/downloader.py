@@ -4,6 +4,7 @@
 Модуль загрузчика видео
 """
 
+import contextlib
 import os
 import threading
 import time
@@ -11,6 +12,29 @@ import subprocess
 import sys
 from pathlib import Path
 
+from core.planner import build_plan
+from core.diskspace import reservations
+from core.staging import StagingArea
+from core.retry import RetryPolicy, RetryScheduler, DownloadFailed, breakers
+from core.profiles import get_profile
+from core.scheduler import service_slots, job_scheduler
+from core.jobs import Job, PAUSED, RUNNING, COMPLETED, ERROR, CANCELED
+from core.journal import journal
+from core.windows import WindowPolicy
+from core.sync import sync_store, select_new_entries
+from core import segmented
+from core.connections import dns_cache
+from core.profiling import JobProfiler
+from core.progress import JobProgress
+from core.throughput import throughput_monitor
+from core import history
+from core import verify
+from core import sections
+from core.hashing import file_hashes, hash_file
+from core.entries import entry_store, EntryRecord, ENTRY_OK, ENTRY_SKIPPED, ENTRY_ERROR
+from core.dirindex import dir_index
+from core.validation import Validation
+
 try:
     import yt_dlp
     YT_DLP_AVAILABLE = True
@@ -18,15 +42,96 @@ except ImportError:
     YT_DLP_AVAILABLE = False
 
 
+class _ErrorCollector:
+    """Логгер для yt-dlp, собирающий ошибки, скрытые ignoreerrors"""
+    
+    def __init__(self):
+        self.errors = []
+    
+    def debug(self, msg):
+        pass
+    
+    def info(self, msg):
+        pass
+    
+    def warning(self, msg):
+        pass
+    
+    def error(self, msg):
+        self.errors.append(str(msg).replace('ERROR: ', '', 1))
+
+
 class Downloader:
     def __init__(self, config, i18n):
         self.config = config
         self.i18n = i18n
-        self.is_downloading = False
-        self.cancel_event = threading.Event()
         self.progress_callback = None
         self.status_callback = None
+        # Подписчики на задачи сервисов: {service: (progress_callback, status_callback)}
+        self._views = {}
+        # Общая очередь задач с приоритетами
+        self.scheduler = job_scheduler
+        self.scheduler.max_workers = self.config.get('max_workers', 3)
+        self.scheduler.windows = WindowPolicy.from_config(self.config)
+        self.scheduler.on_pause_change = self._on_pause_change
+        self.scheduler.on_window_change = self._on_window_change
+        # Журнал фоновых задач для продолжения после перезапуска
+        self.journal = journal
+        # Записи элементов плейлистов в потоковом режиме
+        self.entry_store = entry_store
+        # История скорости задач и общая
+        self.throughput = throughput_monitor
+        # История скачанных файлов (поиск на странице истории)
+        self.history = history.history_store
+        # Индекс файлов download_dir: проверка «уже скачано» без извлечения
+        self.dir_index = dir_index
+        # Пул проверки готовых файлов (ffprobe)
+        self.verifier = verify.verifier
+        # Задачи, поставленные этим загрузчиком и ещё не завершённые
+        self._jobs = {}
+        self._lock = threading.Lock()
+        # Кэш DNS на весь процесс: им пользуются и yt-dlp, и собственные загрузки
+        dns_ttl = self.config.get('dns_cache_ttl', 300)
+        if dns_ttl > 0:
+            dns_cache.install(dns_ttl)
+        self.remove_stale_reservations()
+    
+    def remove_stale_reservations(self):
+        """Удалить заполнители резервов, оставшиеся от прошлого запуска после сбоя"""
+        reservations.remove_stale(self.config.get('download_dir', ''))
+        staging_dir = self.config.get('staging_dir', '')
+        if staging_dir and os.path.isdir(staging_dir):
+            # Резерв промежуточной папки лежит в папке задачи
+            try:
+                job_dirs = [entry.path for entry in os.scandir(staging_dir) if entry.is_dir()]
+            except OSError:
+                job_dirs = []
+            for path in job_dirs:
+                reservations.remove_stale(path)
         
+    def start_dir_index(self):
+        """Проиндексировать download_dir в фоне (после смены папки — заново)"""
+        if not self.config.get('dir_index', True):
+            return
+        self.dir_index.configure(self.config.get('download_dir', ''),
+                                 self.config.get('outtmpl', '%(title)s.%(ext)s'))
+    
+    def existing_file(self, video_id):
+        """Путь уже скачанного файла с этим id в download_dir или None.
+
+        Id ищется в индексе по именам файлов (шаблон с %(id)s), затем в истории:
+        записанный там путь засчитывается, только если файл есть в индексе.
+        """
+        if not video_id or not self.config.get('dir_index', True):
+            return None
+        path = self.dir_index.find_id(video_id)
+        if path is not None or not self.dir_index.ready.is_set():
+            return path
+        for path in self.history.find_paths(video_id):
+            if self.dir_index.lookup(path) is not None:
+                return path
+        return None
+    
     def check_ffmpeg(self):
         """Проверить наличие FFmpeg"""
         try:
@@ -56,26 +161,55 @@ class Downloader:
             return False
     
     def build_options(self, url, service, quality='best', audio_only=False, 
-                     playlist=False, first_n=0, allow_mix=False, cookies_file=None):
+                     playlist=False, first_n=0, allow_mix=False, cookies_file=None,
+                     section=None, precise_cut=False):
         """Построить опции для yt-dlp"""
         if not YT_DLP_AVAILABLE:
             raise Exception("yt-dlp не установлен")
         
+        # Профиль производительности сервиса
+        profile = get_profile(self.config, service)
+        
         # Базовые опции
         options = {
             'noprogress': False,
             'quiet': True,
             'ignoreerrors': True,
             'continuedl': True,
-            'retries': 5,
-            'fragment_retries': 5,
+            'retries': profile['retries'],
+            'fragment_retries': profile['fragment_retries'],
             'windowsfilenames': True,
             'outtmpl_na_placeholder': 'NA',
-            'concurrent_fragment_downloads': self.config.get('concurrent_frags', 3),
+            'concurrent_fragment_downloads': profile['concurrent_frags'],
         }
         
+        # Размер блока HTTP-запроса (0 = одним запросом)
+        if profile['http_chunk_size_mb'] > 0:
+            options['http_chunk_size'] = profile['http_chunk_size_mb'] * 1024 * 1024
+        
+        # Цельные файлы по HTTP (не HLS/DASH-фрагменты) — несколькими соединениями
+        # по диапазонам байт; фрагментные форматы остаются у встроенных загрузчиков
+        if profile['segments'] > 1 and segmented.register():
+            options['external_downloader'] = {'http': segmented.EXTERNAL_NAME}
+            options['vd_segments'] = profile['segments']
+            # Хеш файла считается по мере записи частей
+            options['vd_hash'] = self.config.get('hash_downloads', True)
+        
+        # Экспоненциальные паузы между внутренними повторами yt-dlp
+        sleep_function = RetryPolicy.from_config(profile).sleep_function()
+        options['retry_sleep_functions'] = {
+            'http': sleep_function,
+            'fragment': sleep_function,
+            'extractor': sleep_function,
+        }
+        
+        # Ошибки одиночного видео не скрываются; в плейлисте недоступные записи
+        # пропускаются, а ошибки собираются логгером задачи
+        if not playlist:
+            options['ignoreerrors'] = False
+        
         # Лимит скорости
-        ratelimit = self.config.get('ratelimit_kbps', 0)
+        ratelimit = profile['ratelimit_kbps']
         if ratelimit > 0:
             options['ratelimit'] = ratelimit * 1024
         
@@ -87,6 +221,11 @@ class Downloader:
         outtmpl = self.config.get('outtmpl', '%(title)s.%(ext)s')
         options['outtmpl'] = outtmpl
         
+        # Фрагмент: скачивается только диапазон времени, в имени файла — его границы
+        if section:
+            options.update(sections.ydl_options(section, precise_cut))
+            options['outtmpl'] = sections.outtmpl_with_section(outtmpl, section)
+        
         # Формат видео
         if audio_only:
             options['format'] = 'bestaudio/best'
@@ -125,86 +264,738 @@ class Downloader:
         
         return options
     
-    def progress_hook(self, d):
+    def progress_hook(self, d, job):
         """Хук для отслеживания прогресса"""
+        # Отмена прерывает yt-dlp на ближайшей границе фрагмента/блока
+        if job.cancel_event.is_set():
+            raise yt_dlp.utils.DownloadCancelled()
+        
+        self._pause_point(d, job)
+        
+        info = d.get('info_dict') or {}
+        if info.get('title') and job.title is None:
+            job.title = info.get('playlist_title') or info['title']
+        
+        job.progress.update(d)
         if d['status'] == 'downloading':
-            if 'total_bytes' in d and d['total_bytes']:
-                percent = (d['downloaded_bytes'] / d['total_bytes']) * 100
-                speed = d.get('speed', 0)
-                eta = d.get('eta', 0)
-                
-                if self.progress_callback:
-                    self.progress_callback(percent, speed, eta)
+            if job.probe_passed is not None and d.get('downloaded_bytes'):
+                # Пробная попытка breaker — до первых полученных данных, а не вся задача
+                probe_passed, job.probe_passed = job.probe_passed, None
+                probe_passed()
+            job.downloaded_bytes = job.finished_bytes + (d.get('downloaded_bytes') or 0)
+            if job.reservation_key:
+                reservations.consume(job.reservation_key,
+                                     job.downloaded_bytes - job.reservation_offset)
+            
+            # Прогресс, скорость и ETA — по задаче целиком, а не по текущему файлу
+            progress = job.progress.to_dict()
+            job.total_bytes = progress['total_bytes']
+            job.speed = progress['speed'] or d.get('speed')
+            job.eta = progress['eta']
+            if progress['percent'] is not None:
+                job.notify_progress(progress['percent'], job.speed, job.eta, progress)
         
         elif d['status'] == 'finished':
-            if self.status_callback:
-                self.status_callback('finished', d.get('filename', ''))
+            elapsed = d.get('elapsed')
+            size = d.get('total_bytes') or d.get('downloaded_bytes')
+            if elapsed and size:
+                job.measured_bytes += size
+                job.measured_seconds += elapsed
+            if size:
+                job.finished_bytes += size
+                job.downloaded_bytes = job.finished_bytes
+            if job.section_report is not None:
+                job.section_report.update(d)
+            
+            job.notify_status('finished', d.get('filename', ''))
     
-    def download(self, url, service, quality='best', audio_only=False,
-                playlist=False, first_n=0, allow_mix=False, cookies_file=None):
-        """Загрузить видео"""
+    def _pause_point(self, d, job):
+        """Остановить фоновую задачу на границе записи или фрагмента, пока она на паузе"""
+        if not job.paused:
+            return
+        fragment = d.get('fragment_index')
+        boundary = d['status'] == 'finished' or (fragment is not None and fragment != job.last_fragment)
+        job.last_fragment = fragment
+        if not boundary:
+            return
+        
+        job.state = PAUSED
+        if job.pause_reason == 'window':
+            job.notify_status('paused', "Фоновая задача приостановлена до следующего временного окна")
+        else:
+            job.notify_status('paused', "Фоновая задача приостановлена ради интерактивной загрузки")
+        while not job.resume_event.wait(0.5):
+            pass
+        if job.cancel_event.is_set():
+            raise yt_dlp.utils.DownloadCancelled()
+        job.progress.resume()
+        job.state = RUNNING
+        job.notify_status('resumed', "Фоновая задача продолжена")
+    
+    def _on_pause_change(self, job, paused):
+        """Пока фоновая задача ждёт границы для паузы, её скорость ограничивается"""
+        ydl = job.ydl
+        if ydl is None:
+            return
+        if paused:
+            job.base_ratelimit = ydl.params.get('ratelimit')
+            throttle = self.config.get('bulk_throttle_kbps', 64)
+            if throttle > 0:
+                ydl.params['ratelimit'] = throttle * 1024
+        else:
+            ydl.params['ratelimit'] = job.base_ratelimit
+    
+    def _bulk_ratelimit(self, job, window):
+        """Лимит скорости фоновой задачи в окне (байт/с или None)"""
+        limit = get_profile(self.config, job.service)['ratelimit_kbps']
+        if window is not None and window.ratelimit_kbps is not None:
+            limit = window.ratelimit_kbps
+        return limit * 1024 if limit > 0 else None
+    
+    def _on_window_change(self, window, jobs):
+        """Применить лимит скорости нового временного окна к фоновым задачам"""
+        for job in jobs:
+            if job.priority != 'bulk' or job.ydl is None:
+                continue
+            ratelimit = self._bulk_ratelimit(job, window)
+            if job.paused:
+                # Лимит применится при снятии с паузы
+                job.base_ratelimit = ratelimit
+            else:
+                job.ydl.params['ratelimit'] = ratelimit
+    
+    def get_measured_throughput(self):
+        """Получить последнюю измеренную скорость загрузки (байт/с)"""
+        return self.config.get('measured_throughput_bps', 0) or None
+    
+    def _store_measured_throughput(self, job):
+        """Сохранить измеренную скорость (сглаживание с предыдущим значением)"""
+        if job.measured_bytes <= 0 or job.measured_seconds <= 0:
+            return
+        measured = job.measured_bytes / job.measured_seconds
+        previous = self.config.get('measured_throughput_bps', 0)
+        if previous:
+            measured = 0.7 * measured + 0.3 * previous
+        self.config.set('measured_throughput_bps', int(measured))
+    
+    def _reserve_space(self, job, key, info, directory, use_placeholder=True):
+        """Проверить место на диске и зарезервировать ожидаемый размер задачи"""
+        plan = build_plan(job.url, info, directory, section=job.params.get('section'))
+        if plan.total_bytes <= 0:
+            return False
+        
+        def on_wait(needed, available):
+            job.notify_status('waiting', "Ожидание свободного места на диске...")
+        
+        reservations.reserve(
+            key, directory, plan.total_bytes,
+            margin=self.config.get('disk_reserve_margin_mb', 100) * 1024 * 1024,
+            wait=(self.config.get('disk_full_policy', 'wait') == 'wait'),
+            cancel_event=job.cancel_event,
+            on_wait=on_wait,
+            use_placeholder=use_placeholder and self.config.get('preallocate', True),
+        )
+        return True
+    
+    def plan(self, url, service, quality='best', audio_only=False,
+             playlist=False, first_n=0, allow_mix=False, cookies_file=None, sync=False,
+             section=None, precise_cut=False):
+        """Построить план загрузки без скачивания (dry-run)"""
         if not YT_DLP_AVAILABLE:
             raise Exception("yt-dlp не установлен")
+        if section and playlist:
+            raise Exception("Фрагмент можно задать только для одного видео")
+        
+        options = self.build_options(
+            url, service, quality, audio_only,
+            playlist, first_n, allow_mix, cookies_file, section, precise_cut
+        )
+        options['skip_download'] = True
+        
+        with yt_dlp.YoutubeDL(options) as ydl:
+            if sync:
+                # В плане только элементы, которых ещё нет в архиве синхронизации
+                source, _scanned = self._extract_sync(ydl, url, first_n)
+                if source is None:
+                    # Новых элементов нет — пустой план
+                    source = {'_type': 'playlist', 'id': url, 'title': url, 'entries': []}
+                info = ydl.process_ie_result(source, download=False)
+            else:
+                info = ydl.extract_info(url, download=False)
+        
+        if info is None:
+            raise Exception("Не удалось получить информацию о видео")
+        
+        download_dir = self.config.get('download_dir', '')
+        return build_plan(url, ydl.sanitize_info(info), download_dir,
+                          self.get_measured_throughput(), section)
+    
+    def _extract_sync(self, ydl, url, first_n=0):
+        """Получить плейлист без обработки и оставить только новые элементы.
+
+        Страницы плейлиста запрашиваются лениво: обход прекращается, как только
+        подряд встречаются sync_stop_after_known уже скачанных элементов.
+        Возвращает (результат с новыми элементами или None, просмотрено элементов).
+        """
+        info = ydl.extract_info(url, download=False, process=False)
+        # Ссылка на канал может вести на вкладку с видео
+        while info and info.get('_type') in ('url', 'url_transparent'):
+            info = ydl.extract_info(info['url'], download=False, process=False,
+                                    ie_key=info.get('ie_key'))
+        if not info or 'entries' not in info:
+            return info, 0
+        
+        entries, scanned = select_new_entries(
+            info['entries'], sync_store.known_ids(url),
+            self.config.get('sync_stop_after_known', 10), first_n)
+        if not entries:
+            return None, scanned
+        return dict(info, entries=entries), scanned
+    
+    def _run_attempt(self, job, options, download_dir, staging):
+        """Одна попытка загрузки задачи (повторяется планировщиком)"""
+        collector = _ErrorCollector()
+        options = dict(options, logger=collector)
+        
+        # Повторная попытка считает элементы заново
+        job.progress = JobProgress(half_life=self.config.get('progress_half_life_s', 20))
+        
+        section = job.params.get('section')
+        job.section_report = sections.SectionReport(section) if section else None
+        if not job.params.get('playlist') and not job.params.get('force') and not section:
+            # Отдельное видео уже в папке загрузки: без обращения к сайту
+            existing = self.existing_file(Validation.extract_video_id(job.url))
+            if existing is not None:
+                job.notify_status('exists', existing)
+                return
         
-        if self.is_downloading:
-            raise Exception("Загрузка уже выполняется")
+        with yt_dlp.YoutubeDL(options) as ydl:
+            job.ydl = ydl
+            # С промежуточной папкой хеш считается при переносе файла (_commit_staging)
+            recorder = history.post_processor(
+                self.history, job, self._final_path(staging, download_dir),
+                None if staging else lambda path: self._file_hash(job, path))
+            if recorder is not None:
+                # После переноса файла в итоговое имя: путь в истории — путь готового файла
+                ydl.add_post_processor(recorder, when='after_move')
+            if job.params.get('verify', self.config.get('verify_downloads', False)):
+                collector_pp = verify.post_processor(job.verify_tasks,
+                                                     self._final_path(staging, download_dir))
+                if collector_pp is not None:
+                    ydl.add_post_processor(collector_pp, when='after_move')
+            try:
+                source = None
+                if job.params.get('sync'):
+                    source, scanned = self._extract_sync(ydl, job.url, job.params.get('first_n', 0))
+                    new_count = len(source['entries']) if source and 'entries' in source else 0
+                    sync_store.record_sync(job.url, source.get('title') if source else None,
+                                           scanned, new_count)
+                    job.notify_status('sync', f"Синхронизация: просмотрено {scanned}, "
+                                              f"новых {new_count}")
+                    if source is None:
+                        return
+                
+                if job.params.get('playlist') and self.config.get('playlist_streaming', True):
+                    self._run_streaming(ydl, job, source, collector, download_dir, staging)
+                elif self.config.get('disk_preflight', True) and download_dir:
+                    # Извлечь информацию один раз: по ней резервируется место,
+                    # затем та же информация используется для загрузки
+                    if source is not None:
+                        info = ydl.process_ie_result(source, download=False)
+                    else:
+                        info = ydl.extract_info(job.url, download=False)
+                    if info is not None:
+                        plan = build_plan(job.url, info, download_dir,
+                                          section=job.params.get('section'))
+                        job.progress.set_plan(len(plan.entries), plan.total_bytes,
+                                              plan.unknown_count)
+                        if job.reservation_key is None:
+                            self._reserve_job_space(job, info, download_dir, staging)
+                        ydl.process_ie_result(info, download=True)
+                elif source is not None:
+                    job.progress.set_plan(len(source['entries']))
+                    ydl.process_ie_result(source, download=True)
+                else:
+                    ydl.download([job.url])
+                job.progress.finish()
+                if job.section_report is not None:
+                    job.notify_status('section', job.section_report.message())
+            finally:
+                job.ydl = None
+        
+        if collector.errors:
+            raise DownloadFailed(collector.errors)
+    
+    def _run_streaming(self, ydl, job, source, collector, download_dir, staging):
+        """Плейлист по одному элементу: разрешить, скачать и отпустить.
+
+        При обработке плейлиста целиком yt-dlp держит info всех элементов до конца
+        задачи. Здесь в памяти только текущий элемент, а итоги пишутся компактными
+        записями в таблицу задачи на диске.
+        """
+        if source is None:
+            source = ydl.extract_info(job.url, download=False, process=False)
+            # Ссылка на канал может вести на вкладку с видео
+            while source and source.get('_type') in ('url', 'url_transparent'):
+                source = ydl.extract_info(source['url'], download=False, process=False,
+                                          ie_key=source.get('ie_key'))
+        if not source:
+            return
+        if 'entries' not in source:
+            ydl.process_ie_result(source, download=True)
+            return
+        
+        if source.get('title') and job.title is None:
+            job.title = source['title']
+        playlist_info = {
+            'playlist': source.get('title') or source.get('id'),
+            'playlist_id': source.get('id'),
+            'playlist_title': source.get('title'),
+            'playlist_uploader': source.get('uploader'),
+            'playlist_uploader_id': source.get('uploader_id'),
+            'extractor': source.get('extractor'),
+            'extractor_key': source.get('extractor_key'),
+            'webpage_url': source.get('webpage_url'),
+        }
+        first_n = job.params.get('first_n', 0)
+        force = job.params.get('force', False)
+        preflight = self.config.get('disk_preflight', True) and download_dir
+        # Число элементов известно, если плейлист уже получен целиком (синхронизация)
+        # или его сообщил сайт; размеры — по мере разрешения элементов
+        count = (len(source['entries']) if isinstance(source['entries'], list)
+                 else source.get('playlist_count'))
+        if count and first_n:
+            count = min(count, first_n)
+        job.progress.set_plan(count)
+        
+        with self.entry_store.open_table(job.id) as table:
+            for index, entry in enumerate(source['entries'], 1):
+                if first_n and index > first_n:
+                    break
+                if job.cancel_event.is_set():
+                    raise yt_dlp.utils.DownloadCancelled()
+                if entry is None:
+                    table.add(EntryRecord(index, None, ENTRY_ERROR))
+                    job.progress.end_entry()
+                    continue
+                
+                existing = None if force else self.existing_file(entry.get('id'))
+                if existing is not None:
+                    size = (self.dir_index.lookup(existing) or (0,))[0]
+                    table.add(EntryRecord(index, entry.get('id'), ENTRY_SKIPPED, existing, size))
+                    job.progress.end_entry()
+                    continue
+                
+                errors = len(collector.errors)
+                extra = dict(playlist_info, playlist_index=index, playlist_autonumber=index)
+                if preflight:
+                    info = ydl.process_ie_result(entry, download=False, extra_info=extra)
+                    if info is not None:
+                        # Резерв места — под текущий элемент
+                        reservations.release(job.id)
+                        reservations.release(job.id + '-final')
+                        job.reservation_offset = job.finished_bytes
+                        self._reserve_job_space(job, info, download_dir, staging)
+                        info = ydl.process_ie_result(info, download=True)
+                else:
+                    info = ydl.process_ie_result(entry, download=True, extra_info=extra)
+                
+                table.add(self._entry_record(index, entry, info,
+                                             len(collector.errors) > errors))
+                job.progress.end_entry()
+                # Полный info элемента больше не нужен
+                del info
+        
+        job.notify_status('entries', f"Элементов: {table.total}, скачано "
+                                     f"{table.counts[ENTRY_OK]}, пропущено "
+                                     f"{table.counts[ENTRY_SKIPPED]}, ошибок "
+                                     f"{table.counts[ENTRY_ERROR]}")
+    
+    @staticmethod
+    def _entry_record(index, entry, info, failed):
+        """Компактная запись об элементе плейлиста по результату yt-dlp"""
+        entry_id = (info or entry).get('id')
+        if failed or info is None:
+            return EntryRecord(index, entry_id, ENTRY_ERROR)
+        downloads = info.get('requested_downloads') or []
+        path = (downloads[0].get('filepath') if downloads else None) or info.get('filepath')
+        if not path:
+            # Уже в архиве или отфильтрован
+            return EntryRecord(index, entry_id, ENTRY_SKIPPED)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = info.get('filesize') or info.get('filesize_approx') or 0
+        return EntryRecord(index, entry_id, ENTRY_OK, path, size)
+    
+    def _reserve_job_space(self, job, info, download_dir, staging):
+        """Зарезервировать место под задачу в download_dir и промежуточной папке"""
+        # Ключ задаётся до резервирования, чтобы повторная попытка не резервировала снова
+        job.reservation_key = job.id
+        if staging:
+            # В итоговой папке место только учитывается: файлы
+            # копируются туда после загрузки
+            self._reserve_space(job, job.id + '-final', info, download_dir,
+                                use_placeholder=False)
+            self._reserve_space(job, job.id, info, staging.path)
+        else:
+            self._reserve_space(job, job.id, info, download_dir)
+    
+    @staticmethod
+    def _final_path(staging, download_dir):
+        """Путь файла после переноса из промежуточной папки (None — переноса нет)"""
+        if not staging:
+            return None
+        return lambda path: os.path.join(download_dir, os.path.relpath(path, staging.path))
+    
+    def _commit_staged_file(self, job, staging, download_dir, filename):
+        """post_hook yt-dlp: перенести файл, как только закончена его обработка"""
+        staging.collect(filename)
+        self._commit_staging(job, staging, download_dir, announce=False)
+    
+    def _commit_staging(self, job, staging, download_dir, announce=True):
+        """Перенести готовые файлы из промежуточной папки в download_dir"""
+        if staging.files and announce:
+            job.notify_status('moving', "Перенос файлов в папку загрузки...")
+        hash_files = self.config.get('hash_downloads', True)
+        for filename in staging.commit_all(download_dir, hash_files=hash_files):
+            self.dir_index.add(filename)
+            job.notify_status('moved', filename)
+            digest = staging.hashes.get(filename)
+            if digest:
+                self.history.set_hash(filename, digest)
+                self._report_duplicates(job, filename, digest)
+    
+    def _file_hash(self, job, path):
+        """Хеш готового файла в папке загрузки и сообщение о дубликатах.
+
+        Хеш берётся посчитанным при записи; если файл после загрузки изменён
+        (слияние, постпроцессоры), он читается заново только с hash_fallback_read.
+        """
+        if not self.config.get('hash_downloads', True):
+            return None
+        digest = file_hashes.take(path)
+        if digest is None:
+            if not self.config.get('hash_fallback_read', False):
+                return None
+            try:
+                digest = hash_file(path)
+            except OSError:
+                return None
+        self._report_duplicates(job, path, digest)
+        return digest
+    
+    def _report_duplicates(self, job, path, digest):
+        """Сообщить, если файл с тем же содержимым уже скачан по другой ссылке"""
+        try:
+            duplicates = self.history.find_by_hash(digest, exclude_path=path)
+        except Exception as e:
+            print(f"Ошибка поиска дубликатов: {e}")
+            return
+        if duplicates:
+            job.notify_status('duplicate', f"{path} совпадает с {duplicates[0]['path']} "
+                                           f"({duplicates[0]['url']})")
+    
+    def download(self, url, service, quality='best', audio_only=False,
+                playlist=False, first_n=0, allow_mix=False, cookies_file=None,
+                sync=False, priority='normal', progress_callback=None, status_callback=None,
+                profile=None, force=False, verify=None, section=None, precise_cut=False):
+        """Поставить загрузку в очередь и вернуть задачу.
+
+        profile — профилирование задачи: 'cpu', 'memory' или 'all'
+        (по умолчанию — настройка profile_jobs).
+        force — скачать, даже если файл с тем же id уже есть в папке загрузки.
+        verify — проверить готовые файлы ffprobe (по умолчанию — настройка verify_downloads).
+        section — [начало, конец] в секундах: скачать только этот фрагмент видео
+        (конец None — до конца); precise_cut — резать точно, а не по ключевым кадрам.
+        """
+        if not YT_DLP_AVAILABLE:
+            raise Exception("yt-dlp не установлен")
         
         # Проверить FFmpeg для аудио
         if audio_only and not self.check_ffmpeg():
             raise Exception(self.i18n.get('error_ffmpeg_missing'))
         
-        self.is_downloading = True
-        self.cancel_event.clear()
+        params = {
+            'quality': quality,
+            'audio_only': audio_only,
+            'playlist': playlist,
+            'first_n': first_n,
+            'allow_mix': allow_mix,
+            'cookies_file': cookies_file,
+        }
+        if sync:
+            # Синхронизация возможна только для плейлиста или канала
+            params['playlist'] = True
+            params['sync'] = True
+        if profile:
+            params['profile'] = profile
+        if force:
+            params['force'] = True
+        if verify is not None:
+            params['verify'] = verify
+        if section:
+            if params['playlist']:
+                raise Exception("Фрагмент можно задать только для одного видео")
+            params['section'] = list(section)
+            params['precise_cut'] = bool(precise_cut)
+        default_progress, default_status = self._callbacks(service)
+        job = Job(url, service, params, priority,
+                  progress_callback=progress_callback or default_progress,
+                  status_callback=status_callback or default_status)
+        return self.submit(job)
+    
+    def subscribe(self, service, progress_callback=None, status_callback=None):
+        """Подписать представление (страницу) на прогресс и статусы задач сервиса"""
+        self._views[service] = (progress_callback, status_callback)
+    
+    def _callbacks(self, service):
+        """Колбэки для новой задачи сервиса"""
+        return self._views.get(service, (self.progress_callback, self.status_callback))
+    
+    def submit(self, job):
+        """Поставить готовую задачу в общую очередь"""
+        # Лимит одновременных задач сервиса
+        profile = get_profile(self.config, job.service)
+        service_slots.set_limit(job.service, profile['max_jobs'])
         
+        with self._lock:
+            self._jobs[job.id] = job
+        # Опрос скорости запускается с первой задачей
+        self.throughput.start(self.active_jobs, self.config.get('throughput_interval_s', 1.0))
+        if job.priority == 'bulk':
+            self.journal.add(job)
+        self.scheduler.submit(job, self._run_job)
+        job.notify_status('queued', f"Задача {job.id} поставлена в очередь ({job.priority})")
+        return job
+    
+    def _run_job(self, job):
+        """Выполнить задачу в рабочем потоке планировщика"""
+        staging = None
+        download_dir = self.config.get('download_dir', '')
+        self.start_dir_index()
+        # Исход задачи: ошибка или успешное окончание загрузки (None/False — прервана иначе)
+        failure = None
+        downloaded = False
         try:
             # Построить опции
-            options = self.build_options(
-                url, service, quality, audio_only, 
-                playlist, first_n, allow_mix, cookies_file
-            )
+            params = dict(job.params)
+            sync = params.pop('sync', False)
+            for key in ('force', 'verify', 'verify_attempt'):
+                params.pop(key, None)
+            # Профилирование: параметр задачи или общая настройка
+            profiler = JobProfiler.for_mode(job, download_dir,
+                                            params.pop('profile', None)
+                                            or self.config.get('profile_jobs', ''))
+            options = self.build_options(job.url, job.service, **params)
+            if 'vd_segments' in options:
+                # Соединения по частям встают на паузу вместе с задачей
+                options['vd_resume_event'] = job.resume_event
+            if sync:
+                # Архив yt-dlp хранит уже скачанные элементы плейлиста
+                options['download_archive'] = sync_store.archive_path(job.url)
             
             # Добавить хук прогресса
-            options['progress_hooks'] = [self.progress_hook]
+            options['progress_hooks'] = [lambda d: self.progress_hook(d, job)]
+            
+            # Лимит скорости текущего временного окна
+            if job.priority == 'bulk':
+                ratelimit = self._bulk_ratelimit(job, self.scheduler.active_window())
+                options.pop('ratelimit', None)
+                if ratelimit:
+                    options['ratelimit'] = ratelimit
             
             # Установить директорию загрузки
-            download_dir = self.config.get('download_dir', '')
             if download_dir:
                 os.makedirs(download_dir, exist_ok=True)
-                options['outtmpl'] = os.path.join(download_dir, options['outtmpl'])
+                target_dir = download_dir
+                # Промежуточная папка на быстром диске: .part, фрагменты и слияние
+                # выполняются там, в download_dir попадают только готовые файлы
+                staging_dir = self.config.get('staging_dir', '')
+                if staging_dir:
+                    staging = StagingArea(staging_dir, job.id)
+                    target_dir = staging.path
+                    # Каждый готовый файл переносится сразу: длинный плейлист
+                    # не занимает промежуточную папку целиком
+                    options['post_hooks'] = [
+                        lambda filename: self._commit_staged_file(job, staging, download_dir,
+                                                                  filename)]
+                else:
+                    # Готовый файл сразу попадает в индекс папки
+                    options['post_hooks'] = [self.dir_index.add]
+                options['outtmpl'] = os.path.join(target_dir, options['outtmpl'])
+            
+            breakers.configure(self.config.get('circuit_failure_threshold', 3),
+                               self.config.get('circuit_reset_seconds', 120))
+            profile = get_profile(self.config, job.service)
+            retry_scheduler = RetryScheduler(RetryPolicy.from_config(profile), breakers)
+            
+            def on_retry(attempt, kind, delay, error):
+                job.notify_status('retry', f"Попытка {attempt} не удалась ({kind}): {error}. "
+                                           f"Повтор через {delay:.0f} с")
             
-            # Создать экземпляр yt-dlp
-            ydl = yt_dlp.YoutubeDL(options)
+            def on_pause(remaining):
+                job.notify_status('waiting', f"Сервис {job.service} временно приостановлен, "
+                                             f"продолжение через {remaining:.0f} с")
             
-            # Запустить загрузку в отдельном потоке
-            def download_thread():
+            def attempt():
+                job.probe_passed = retry_scheduler.probe_passed
                 try:
-                    ydl.download([url])
-                    if not self.cancel_event.is_set():
-                        if self.status_callback:
-                            self.status_callback('completed', '')
-                except Exception as e:
-                    if not self.cancel_event.is_set():
-                        if self.status_callback:
-                            self.status_callback('error', str(e))
+                    return self._run_attempt(job, options, download_dir, staging)
                 finally:
-                    self.is_downloading = False
-            
-            thread = threading.Thread(target=download_thread)
-            thread.daemon = True
-            thread.start()
+                    job.probe_passed = None
             
+            try:
+                with profiler or contextlib.nullcontext():
+                    retry_scheduler.run(
+                        job.service,
+                        attempt,
+                        cancel_event=job.cancel_event,
+                        on_retry=on_retry,
+                        on_pause=on_pause,
+                    )
+            finally:
+                if profiler is not None and profiler.skipped:
+                    job.notify_status('profile', profiler.skipped)
+                if profiler is not None and profiler.files:
+                    job.notify_status('profile', ', '.join(profiler.files))
+            self._store_measured_throughput(job)
+            downloaded = True
+        except Exception as e:
+            failure = e
+        finally:
+            if staging:
+                # Файлы, не перенесённые сразу (ошибка переноса в post_hook), переносятся
+                # после успеха, а также после отмены или ошибки — готовые файлы не теряются
+                try:
+                    self._commit_staging(job, staging, download_dir)
+                except Exception as e:
+                    failure = failure or e
+                staging.cleanup()
+            if downloaded or failure is not None:
+                # Задача завершена только после переноса файлов
+                if job.cancel_event.is_set():
+                    job.state = CANCELED
+                elif failure is not None:
+                    job.state = ERROR
+                    job.error = str(failure)
+                    job.notify_status('error', str(failure))
+                else:
+                    job.state = COMPLETED
+                    job.notify_status('completed', '')
+            if job.verify_tasks:
+                self._verify_files(job)
+            reservations.release(job.id)
+            reservations.release(job.id + '-final')
+            job.reservation_key = None
+            self.journal.remove(job.id)
+            with self._lock:
+                self._jobs.pop(job.id, None)
+    
+    def _verify_files(self, job):
+        """Поставить готовые файлы задачи в пул проверки (задача её не ждёт)"""
+        tasks = {task.path: task for task in job.verify_tasks if os.path.exists(task.path)}
+        job.verify_tasks = []
+        if not tasks:
+            return
+        if not verify.tools_available():
+            job.notify_status('verify', "ffprobe/ffmpeg не найдены, проверка файлов пропущена")
+            return
+        self.verifier.configure(self.config.get('verify_workers', 2))
+        job.notify_status('verify', f"Проверка файлов: {len(tasks)}")
+        decode_seconds = self.config.get('verify_decode_seconds', verify.DECODE_SECONDS)
+        for task in tasks.values():
+            self.verifier.submit(task, lambda task, result: self._on_verified(job, task, result),
+                                 decode_seconds=decode_seconds)
+    
+    def _on_verified(self, job, task, result):
+        """Записать результат проверки; повреждённый файл скачать заново"""
+        try:
+            self.history.record_verification(result)
         except Exception as e:
-            self.is_downloading = False
-            raise e
-    
-    def cancel_download(self):
-        """Отменить загрузку"""
-        if self.is_downloading:
-            self.cancel_event.set()
-            self.is_downloading = False
-            if self.status_callback:
-                self.status_callback('canceled', '')
-    
-    def is_downloading_active(self):
+            print(f"Ошибка записи результата проверки: {e}")
+        if result.ok:
+            job.notify_status('verified', task.path)
+            return
+        problems = '; '.join(result.problems)
+        attempt = job.params.get('verify_attempt', 0) + 1
+        if task.url and attempt <= self.config.get('verify_redownloads', 1):
+            try:
+                self._redownload(job, task, attempt)
+            except OSError as e:
+                job.notify_status('verify_failed', f"{task.path}: {problems} ({e})")
+                return
+            job.notify_status('corrupt', f"{task.path}: {problems}. Файл поставлен "
+                                         f"на повторную загрузку")
+        else:
+            job.notify_status('verify_failed', f"{task.path}: {problems}")
+    
+    def _redownload(self, job, task, attempt):
+        """Поставить в очередь повторную загрузку файла, не прошедшего проверку"""
+        # Повреждённый файл откладывается: иначе yt-dlp сочтёт его уже скачанным
+        os.replace(task.path, task.path + verify.CORRUPT_SUFFIX)
+        self.dir_index.remove(task.path)
+        params = dict(job.params, playlist=False, first_n=0, force=True, verify=True,
+                      verify_attempt=attempt)
+        params.pop('sync', None)
+        params.pop('profile', None)
+        return self.submit(Job(task.url, job.service, params, job.priority,
+                               progress_callback=job.progress_callback,
+                               status_callback=job.status_callback))
+    
+    def wait_idle(self, poll=0.2):
+        """Дождаться конца всех задач и проверок, включая повторные загрузки"""
+        while True:
+            self.verifier.wait()
+            if not self.active_jobs() and not self.verifier.pending:
+                return
+            time.sleep(poll)
+    
+    def active_jobs(self, service=None):
+        """Незавершённые задачи (всех сервисов или одного)"""
+        with self._lock:
+            return [job for job in self._jobs.values()
+                    if service is None or job.service == service]
+    
+    def throughput_history(self, service=None):
+        """История скорости последней начатой задачи сервиса (без service — общая)"""
+        if service is None:
+            return self.throughput.total
+        jobs = [job for job in self.active_jobs(service) if job.throughput is not None]
+        if not jobs:
+            return None
+        return max(jobs, key=lambda job: job.started or 0).throughput
+    
+    def cancel_download(self, job=None, service=None):
+        """Отменить задачу (или все задачи сервиса, или все задачи)"""
+        jobs = [job] if job is not None else self.active_jobs(service)
+        for item in jobs:
+            if item.is_finished or item.cancel_event.is_set():
+                continue
+            self.scheduler.cancel(item)
+            item.cancel_event.set()
+            # Отменённая задача не восстанавливается при перезапуске, даже если
+            # процесс завершится раньше, чем рабочий поток дойдёт до её finally
+            self.journal.remove(item.id)
+            if item.is_finished:
+                with self._lock:
+                    self._jobs.pop(item.id, None)
+            item.notify_status('canceled', '')
+    
+    def restore_jobs(self, services=None):
+        """Снова поставить в очередь фоновые задачи, не завершённые до перезапуска"""
+        restored = []
+        for data in self.journal.load().values():
+            if services and data.get('service') not in services:
+                continue
+            try:
+                job = Job.from_dict(data, *self._callbacks(data.get('service')))
+            except (KeyError, ValueError):
+                self.journal.remove(data.get('id'))
+                continue
+            restored.append(self.submit(job))
+        return restored
+    
+    def is_downloading_active(self, service=None):
         """Проверить, выполняется ли загрузка"""
-        return self.is_downloading
+        return bool(self.active_jobs(service))
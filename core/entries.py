@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль компактных записей элементов плейлиста (потоковая загрузка)
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+
+# Статусы элемента плейлиста
+ENTRY_OK = 'ok'
+ENTRY_SKIPPED = 'skipped'
+ENTRY_ERROR = 'error'
+# Как часто таблица сбрасывается на диск: записи видны странице задач во время загрузки
+FLUSH_INTERVAL = 0.5
+
+_quote = json.encoder.encode_basestring
+
+
+class EntryRecord:
+    """Итог загрузки одного элемента: только то, что нужно для отчёта"""
+
+    __slots__ = ('index', 'id', 'status', 'path', 'size')
+
+    def __init__(self, index, entry_id, status, path=None, size=0):
+        self.index = index
+        self.id = entry_id
+        self.status = status
+        self.path = path
+        self.size = size
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_json(self):
+        """Строка таблицы; собирается вручную — на плейлист из 100 000 элементов это заметно"""
+        return '{"index": %d, "id": %s, "status": "%s", "path": %s, "size": %d}' % (
+            self.index,
+            'null' if self.id is None else _quote(str(self.id)),
+            self.status,
+            'null' if self.path is None else _quote(self.path),
+            self.size or 0)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('index'), data.get('id'), data.get('status'),
+                   data.get('path'), data.get('size') or 0)
+
+
+class EntryTable:
+    """Таблица записей задачи на диске; в памяти — только счётчики"""
+
+    def __init__(self, path):
+        self.path = path
+        self.counts = {ENTRY_OK: 0, ENTRY_SKIPPED: 0, ENTRY_ERROR: 0}
+        self.bytes = 0
+        # Новая попытка задачи начинает таблицу заново
+        self._file = open(path, 'w', encoding='utf-8')
+        self._flushed = time.monotonic()
+
+    def add(self, record):
+        """Записать итог элемента"""
+        self.counts[record.status] = self.counts.get(record.status, 0) + 1
+        self.bytes += record.size or 0
+        self._file.write(record.to_json() + '\n')
+        now = time.monotonic()
+        if now - self._flushed >= FLUSH_INTERVAL:
+            self._file.flush()
+            self._flushed = now
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class EntryReader:
+    """Произвольный доступ к строкам таблицы, которая ещё дописывается.
+
+    В памяти — только смещения начала строк; при обновлении читается лишь
+    дописанный хвост файла. Недописанная последняя строка не учитывается.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._offsets = []
+        self._end = 0
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def refresh(self):
+        """Учесть строки, дописанные с прошлого вызова; вернуть их общее число"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self._end)
+                tail = f.read()
+        except OSError:
+            return len(self._offsets)
+        position = 0
+        while True:
+            newline = tail.find(b'\n', position)
+            if newline < 0:
+                break
+            if newline > position:
+                self._offsets.append(self._end + position)
+            position = newline + 1
+        self._end += position
+        return len(self._offsets)
+
+    def rows(self, start, count):
+        """Записи со start по start + count (номера строк с 0)"""
+        offsets = self._offsets[start:start + count]
+        if not offsets:
+            return []
+        records = []
+        with open(self.path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                records.append(EntryRecord.from_dict(json.loads(f.readline())))
+        return records
+
+
+class EntryStore:
+    def __init__(self, root=None, keep=200):
+        self.root = Path(root) if root else Path.home() / '.vd_entries'
+        # Сколько последних таблиц хранить
+        self.keep = keep
+
+    def table_path(self, job_id):
+        return str(self.root / f"{job_id}.jsonl")
+
+    def open_table(self, job_id):
+        """Открыть таблицу задачи (старые таблицы удаляются)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.prune()
+        return EntryTable(self.table_path(job_id))
+
+    def reader(self, job_id):
+        """Чтение таблицы задачи по номерам строк (страница задач)"""
+        return EntryReader(self.table_path(job_id))
+
+    def read(self, job_id):
+        """Записи задачи по одной (без загрузки всей таблицы в память)"""
+        path = self.table_path(job_id)
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield EntryRecord.from_dict(json.loads(line))
+
+    def prune(self):
+        """Оставить keep самых свежих таблиц"""
+        tables = sorted(self.root.glob('*.jsonl'), key=lambda p: p.stat().st_mtime)
+        for path in tables[:max(0, len(tables) - self.keep + 1)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+# Общее хранилище записей элементов приложения
+entry_store = EntryStore()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль хешей скачанных файлов (считаются по мере записи, без повторного чтения)
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+# BLAKE2b с 256-битным дайджестом: быстрее SHA-256 без аппаратного ускорения
+HASH_NAME = 'blake2b-256'
+READ_CHUNK = 4 * 1024 * 1024
+# Сколько байт частей, пришедших раньше предыдущих, держать в памяти до их очереди
+HASH_BUFFER_MAX = 64 * 1024 * 1024
+
+
+def new_hash():
+    return hashlib.blake2b(digest_size=32)
+
+
+def hash_file(path, chunk_size=READ_CHUNK):
+    """Хеш файла одним проходом чтения (когда посчитать при записи не удалось)"""
+    digest = new_hash()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StreamHasher:
+    """Хеш файла по мере записи.
+
+    Многопоточная загрузка пишет части не по порядку: блок, пришедший раньше
+    своей очереди, ждёт в памяти (не больше max_buffer байт). Если блоков
+    впереди слишком много или они перекрываются, хеш считается неизвестным.
+    """
+
+    def __init__(self, max_buffer=HASH_BUFFER_MAX):
+        self.max_buffer = max_buffer
+        self._hash = new_hash()
+        # Байт от начала файла, уже учтённых в хеше
+        self.size = 0
+        self._pending = {}
+        self._buffered = 0
+        self.broken = False
+        self._lock = threading.Lock()
+
+    def update(self, data):
+        """Следующий блок файла по порядку"""
+        with self._lock:
+            self._update_at_locked(self.size, data)
+
+    def update_at(self, offset, data):
+        """Блок файла по смещению offset"""
+        with self._lock:
+            self._update_at_locked(offset, data)
+
+    def _update_at_locked(self, offset, data):
+        if self.broken or not data:
+            return
+        if offset != self.size:
+            if offset < self.size or offset in self._pending \
+                    or self._buffered + len(data) > self.max_buffer:
+                self._break_locked()
+                return
+            self._pending[offset] = bytes(data)
+            self._buffered += len(data)
+            return
+        self._hash.update(data)
+        self.size += len(data)
+        while self.size in self._pending:
+            chunk = self._pending.pop(self.size)
+            self._buffered -= len(chunk)
+            self._hash.update(chunk)
+            self.size += len(chunk)
+
+    def _break_locked(self):
+        self.broken = True
+        self._pending.clear()
+        self._buffered = 0
+
+    def hexdigest(self, expected_size=None):
+        """Хеш файла или None, если он неизвестен или файл записан не целиком"""
+        with self._lock:
+            if self.broken or self._pending:
+                return None
+            if expected_size is not None and self.size != expected_size:
+                return None
+            return self._hash.hexdigest()
+
+
+class FileHashes:
+    """Хеши, посчитанные при записи: путь -> (хеш, размер, mtime_ns).
+
+    Хеш выдаётся, только если файл с тех пор не изменился (постпроцессор
+    мог переписать его), иначе считать придётся заново.
+    """
+
+    def __init__(self, limit=1000):
+        # Промежуточные файлы (форматы до слияния) так и не запрашиваются —
+        # старые записи вытесняются
+        self.limit = limit
+        self._hashes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, path, digest):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            self._hashes[os.path.abspath(path)] = (digest, stat.st_size, stat.st_mtime_ns)
+            while len(self._hashes) > self.limit:
+                self._hashes.popitem(last=False)
+
+    def take(self, path):
+        """Хеш неизменённого файла (запись удаляется) или None"""
+        with self._lock:
+            record = self._hashes.pop(os.path.abspath(path), None)
+        if record is None:
+            return None
+        digest, size, mtime_ns = record
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            return None
+        return digest
+
+    def __len__(self):
+        return len(self._hashes)
+
+
+# Хеши файлов, скачанных в этом процессе
+file_hashes = FileHashes()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль истории загрузок (SQLite с полнотекстовым поиском)
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+try:
+    from yt_dlp.postprocessor.common import PostProcessor
+    YT_DLP_AVAILABLE = True
+except ImportError:
+    YT_DLP_AVAILABLE = False
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS downloads (
+    id INTEGER PRIMARY KEY,
+    service TEXT NOT NULL,
+    video_id TEXT,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL DEFAULT '',
+    path TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    quality TEXT,
+    audio_only INTEGER NOT NULL DEFAULT 0,
+    downloaded REAL NOT NULL,
+    hash TEXT,
+    section TEXT
+);
+CREATE INDEX IF NOT EXISTS downloads_time ON downloads (downloaded, id);
+CREATE INDEX IF NOT EXISTS downloads_service_time ON downloads (service, downloaded, id);
+CREATE INDEX IF NOT EXISTS downloads_size ON downloads (size);
+CREATE INDEX IF NOT EXISTS downloads_video ON downloads (video_id, downloaded);
+CREATE INDEX IF NOT EXISTS downloads_path ON downloads (path);
+CREATE TABLE IF NOT EXISTS verifications (
+    path TEXT PRIMARY KEY,
+    ok INTEGER NOT NULL,
+    problems TEXT NOT NULL DEFAULT '',
+    duration REAL,
+    checked REAL NOT NULL
+);
+'''
+
+# Полнотекстовый индекс по названию и каналу; синхронизируется триггерами
+FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS downloads_fts USING fts5(
+    title, channel, content='downloads', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS downloads_ai AFTER INSERT ON downloads BEGIN
+    INSERT INTO downloads_fts (rowid, title, channel) VALUES (new.id, new.title, new.channel);
+END;
+CREATE TRIGGER IF NOT EXISTS downloads_ad AFTER DELETE ON downloads BEGIN
+    INSERT INTO downloads_fts (downloads_fts, rowid, title, channel)
+    VALUES ('delete', old.id, old.title, old.channel);
+END;
+CREATE TRIGGER IF NOT EXISTS downloads_au AFTER UPDATE ON downloads BEGIN
+    INSERT INTO downloads_fts (downloads_fts, rowid, title, channel)
+    VALUES ('delete', old.id, old.title, old.channel);
+    INSERT INTO downloads_fts (rowid, title, channel) VALUES (new.id, new.title, new.channel);
+END;
+'''
+
+COLUMNS = ('id', 'service', 'video_id', 'url', 'title', 'channel', 'path', 'size',
+           'quality', 'audio_only', 'downloaded', 'hash', 'section')
+
+
+def _terms(text):
+    """Слова запроса как префиксные фразы FTS5: 'кош ви' -> "кош"* "ви"*"""
+    return ['"' + word.replace('"', '""') + '"*' for word in re.findall(r'\w+', text or '')]
+
+
+def fts_query(text='', channel=''):
+    """Выражение MATCH: все слова text в названии или канале, слова channel — в канале"""
+    parts = _terms(text)
+    channel_terms = _terms(channel)
+    if channel_terms:
+        parts.append('channel : (' + ' AND '.join(channel_terms) + ')')
+    return ' AND '.join(parts)
+
+
+def section_label(info):
+    """'начало-конец' фрагмента из info yt-dlp (None — видео целиком)"""
+    start, end = info.get('section_start'), info.get('section_end')
+    if start is None and end is None:
+        return None
+    return f"{start or 0:g}-{'' if end is None else format(end, 'g')}"
+
+
+class HistoryPage:
+    """Страница результатов поиска; cursor — продолжение для следующей страницы"""
+
+    def __init__(self, rows, cursor):
+        self.rows = rows
+        self.cursor = cursor
+
+
+class HistoryStore:
+    def __init__(self, path=None):
+        self.path = Path(path) if path else Path.home() / '.vd_history.sqlite3'
+        self._lock = threading.Lock()
+        self._conn = None
+        self.fts = False
+
+    def _connect_locked(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+            try:
+                conn.executescript(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError as e:
+                # SQLite без FTS5: поиск по подстроке, медленнее на больших историях
+                print(f"FTS5 недоступен, поиск по истории без индекса: {e}")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn):
+        """Добавить столбцы, появившиеся после создания файла истории"""
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(downloads)')}
+        for column in ('hash', 'section'):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE downloads ADD COLUMN {column} TEXT')
+        conn.execute('CREATE INDEX IF NOT EXISTS downloads_hash ON downloads (hash)')
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def record(self, service, url, title='', channel='', path=None, size=0, quality=None,
+               audio_only=False, video_id=None, downloaded=None, file_hash=None, section=None):
+        """Записать скачанный файл; вернуть id записи (section — 'начало-конец' фрагмента)"""
+        with self._lock:
+            conn = self._connect_locked()
+            cursor = conn.execute(
+                'INSERT INTO downloads (service, video_id, url, title, channel, path, size, '
+                'quality, audio_only, downloaded, hash, section) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (service, video_id, url, title or '', channel or '', path, int(size or 0),
+                 quality, int(bool(audio_only)), downloaded or time.time(), file_hash, section))
+            conn.commit()
+            return cursor.lastrowid
+
+    def record_many(self, rows):
+        """Записать пачку записей (dict с полями record) одной транзакцией"""
+        with self._lock:
+            conn = self._connect_locked()
+            conn.executemany(
+                'INSERT INTO downloads (service, video_id, url, title, channel, path, size, '
+                'quality, audio_only, downloaded, hash, section) VALUES (:service, :video_id, '
+                ':url, :title, :channel, :path, :size, :quality, :audio_only, :downloaded, '
+                ':hash, :section)',
+                ({'video_id': None, 'title': '', 'channel': '', 'path': None, 'size': 0,
+                  'quality': None, 'audio_only': 0, 'downloaded': time.time(), 'hash': None,
+                  'section': None, **row}
+                 for row in rows))
+            conn.commit()
+
+    def record_info(self, service, info, path, params=None, file_hash=None):
+        """Записать файл по info yt-dlp (после всех постпроцессоров)"""
+        params = params or {}
+        try:
+            size = os.path.getsize(path)
+        except (OSError, TypeError):
+            size = info.get('filesize') or info.get('filesize_approx') or 0
+        return self.record(
+            service,
+            info.get('webpage_url') or info.get('original_url') or info.get('url') or '',
+            title=info.get('title') or '',
+            channel=info.get('channel') or info.get('uploader') or '',
+            path=path,
+            size=size,
+            quality=params.get('quality'),
+            audio_only=params.get('audio_only', False),
+            video_id=info.get('id'),
+            file_hash=file_hash,
+            section=section_label(info),
+        )
+
+    def _where(self, text, service, channel, date_from, date_to, min_size, max_size):
+        where = []
+        args = []
+        if self.fts:
+            match = fts_query(text, channel)
+            if match:
+                where.append('id IN (SELECT rowid FROM downloads_fts WHERE downloads_fts MATCH ?)')
+                args.append(match)
+        else:
+            for word in re.findall(r'\w+', text or ''):
+                where.append("(title LIKE ? ESCAPE '\\' OR channel LIKE ? ESCAPE '\\')")
+                pattern = '%' + re.sub(r'([%_\\])', r'\\\1', word) + '%'
+                args.extend((pattern, pattern))
+            for word in re.findall(r'\w+', channel or ''):
+                where.append("channel LIKE ? ESCAPE '\\'")
+                args.append('%' + re.sub(r'([%_\\])', r'\\\1', word) + '%')
+        if service:
+            where.append('service = ?')
+            args.append(service)
+        if date_from is not None:
+            where.append('downloaded >= ?')
+            args.append(date_from)
+        if date_to is not None:
+            where.append('downloaded < ?')
+            args.append(date_to)
+        if min_size is not None:
+            where.append('size >= ?')
+            args.append(min_size)
+        if max_size is not None:
+            where.append('size <= ?')
+            args.append(max_size)
+        return where, args
+
+    def search(self, text='', service=None, channel='', date_from=None, date_to=None,
+               min_size=None, max_size=None, limit=50, cursor=None):
+        """Страница результатов, новые сверху.
+
+        Пагинация по ключу (downloaded, id) последней строки, а не OFFSET:
+        дальние страницы открываются так же быстро, как первая.
+        """
+        where, args = self._where(text, service, channel, date_from, date_to,
+                                  min_size, max_size)
+        if cursor is not None:
+            where.append('(downloaded, id) < (?, ?)')
+            args.extend(cursor)
+        sql = 'SELECT ' + ', '.join(COLUMNS) + ' FROM downloads'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY downloaded DESC, id DESC LIMIT ?'
+        args.append(limit)
+        with self._lock:
+            rows = [dict(zip(COLUMNS, row))
+                    for row in self._connect_locked().execute(sql, args)]
+        next_cursor = (rows[-1]['downloaded'], rows[-1]['id']) if len(rows) == limit else None
+        return HistoryPage(rows, next_cursor)
+
+    def count(self, text='', service=None, channel='', date_from=None, date_to=None,
+              min_size=None, max_size=None):
+        """Число записей под фильтр"""
+        where, args = self._where(text, service, channel, date_from, date_to,
+                                  min_size, max_size)
+        sql = 'SELECT COUNT(*) FROM downloads'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        with self._lock:
+            return self._connect_locked().execute(sql, args).fetchone()[0]
+
+    def find_paths(self, video_id):
+        """Пути файлов, скачанных с этим id целиком (не фрагментом), новые сверху"""
+        if not video_id:
+            return []
+        with self._lock:
+            rows = self._connect_locked().execute(
+                'SELECT path FROM downloads WHERE video_id = ? AND path IS NOT NULL '
+                'AND section IS NULL ORDER BY downloaded DESC', (video_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def set_hash(self, path, file_hash):
+        """Записать хеш файла, известный только после записи в историю (перенос из staging)"""
+        with self._lock:
+            conn = self._connect_locked()
+            conn.execute('UPDATE downloads SET hash = ? WHERE path = ? AND hash IS NULL',
+                         (file_hash, path))
+            conn.commit()
+
+    def find_by_hash(self, file_hash, exclude_path=None):
+        """Записи файлов с тем же содержимым (дубликаты под другими ссылками), новые сверху"""
+        if not file_hash:
+            return []
+        with self._lock:
+            rows = [dict(zip(COLUMNS, row)) for row in self._connect_locked().execute(
+                'SELECT ' + ', '.join(COLUMNS) + ' FROM downloads WHERE hash = ? '
+                'ORDER BY downloaded DESC, id DESC', (file_hash,))]
+        return [row for row in rows if row['path'] != exclude_path]
+
+    def record_verification(self, result):
+        """Записать результат проверки файла (последняя проверка заменяет прежнюю)"""
+        with self._lock:
+            conn = self._connect_locked()
+            conn.execute(
+                'INSERT OR REPLACE INTO verifications (path, ok, problems, duration, checked) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (result.path, int(result.ok), '; '.join(result.problems), result.duration,
+                 result.checked))
+            conn.commit()
+
+    def verification(self, path):
+        """Последняя проверка файла или None"""
+        with self._lock:
+            row = self._connect_locked().execute(
+                'SELECT path, ok, problems, duration, checked FROM verifications WHERE path = ?',
+                (path,)).fetchone()
+        if row is None:
+            return None
+        return {'path': row[0], 'ok': bool(row[1]), 'problems': row[2].split('; ') if row[2] else [],
+                'duration': row[3], 'checked': row[4]}
+
+    def get(self, entry_id):
+        with self._lock:
+            row = self._connect_locked().execute(
+                'SELECT ' + ', '.join(COLUMNS) + ' FROM downloads WHERE id = ?',
+                (entry_id,)).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+
+if YT_DLP_AVAILABLE:
+    class HistoryPostProcessor(PostProcessor):
+        """Записывает в историю каждый готовый файл задачи"""
+
+        def __init__(self, store, job, final_path=None, file_hash=None, downloader=None):
+            super().__init__(downloader)
+            self.store = store
+            self.job = job
+            # Файл в промежуточной папке -> его путь после переноса в папку загрузки
+            self.final_path = final_path
+            # Хеш готового файла по пути (None — хеш запишется позже или не нужен)
+            self.file_hash = file_hash
+
+        def run(self, info):
+            path = info.get('filepath')
+            digest = self.file_hash(path) if path and self.file_hash else None
+            if path and self.final_path:
+                path = self.final_path(path)
+            try:
+                self.store.record_info(self.job.service, info, path, self.job.params, digest)
+            except sqlite3.Error as e:
+                self.report_warning(f"Ошибка записи истории: {e}")
+            return [], info
+
+
+def post_processor(store, job, final_path=None, file_hash=None):
+    """Постпроцессор истории для yt-dlp (None, если yt-dlp не установлен)"""
+    if not YT_DLP_AVAILABLE:
+        return None
+    return HistoryPostProcessor(store, job, final_path, file_hash)
+
+
+# Общая история загрузок приложения
+history_store = HistoryStore()
@@ -35,6 +35,7 @@ class I18n:
                 'single_video': 'Скачать одно видео',
                 'allow_mix': 'Разрешить MIX/радио (RD...)',
                 'first_n': 'Скачать первые N из плейлиста',
+                'sync_playlist': 'Только новые видео (синхронизация)',
                 'all_zero': '(0 = все)',
                 'quality': 'Качество',
                 'best': 'Лучшее',
@@ -60,7 +61,74 @@ class I18n:
                 'warning': 'Предупреждение',
                 'download_mode': 'Режим загрузки',
                 'youtube_description': 'Скачивание видео и плейлистов с YouTube',
-                'tiktok_description': 'Скачивание видео с TikTok'
+                'tiktok_description': 'Скачивание видео с TikTok',
+                'close': 'Закрыть',
+                'plan': 'План',
+                'plan_title': 'План загрузки',
+                'plan_col_title': 'Название',
+                'plan_col_format': 'Формат',
+                'plan_col_size': 'Размер',
+                'plan_total': 'Всего',
+                'plan_unknown': 'Без известного размера',
+                'plan_free': 'Свободно в папке загрузки',
+                'plan_eta': 'Оценка времени',
+                'plan_no_space': 'Недостаточно свободного места для этой задачи!',
+                'plan_running': 'Построение плана...',
+                'save': 'Сохранить',
+                'reset_defaults': 'По умолчанию',
+                'error_invalid_value': 'Некорректное значение',
+                'service_profiles': 'Профили сервисов',
+                'profile_max_jobs': 'Одновременных задач',
+                'profile_chunk_size': 'Размер блока HTTP (МБ, 0 = целиком)',
+                'profile_retries': 'Повторы запроса',
+                'profile_fragment_retries': 'Повторы фрагмента',
+                'profile_retry_attempts': 'Попытки задачи',
+                'profile_retry_delay': 'Начальная пауза (с)',
+                'profile_retry_max_delay': 'Максимальная пауза (с)',
+                'jobs': 'Задачи',
+                'jobs_title': 'Задачи загрузки',
+                'jobs_col_state': 'Состояние',
+                'jobs_col_service': 'Сервис',
+                'jobs_col_title': 'Видео',
+                'jobs_col_progress': 'Прогресс',
+                'jobs_col_speed': 'Скорость',
+                'jobs_col_eta': 'Осталось',
+                'jobs_col_size': 'Размер',
+                'jobs_summary': 'Выполняется: {running}, в очереди: {queued}, всего: {total}',
+                'cancel_job': 'Отменить задачу',
+                'export_metrics': 'Экспорт метрик',
+                'profile_segments': 'Соединений на файл (1 = одно)',
+                'throughput_export': 'Экспорт CSV',
+                'history': 'История',
+                'history_title': 'История загрузок',
+                'history_search': 'Поиск (название, канал)',
+                'history_channel': 'Канал',
+                'history_service': 'Сервис',
+                'history_date_from': 'С (ГГГГ-ММ-ДД)',
+                'history_date_to': 'По (ГГГГ-ММ-ДД)',
+                'history_size_min': 'От, МБ',
+                'history_size_max': 'До, МБ',
+                'history_col_date': 'Дата',
+                'history_col_service': 'Сервис',
+                'history_col_title': 'Название',
+                'history_col_channel': 'Канал',
+                'history_col_size': 'Размер',
+                'history_col_quality': 'Качество',
+                'history_found': 'Найдено: {count} (показаны {first}–{last})',
+                'history_prev': '← Назад',
+                'history_next': 'Далее →',
+                'history_redownload': 'Скачать в качестве',
+                'history_open_folder': 'Открыть папку',
+                'history_queued': 'Поставлено в очередь: {title}',
+                'history_bad_filter': 'Неверный фильтр: {error}',
+                'section_label': 'Фрагмент (пусто — видео целиком)',
+                'section_start': 'Начало',
+                'section_end': 'Конец',
+                'section_precise': 'Точная обрезка (перекодировать края)',
+                'section_title': 'Фрагмент',
+                'section_playlist': 'Фрагмент можно задать только для одного видео',
+                'jobs_entries': 'элементов раскрытого плейлиста: {count}',
+                'jobs_expand_hint': 'Двойной щелчок по плейлисту — показать его элементы'
             },
             'en': {
                 'app_title': 'Video Downloader — YouTube & TikTok',
@@ -88,6 +156,7 @@ class I18n:
                 'single_video': 'Download single video',
                 'allow_mix': 'Allow MIX/radio (RD...)',
                 'first_n': 'Download first N from playlist',
+                'sync_playlist': 'Only new videos (sync)',
                 'all_zero': '(0 = all)',
                 'quality': 'Quality',
                 'best': 'Best',
@@ -113,7 +182,74 @@ class I18n:
                 'warning': 'Warning',
                 'download_mode': 'Download mode',
                 'youtube_description': 'Download videos and playlists from YouTube',
-                'tiktok_description': 'Download videos from TikTok'
+                'tiktok_description': 'Download videos from TikTok',
+                'close': 'Close',
+                'plan': 'Plan',
+                'plan_title': 'Download plan',
+                'plan_col_title': 'Title',
+                'plan_col_format': 'Format',
+                'plan_col_size': 'Size',
+                'plan_total': 'Total',
+                'plan_unknown': 'Without known size',
+                'plan_free': 'Free in download directory',
+                'plan_eta': 'Estimated time',
+                'plan_no_space': 'Not enough free space for this job!',
+                'plan_running': 'Building plan...',
+                'save': 'Save',
+                'reset_defaults': 'Defaults',
+                'error_invalid_value': 'Invalid value',
+                'service_profiles': 'Service profiles',
+                'profile_max_jobs': 'Parallel jobs',
+                'profile_chunk_size': 'HTTP chunk size (MB, 0 = whole)',
+                'profile_retries': 'Request retries',
+                'profile_fragment_retries': 'Fragment retries',
+                'profile_retry_attempts': 'Job attempts',
+                'profile_retry_delay': 'Initial delay (s)',
+                'profile_retry_max_delay': 'Maximum delay (s)',
+                'jobs': 'Jobs',
+                'jobs_title': 'Download jobs',
+                'jobs_col_state': 'State',
+                'jobs_col_service': 'Service',
+                'jobs_col_title': 'Video',
+                'jobs_col_progress': 'Progress',
+                'jobs_col_speed': 'Speed',
+                'jobs_col_eta': 'ETA',
+                'jobs_col_size': 'Size',
+                'jobs_summary': 'Running: {running}, queued: {queued}, total: {total}',
+                'cancel_job': 'Cancel job',
+                'export_metrics': 'Export metrics',
+                'profile_segments': 'Connections per file (1 = single)',
+                'throughput_export': 'Export CSV',
+                'history': 'History',
+                'history_title': 'Download history',
+                'history_search': 'Search (title, channel)',
+                'history_channel': 'Channel',
+                'history_service': 'Service',
+                'history_date_from': 'From (YYYY-MM-DD)',
+                'history_date_to': 'To (YYYY-MM-DD)',
+                'history_size_min': 'Min, MB',
+                'history_size_max': 'Max, MB',
+                'history_col_date': 'Date',
+                'history_col_service': 'Service',
+                'history_col_title': 'Title',
+                'history_col_channel': 'Channel',
+                'history_col_size': 'Size',
+                'history_col_quality': 'Quality',
+                'history_found': 'Found: {count} (showing {first}–{last})',
+                'history_prev': '← Previous',
+                'history_next': 'Next →',
+                'history_redownload': 'Download again as',
+                'history_open_folder': 'Open folder',
+                'history_queued': 'Queued: {title}',
+                'history_bad_filter': 'Invalid filter: {error}',
+                'section_label': 'Section (empty — whole video)',
+                'section_start': 'Start',
+                'section_end': 'End',
+                'section_precise': 'Precise cut (re-encode edges)',
+                'section_title': 'Section',
+                'section_playlist': 'A section can only be set for a single video',
+                'jobs_entries': 'entries of the expanded playlist: {count}',
+                'jobs_expand_hint': 'Double-click a playlist to show its entries'
             }
         }
     
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль задач загрузки
+"""
+
+import threading
+import time
+import uuid
+
+from core.progress import JobProgress
+
+# Классы приоритета: меньше — важнее
+PRIORITIES = {
+    'interactive': 0,
+    'normal': 1,
+    'bulk': 2,
+}
+
+# Состояния задачи
+QUEUED = 'queued'
+RUNNING = 'running'
+PAUSED = 'paused'
+COMPLETED = 'completed'
+ERROR = 'error'
+CANCELED = 'canceled'
+
+FINISHED_STATES = (COMPLETED, ERROR, CANCELED)
+
+
+class Job:
+    def __init__(self, url, service, params=None, priority='normal',
+                 progress_callback=None, status_callback=None, job_id=None):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Неизвестный приоритет: {priority}")
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.url = url
+        self.service = service
+        self.params = dict(params or {})
+        self.priority = priority
+        self.progress_callback = progress_callback
+        self.status_callback = status_callback
+
+        self.title = None
+        self.state = QUEUED
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+        self.cancel_event = threading.Event()
+        # Установлен — задача может выполняться; сброшен — пауза на ближайшей границе
+        self.resume_event = threading.Event()
+        self.resume_event.set()
+
+        # Прогресс
+        self.downloaded_bytes = 0
+        self.total_bytes = None
+        self.speed = None
+        self.eta = None
+        self.finished_bytes = 0
+        self.measured_bytes = 0
+        self.measured_seconds = 0.0
+        # Прогресс задачи целиком (плейлист — по всем элементам)
+        self.progress = JobProgress()
+        # История скорости (ThroughputHistory), заводится при первом отсчёте
+        self.throughput = None
+
+        # Служебное состояние выполнения
+        self.reservation_key = None
+        # Байты задачи до текущего резерва (в потоковом режиме резерв — на элемент)
+        self.reservation_offset = 0
+        self.ydl = None
+        # Сообщить circuit breaker, что пробная попытка получила данные (RetryScheduler.probe_passed)
+        self.probe_passed = None
+        self.base_ratelimit = None
+        self.last_fragment = None
+        # Причина паузы: 'interactive' или 'window'
+        self.pause_reason = None
+        # Готовые файлы на проверку после задачи (VerifyTask)
+        self.verify_tasks = []
+        # Байты фрагмента и видео целиком (SectionReport), если задан фрагмент
+        self.section_report = None
+
+    @classmethod
+    def from_dict(cls, data, progress_callback=None, status_callback=None):
+        """Восстановить задачу из записи журнала"""
+        job = cls(data['url'], data['service'], data.get('params'), data.get('priority', 'normal'),
+                  progress_callback, status_callback, job_id=data.get('id'))
+        job.created = data.get('created') or job.created
+        job.title = data.get('title')
+        return job
+
+    @property
+    def rank(self):
+        """Числовой приоритет для очереди"""
+        return PRIORITIES[self.priority]
+
+    @property
+    def paused(self):
+        return not self.resume_event.is_set()
+
+    @property
+    def is_finished(self):
+        return self.state in FINISHED_STATES
+
+    def notify_status(self, status, message=''):
+        """Передать изменение статуса подписчику"""
+        if self.status_callback:
+            self.status_callback(status, message)
+
+    def notify_progress(self, percent, speed, eta, progress=None):
+        """Передать прогресс подписчику (progress — снимок JobProgress.to_dict())"""
+        if self.progress_callback:
+            self.progress_callback(percent, speed, eta, progress)
+
+    def to_dict(self):
+        """Краткое представление задачи"""
+        return {
+            'id': self.id,
+            'url': self.url,
+            'service': self.service,
+            'title': self.title,
+            'priority': self.priority,
+            'state': self.state,
+            'params': self.params,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'downloaded_bytes': self.downloaded_bytes,
+            'total_bytes': self.total_bytes,
+            'speed': self.speed,
+            'eta': self.eta,
+            'error': self.error,
+        }
+
+
+class JobGroup:
+    """Задачи, запущенные с одной страницы: её кнопки и отмена касаются только их"""
+
+    def __init__(self):
+        self._jobs = []
+
+    def add(self, job):
+        self._jobs.append(job)
+        return job
+
+    def active(self):
+        """Незавершённые и не отменённые задачи группы"""
+        self._jobs = [job for job in self._jobs
+                      if not job.is_finished and not job.cancel_event.is_set()]
+        return list(self._jobs)
+
+    def busy(self):
+        """Выполняется ли интерактивная задача группы (новая запускается после неё)"""
+        return any(job.priority == 'interactive' for job in self.active())
+
+    def cancel(self, downloader):
+        """Отменить задачи группы, не трогая остальные задачи сервиса"""
+        for job in self.active():
+            downloader.cancel_download(job)
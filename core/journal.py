@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль журнала незавершённых задач (восстановление после перезапуска)
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+
+class JobJournal:
+    def __init__(self, path=None, compact_ratio=4):
+        self.path = Path(path) if path else Path.home() / '.vd_jobs.json'
+        # Файл сжимается, когда записей в нём больше compact_ratio × живых задач
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        # Задачи в памяти: файл читается один раз, дальше только дописывается
+        self._data = None
+        self._records = 0
+        self._legacy = False
+
+    def load(self):
+        """Прочитать записи журнала: {id: запись задачи}"""
+        with self._lock:
+            return dict(self._data_locked())
+
+    def _data_locked(self):
+        if self._data is None:
+            self._data = self._read_locked()
+        return self._data
+
+    def _read_locked(self):
+        """Прочитать файл: построчный журнал операций или прежний формат (один JSON)"""
+        self._records = 0
+        self._legacy = False
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except Exception as e:
+            print(f"Ошибка чтения журнала задач: {e}")
+            return {}
+
+        try:
+            data = json.loads(text)
+            # Одна строка журнала операций тоже разбирается как JSON — у неё есть 'op'
+            if isinstance(data, dict) and 'op' not in data:
+                # Прежний формат: при первой записи файл будет переписан
+                self._legacy = True
+                return data
+        except ValueError:
+            pass
+
+        data = {}
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Недописанная последняя строка (например, при сбое питания)
+                continue
+            self._records += 1
+            if record.get('op') == 'add':
+                data[record['id']] = record['job']
+            elif record.get('op') == 'remove':
+                data.pop(record['id'], None)
+        return data
+
+    def _append_locked(self, record):
+        """Дописать операцию в файл; при разрастании файл сжимается"""
+        data = self._data_locked()
+        if self._legacy or self._records >= self.compact_ratio * len(data) + 100:
+            self._compact_locked(data)
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._records += 1
+        except Exception as e:
+            print(f"Ошибка сохранения журнала задач: {e}")
+
+    def _compact_locked(self, data):
+        """Переписать файл: по одной записи на живую задачу"""
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for job_id, job in data.items():
+                    f.write(json.dumps({'op': 'add', 'id': job_id, 'job': job},
+                                       ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.path)
+            self._records = len(data)
+            self._legacy = False
+        except Exception as e:
+            print(f"Ошибка сохранения журнала задач: {e}")
+
+    def add(self, job):
+        """Записать или обновить задачу"""
+        with self._lock:
+            record = job.to_dict()
+            self._data_locked()[job.id] = record
+            self._append_locked({'op': 'add', 'id': job.id, 'job': record})
+
+    def remove(self, job_id):
+        """Удалить задачу из журнала"""
+        with self._lock:
+            if self._data_locked().pop(job_id, None) is not None:
+                self._append_locked({'op': 'remove', 'id': job_id})
+
+
+# Общий журнал задач приложения
+journal = JobJournal()
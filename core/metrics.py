@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль метрик приложения
+"""
+
+import json
+import threading
+import time
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.sections = {}
+
+    def inc(self, name, value=1):
+        """Увеличить счётчик"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        """Установить текущее значение показателя"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def register_section(self, name, provider):
+        """Зарегистрировать источник составных метрик (функция, возвращающая dict)"""
+        with self._lock:
+            self.sections[name] = provider
+
+    def snapshot(self):
+        """Получить снимок всех метрик"""
+        with self._lock:
+            data = {
+                'timestamp': time.time(),
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+            }
+            sections = list(self.sections.items())
+        for name, provider in sections:
+            try:
+                data[name] = provider()
+            except Exception as e:
+                data[name] = {'error': str(e)}
+        return data
+
+    def export(self, path):
+        """Сохранить снимок метрик в JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+# Общий реестр метрик приложения
+metrics = Metrics()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль планирования загрузки (dry-run)
+"""
+
+import json
+
+from core.diskspace import reservations
+
+
+def iter_entries(info):
+    """Развернуть плейлист (в том числе вложенный) в плоский список записей"""
+    if not info:
+        return
+    if info.get('_type') in ('playlist', 'multi_video') or 'entries' in info:
+        for entry in info.get('entries') or []:
+            yield from iter_entries(entry)
+    else:
+        yield info
+
+
+def entry_size(info):
+    """Оценить размер записи: (байты или None, признак приблизительной оценки)"""
+    formats = info.get('requested_formats') or [info]
+    total = 0
+    approx = False
+    for fmt in formats:
+        size = fmt.get('filesize')
+        if not size:
+            size = fmt.get('filesize_approx')
+            approx = True
+        if not size:
+            return None, True
+        total += int(size)
+    return total, approx
+
+
+def clip_fraction(duration, section):
+    """Доля длительности видео, попадающая во фрагмент (None, если длительность неизвестна)"""
+    if not duration:
+        return None
+    start, end = section
+    end = duration if end is None else min(end, duration)
+    return max(end - min(start, duration), 0) / duration
+
+
+def clip_size(info, section):
+    """Оценка размера фрагмента [начало, конец] по размеру форматов записи"""
+    size, _approx = entry_size(info)
+    fraction = clip_fraction(info.get('duration'), section)
+    if size is None or fraction is None:
+        return None, True
+    return int(size * fraction), True
+
+
+class PlanEntry:
+    def __init__(self, index, entry_id, title, format_id, size, approx):
+        self.index = index
+        self.entry_id = entry_id
+        self.title = title
+        self.format_id = format_id
+        self.size = size
+        self.approx = approx
+
+    @property
+    def unknown_size(self):
+        return self.size is None
+
+    def to_dict(self):
+        """Представление записи для JSON"""
+        return {
+            'index': self.index,
+            'id': self.entry_id,
+            'title': self.title,
+            'format_id': self.format_id,
+            'size': self.size,
+            'approx': self.approx,
+            'unknown_size': self.unknown_size,
+        }
+
+
+class DownloadPlan:
+    def __init__(self, url, entries, download_dir, free_bytes, throughput_bps):
+        self.url = url
+        self.entries = entries
+        self.download_dir = download_dir
+        self.free_bytes = free_bytes
+        self.throughput_bps = throughput_bps
+
+    @property
+    def total_bytes(self):
+        """Суммарный известный размер"""
+        return sum(e.size for e in self.entries if e.size)
+
+    @property
+    def unknown_count(self):
+        """Количество записей без известного размера"""
+        return sum(1 for e in self.entries if e.unknown_size)
+
+    @property
+    def fits(self):
+        """Помещается ли задача в свободное место (None если неизвестно)"""
+        if self.free_bytes is None:
+            return None
+        return self.total_bytes <= self.free_bytes
+
+    @property
+    def estimated_seconds(self):
+        """Оценка длительности по измеренной скорости (None если скорость неизвестна)"""
+        if not self.throughput_bps:
+            return None
+        return self.total_bytes / self.throughput_bps
+
+    def to_dict(self):
+        """Представление плана для JSON"""
+        return {
+            'url': self.url,
+            'download_dir': self.download_dir,
+            'entries': [e.to_dict() for e in self.entries],
+            'entry_count': len(self.entries),
+            'total_bytes': self.total_bytes,
+            'unknown_count': self.unknown_count,
+            'free_bytes': self.free_bytes,
+            'fits': self.fits,
+            'throughput_bps': self.throughput_bps,
+            'estimated_seconds': self.estimated_seconds,
+        }
+
+    def to_json(self):
+        """Сериализовать план в JSON"""
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+
+def build_plan(url, info, download_dir, throughput_bps=None, section=None):
+    """Построить план по результату extract_info(download=False).
+
+    section — [начало, конец] фрагмента: размер записи оценивается долей длительности.
+    """
+    entries = []
+    for index, entry in enumerate(iter_entries(info), start=1):
+        if section:
+            size, approx = clip_size(entry, section)
+        else:
+            size, approx = entry_size(entry)
+        entries.append(PlanEntry(
+            index=index,
+            entry_id=entry.get('id'),
+            title=entry.get('title') or entry.get('url') or '',
+            format_id=entry.get('format_id'),
+            size=size,
+            approx=approx,
+        ))
+    try:
+        free_bytes = reservations.available(download_dir)
+    except OSError:
+        free_bytes = None
+    return DownloadPlan(url, entries, download_dir, free_bytes, throughput_bps)
+
+
+def format_size(size):
+    """Форматировать размер в человекочитаемый вид"""
+    if size is None:
+        return '?'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def format_duration(seconds):
+    """Форматировать длительность как ЧЧ:ММ:СС"""
+    if seconds is None:
+        return '--:--:--'
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
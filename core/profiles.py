@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль профилей производительности для сервисов
+"""
+
+import copy
+
+
+# Встроенные профили: YouTube — мало крупных DASH-загрузок, TikTok — много мелких
+# файлов и жёсткие ограничения частоты запросов
+DEFAULT_PROFILES = {
+    'youtube': {
+        'max_jobs': 2,
+        'concurrent_frags': 4,
+        'segments': 4,
+        'http_chunk_size_mb': 10,
+        'ratelimit_kbps': 0,
+        'retries': 10,
+        'fragment_retries': 10,
+        'retry_max_attempts': 4,
+        'retry_base_delay': 5,
+        'retry_max_delay': 300,
+    },
+    'tiktok': {
+        'max_jobs': 3,
+        'concurrent_frags': 1,
+        'segments': 2,
+        'http_chunk_size_mb': 0,
+        'ratelimit_kbps': 0,
+        'retries': 3,
+        'fragment_retries': 3,
+        'retry_max_attempts': 6,
+        'retry_base_delay': 15,
+        'retry_max_delay': 600,
+    },
+}
+
+# Поля профиля: (ключ, тип, ключ перевода)
+PROFILE_FIELDS = [
+    ('max_jobs', int, 'profile_max_jobs'),
+    ('concurrent_frags', int, 'frags'),
+    ('segments', int, 'profile_segments'),
+    ('http_chunk_size_mb', int, 'profile_chunk_size'),
+    ('ratelimit_kbps', int, 'ratelimit'),
+    ('retries', int, 'profile_retries'),
+    ('fragment_retries', int, 'profile_fragment_retries'),
+    ('retry_max_attempts', int, 'profile_retry_attempts'),
+    ('retry_base_delay', float, 'profile_retry_delay'),
+    ('retry_max_delay', float, 'profile_retry_max_delay'),
+]
+
+SERVICES = list(DEFAULT_PROFILES)
+
+
+def get_profile(config, service):
+    """Получить профиль сервиса: встроенные значения + изменения пользователя"""
+    if service in DEFAULT_PROFILES:
+        profile = copy.deepcopy(DEFAULT_PROFILES[service])
+    else:
+        # Неизвестный сервис — общие настройки
+        profile = copy.deepcopy(DEFAULT_PROFILES['youtube'])
+        profile['concurrent_frags'] = config.get('concurrent_frags', 3)
+        profile['ratelimit_kbps'] = config.get('ratelimit_kbps', 0)
+    overrides = (config.get('service_profiles') or {}).get(service) or {}
+    for key, value in overrides.items():
+        if key in profile:
+            profile[key] = value
+    return profile
+
+
+def save_profile(config, service, values):
+    """Сохранить изменения профиля сервиса (только отличия от встроенных значений)"""
+    profiles = dict(config.get('service_profiles') or {})
+    defaults = DEFAULT_PROFILES.get(service, {})
+    profiles[service] = {key: value for key, value in values.items()
+                         if defaults.get(key) != value}
+    config.set('service_profiles', profiles)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль профилирования задач по запросу (cProfile и tracemalloc)
+"""
+
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+
+# Режимы профилирования: что включает каждый
+PROFILE_MODES = {
+    'cpu': ('cpu',),
+    'memory': ('memory',),
+    'all': ('cpu', 'memory'),
+}
+
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 30
+
+# tracemalloc общий для процесса: трассировку включает первый профилировщик
+# памяти и выключает последний
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+# CPU профилируется у одной задачи за раз: с Python 3.12 профилировщик общий для
+# процесса, и второй cProfile.enable() завершается ValueError
+_cpu_lock = threading.Lock()
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            _tracing_owned = True
+        _tracing_users += 1
+        # Пик сбрасывается, только если одновременно нет других профилируемых задач
+        return _tracing_users == 1 and _tracing_owned
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def _filtered(snapshot):
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ])
+
+
+class JobProfiler:
+    def __init__(self, job, directory, mode='all'):
+        """mode: 'cpu', 'memory' или 'all'; отчёты пишутся в directory"""
+        if mode not in PROFILE_MODES:
+            raise Exception(f"Неизвестный режим профилирования: {mode}")
+        self.job = job
+        self.directory = directory or os.getcwd()
+        self.modes = PROFILE_MODES[mode]
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        # Рядом с логом сервиса: <сервис>_log.txt -> <сервис>_profile_<время>_<id>.*
+        self.prefix = os.path.join(self.directory,
+                                   f"{job.service}_profile_{stamp}_{job.id[:8]}")
+        self.files = []
+        self._profile = None
+        self._snapshot = None
+        self._peak_valid = False
+        self._started = None
+        # Почему CPU не профилировался (None — профилировался или не запрашивался)
+        self.skipped = None
+
+    @staticmethod
+    def for_mode(job, directory, mode):
+        """Профилировщик или None, если профилирование выключено"""
+        if not mode:
+            return None
+        return JobProfiler(job, directory, mode)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        if 'memory' in self.modes:
+            self._peak_valid = _start_tracing()
+            if self._peak_valid and hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self._snapshot = _filtered(tracemalloc.take_snapshot())
+        if 'cpu' in self.modes:
+            self._start_cpu()
+        return self
+
+    def _start_cpu(self):
+        """Включить cProfile, если CPU сейчас не профилирует другая задача.
+
+        До Python 3.12 cProfile видит только поток задачи, с 3.12 — все потоки
+        процесса, поэтому в отчёт могут попасть и соседние загрузки.
+        """
+        if not _cpu_lock.acquire(blocking=False):
+            self.skipped = "CPU не профилировался: профилируется другая задача"
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Профилировщик уже включён вне приложения
+            _cpu_lock.release()
+            self.skipped = "CPU не профилировался: в процессе уже работает профилировщик"
+            return
+        self._profile = profile
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._started
+        if self._profile is not None:
+            self._profile.disable()
+            _cpu_lock.release()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if self._profile is not None:
+                self._write_cpu(elapsed)
+            if self._snapshot is not None:
+                self._write_memory(elapsed)
+        except OSError as e:
+            print(f"Ошибка сохранения профиля задачи {self.job.id}: {e}")
+        finally:
+            if self._snapshot is not None:
+                _stop_tracing()
+        return False
+
+    def _header(self, elapsed):
+        return (f"Задача: {self.job.id}\n"
+                f"Ссылка: {self.job.url}\n"
+                f"Сервис: {self.job.service}\n"
+                f"Длительность: {elapsed:.2f} с\n\n")
+
+    def _write_cpu(self, elapsed):
+        """Файл .prof для snakeviz/pstats и текстовая сводка по функциям"""
+        prof_path = self.prefix + '.prof'
+        self._profile.dump_stats(prof_path)
+        self.files.append(prof_path)
+
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        text_path = self.prefix + '_cpu.txt'
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write(self._header(elapsed))
+            f.write(stream.getvalue())
+        self.files.append(text_path)
+
+    def _write_memory(self, elapsed):
+        """Строки кода с наибольшим приростом памяти за время задачи"""
+        snapshot = _filtered(tracemalloc.take_snapshot())
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [self._header(elapsed).rstrip('\n'),
+                 f"Память сейчас: {current / 1024 / 1024:.1f} МБ"]
+        if self._peak_valid:
+            lines.append(f"Пик за задачу: {peak / 1024 / 1024:.1f} МБ")
+        else:
+            lines.append("Пик не измерен: одновременно профилировались другие задачи")
+        lines.append('')
+        lines.append(f"Наибольший прирост памяти (топ {TOP_ALLOCATIONS}):")
+        for stat in snapshot.compare_to(self._snapshot, 'lineno')[:TOP_ALLOCATIONS]:
+            lines.append(str(stat))
+        lines.append('')
+        lines.append("Наибольший объём памяти по стеку вызовов (топ 5):")
+        for stat in snapshot.statistics('traceback')[:5]:
+            lines.append(f"{stat.size / 1024:.1f} КБ в {stat.count} блоках")
+            lines.extend(f"    {line}" for line in stat.traceback.format(limit=10))
+
+        path = self.prefix + '_memory.txt'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        self.files.append(path)
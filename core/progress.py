@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль прогресса задачи целиком (плейлист: элементы, байты, сглаженная скорость и ETA)
+"""
+
+import time
+
+
+class JobProgress:
+    """Прогресс всей задачи, а не текущего файла.
+
+    Байты задачи — готовые элементы плюс текущий файл. Ожидаемый объём берётся
+    из плана (extract_info без загрузки), а для элементов без известного размера
+    и без плана — по среднему размеру уже скачанных элементов. Скорость сглажена
+    экспоненциально по времени (half_life секунд), ETA — остаток объёма на скорость.
+    """
+
+    def __init__(self, half_life=20.0, sample_interval=0.5, clock=time.monotonic):
+        self.half_life = half_life
+        # Скорость пересчитывается не чаще, чем раз в sample_interval секунд
+        self.sample_interval = sample_interval
+        self.clock = clock
+
+        self.entries_total = None
+        self.entries_done = 0
+        self.planned_bytes = None
+        self.planned_unknown = 0
+        self.finished_bytes = 0
+        self.current_bytes = 0
+        self.current_total = None
+        self.speed = None
+        self._entry_key = None
+        # Файл текущего элемента докачан, а следующий элемент ещё не начат
+        self._file_finished = False
+        self._sample_time = None
+        self._sample_bytes = 0
+
+    def set_plan(self, entries_total=None, planned_bytes=None, unknown=0):
+        """Число элементов и известный по плану объём (unknown — элементов без размера)"""
+        if entries_total is not None:
+            self.entries_total = entries_total
+        if planned_bytes:
+            self.planned_bytes = planned_bytes
+            self.planned_unknown = unknown
+
+    @property
+    def done_bytes(self):
+        return self.finished_bytes + self.current_bytes
+
+    def update(self, d):
+        """Учесть событие хука прогресса yt-dlp"""
+        self._track_entry(d.get('info_dict') or {})
+        if d['status'] == 'downloading':
+            self._file_finished = False
+            self.current_bytes = d.get('downloaded_bytes') or 0
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if not total:
+                # HLS/DASH без размера: оценка по доле скачанных фрагментов
+                index = d.get('fragment_index')
+                count = d.get('fragment_count')
+                if index and count and self.current_bytes:
+                    total = self.current_bytes * count / index
+            if total:
+                self.current_total = max(total, self.current_bytes)
+        elif d['status'] == 'finished':
+            # Один элемент может состоять из нескольких файлов (видео и звук)
+            self.finished_bytes += d.get('total_bytes') or d.get('downloaded_bytes') or 0
+            self.current_bytes = 0
+            self.current_total = None
+            self._file_finished = True
+        self._sample()
+
+    def _track_entry(self, info):
+        """Смена элемента в хуке означает, что предыдущий элемент готов"""
+        key = info.get('playlist_index') or info.get('id')
+        if key is None or key == self._entry_key:
+            return
+        if self._entry_key is not None:
+            self.entries_done += 1
+        self._entry_key = key
+        self._file_finished = False
+
+    def end_entry(self):
+        """Элемент завершён (скачан, пропущен или с ошибкой)"""
+        self.entries_done += 1
+        self._entry_key = None
+        self._file_finished = False
+        self.current_bytes = 0
+        self.current_total = None
+
+    def finish(self):
+        """Задача завершена: последний элемент из хука тоже готов"""
+        if self._entry_key is not None:
+            self.end_entry()
+
+    def resume(self):
+        """После паузы скорость считается заново от текущего момента"""
+        self._sample_time = None
+
+    def _sample(self):
+        now = self.clock()
+        done = self.done_bytes
+        if self._sample_time is None:
+            self._sample_time = now
+            self._sample_bytes = done
+            return
+        elapsed = now - self._sample_time
+        if elapsed < self.sample_interval:
+            return
+        rate = max(done - self._sample_bytes, 0) / elapsed
+        if self.speed is None:
+            self.speed = rate
+        else:
+            weight = 1 - 0.5 ** (elapsed / self.half_life)
+            self.speed += weight * (rate - self.speed)
+        self._sample_time = now
+        self._sample_bytes = done
+
+    @property
+    def average_entry_bytes(self):
+        """Средний размер готового элемента (или оценка текущего)"""
+        settled = self.entries_done + (1 if self._file_finished else 0)
+        if settled and self.finished_bytes:
+            return self.finished_bytes / settled
+        return self.current_total
+
+    @property
+    def total_bytes(self):
+        """Ожидаемый объём задачи (None, если оценить нечем)"""
+        done = self.done_bytes
+        current_left = max((self.current_total or 0) - self.current_bytes, 0)
+        average = self.average_entry_bytes or 0
+        if self.planned_bytes:
+            expected = self.planned_bytes + self.planned_unknown * average
+            return max(expected, done + current_left)
+        if self.entries_total:
+            active = 1 if self._entry_key is not None else 0
+            remaining = max(self.entries_total - self.entries_done - active, 0)
+            if remaining and not average:
+                return None
+            return done + current_left + remaining * average
+        if self.current_total:
+            return done + current_left
+        return None
+
+    def to_dict(self):
+        """Снимок для подписчиков: процент, скорость и ETA задачи целиком"""
+        # Ожидаемый объём считается один раз: снимок строится на каждый вызов хука
+        done = self.done_bytes
+        total = self.total_bytes
+        if total:
+            percent = min(done / total * 100, 100.0)
+        elif self.entries_total:
+            percent = min(self.entries_done / self.entries_total * 100, 100.0)
+        else:
+            percent = None
+        eta = int(max(total - done, 0) / self.speed) if total and self.speed else None
+        return {
+            'entries_done': self.entries_done,
+            'entries_total': self.entries_total,
+            'downloaded_bytes': done,
+            'total_bytes': total,
+            'percent': percent,
+            'speed': self.speed,
+            'eta': eta,
+        }
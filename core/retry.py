@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль повторных попыток: классификация ошибок, backoff с jitter и circuit breaker
+"""
+
+import random
+import re
+import socket
+import threading
+import time
+import urllib.error
+
+from core.metrics import metrics
+
+
+# Классы ошибок
+THROTTLED = 'throttled'
+FORBIDDEN = 'forbidden'
+NETWORK = 'network'
+EXTRACTOR = 'extractor'
+FATAL = 'fatal'
+CANCELLED = 'cancelled'
+
+# Порядок важности при классификации нескольких ошибок одной задачи
+SEVERITY = [THROTTLED, FORBIDDEN, NETWORK, EXTRACTOR, FATAL, CANCELLED]
+
+# Ошибки, которые открывают circuit breaker сервиса
+BREAKER_KINDS = (THROTTLED, FORBIDDEN, NETWORK)
+
+_PATTERNS = [
+    (THROTTLED, re.compile(r'HTTP Error 429|Too Many Requests|rate.?limit|'
+                           r'confirm you.re not a bot', re.I)),
+    (FORBIDDEN, re.compile(r'HTTP Error 403|Forbidden', re.I)),
+    (FATAL, re.compile(r'HTTP Error 404|Private video|Video unavailable|'
+                       r'Unsupported URL|is not a valid URL|members.only|'
+                       r'This video has been removed|copyright', re.I)),
+    (NETWORK, re.compile(r'HTTP Error 5\d\d|timed out|Connection (reset|refused|aborted)|'
+                         r'Remote end closed|IncompleteRead|getaddrinfo|'
+                         r'Temporary failure in name resolution|Network is unreachable|'
+                         r'urlopen error|Unable to download', re.I)),
+    (EXTRACTOR, re.compile(r'Unable to extract|ExtractorError|Failed to parse|'
+                           r'Requested format is not available', re.I)),
+]
+
+
+class DownloadFailed(Exception):
+    """Задача завершилась с ошибками (собранными при ignoreerrors)"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        shown = '; '.join(self.errors[:3])
+        more = f" (+{len(self.errors) - 3})" if len(self.errors) > 3 else ''
+        super().__init__(shown + more)
+
+
+class CircuitOpenError(Exception):
+    """Circuit breaker сервиса открыт"""
+
+
+def classify_error(error):
+    """Определить класс ошибки (исключение или текст сообщения)"""
+    if isinstance(error, DownloadFailed):
+        kinds = [classify_error(message) for message in error.errors] or [FATAL]
+        return min(kinds, key=SEVERITY.index)
+
+    if isinstance(error, urllib.error.HTTPError):
+        if error.code == 429:
+            return THROTTLED
+        if error.code == 403:
+            return FORBIDDEN
+        if error.code >= 500:
+            return NETWORK
+        return FATAL
+
+    if type(error).__name__ == 'DownloadCancelled':
+        return CANCELLED
+
+    if isinstance(error, (urllib.error.URLError, socket.timeout, ConnectionError, TimeoutError)):
+        return NETWORK
+
+    message = str(error)
+    for kind, pattern in _PATTERNS:
+        if pattern.search(message):
+            return kind
+
+    if type(error).__name__ == 'ExtractorError':
+        return EXTRACTOR
+    if isinstance(error, OSError):
+        return NETWORK
+    return FATAL
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=4, base_delay=5.0, max_delay=300.0, multiplier=2.0,
+                 throttle_factor=4.0, extractor_attempts=2):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.throttle_factor = throttle_factor
+        self.extractor_attempts = extractor_attempts
+
+    @classmethod
+    def from_config(cls, config):
+        """Создать политику из настроек или профиля сервиса"""
+        return cls(
+            max_attempts=config.get('retry_max_attempts', 4),
+            base_delay=config.get('retry_base_delay', 5.0),
+            max_delay=config.get('retry_max_delay', 300.0),
+        )
+
+    def should_retry(self, kind, attempt):
+        """Нужна ли ещё попытка после неудачной попытки номер attempt (с 1)"""
+        if kind in (FATAL, CANCELLED):
+            return False
+        if kind == EXTRACTOR:
+            return attempt < min(self.extractor_attempts, self.max_attempts)
+        return attempt < self.max_attempts
+
+    def delay(self, attempt, kind=NETWORK, rng=random):
+        """Задержка перед следующей попыткой: экспоненциальный рост со случайным разбросом"""
+        base = self.base_delay
+        if kind in (THROTTLED, FORBIDDEN):
+            base *= self.throttle_factor
+        cap = min(self.max_delay, base * self.multiplier ** (attempt - 1))
+        return rng.uniform(cap / 2, cap)
+
+    def sleep_function(self):
+        """Функция задержки для retry_sleep_functions yt-dlp (n — номер повтора с 0)"""
+        return lambda n: min(self.max_delay, 1.0 * self.multiplier ** n) * random.uniform(0.5, 1.0)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=120.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_count = 0
+        # В полуоткрытом состоянии выполняется одна пробная попытка, остальные ждут её итога
+        self.probe_in_flight = False
+        self.probe_owner = None
+        self._lock = threading.Lock()
+
+    def allow(self, owner=None):
+        """Можно ли сейчас выполнять запросы к сервису; в HALF_OPEN занимает пробную попытку"""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                # Пробная попытка после паузы
+                self.state = self.HALF_OPEN
+            if self.state == self.OPEN:
+                return False
+            if self.state == self.HALF_OPEN:
+                if self.probe_in_flight:
+                    return False
+                self.probe_in_flight = True
+                self.probe_owner = owner
+            return True
+
+    def is_open(self):
+        """Закрыт ли сервис для новых задач; пробную попытку не занимает"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return self.clock() - self.opened_at < self.reset_timeout
+            return self.state == self.HALF_OPEN and self.probe_in_flight
+
+    def holds_probe(self, owner):
+        """Занята ли пробная попытка владельцем owner"""
+        with self._lock:
+            return self.probe_in_flight and self.probe_owner is owner
+
+    def release_probe(self, owner):
+        """Освободить пробную попытку без итога (отмена, прерывание)"""
+        with self._lock:
+            if self.probe_in_flight and self.probe_owner is owner:
+                self.probe_in_flight = False
+                self.probe_owner = None
+
+    def remaining(self):
+        """Сколько секунд осталось до пробной попытки"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+    def record_success(self):
+        """Учесть успешную попытку"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+            self.probe_owner = None
+
+    def record_failure(self, kind):
+        """Учесть неудачную попытку"""
+        with self._lock:
+            # Пробная попытка завершилась: следующая решит, закрывать ли breaker
+            self.probe_in_flight = False
+            self.probe_owner = None
+            if kind not in BREAKER_KINDS:
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.open_count += 1
+                    metrics.inc(f'circuit.opened.{self.name}')
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def to_dict(self):
+        """Состояние для метрик"""
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'open_count': self.open_count,
+            'remaining': round(self.remaining(), 1),
+        }
+
+
+class BreakerRegistry:
+    def __init__(self, failure_threshold=3, reset_timeout=120.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def get(self, name):
+        """Получить circuit breaker сервиса/хоста (создаётся при первом обращении)"""
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+                self._breakers[name] = breaker
+            return breaker
+
+    def configure(self, failure_threshold, reset_timeout):
+        """Обновить параметры для всех circuit breaker"""
+        with self._lock:
+            self.failure_threshold = failure_threshold
+            self.reset_timeout = reset_timeout
+            for breaker in self._breakers.values():
+                breaker.failure_threshold = failure_threshold
+                breaker.reset_timeout = reset_timeout
+
+    def to_dict(self):
+        """Состояние всех circuit breaker для метрик"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.name: b.to_dict() for b in breakers}
+
+
+class RetryScheduler:
+    def __init__(self, policy=None, breakers=None):
+        self.policy = policy or RetryPolicy()
+        self.breakers = breakers or BreakerRegistry()
+        # Пробная попытка текущего run(): (breaker, владелец), пока итог не известен
+        self._probe = None
+
+    def probe_passed(self):
+        """Первый запрос пробной попытки успешен — закрыть breaker, не дожидаясь конца задачи"""
+        probe, self._probe = self._probe, None
+        if probe is not None and probe[0].holds_probe(probe[1]):
+            probe[0].record_success()
+
+    def run(self, host, func, cancel_event=None, on_retry=None, on_pause=None):
+        """Выполнить func с повторами; пауза, пока circuit breaker хоста открыт"""
+        cancel_event = cancel_event or threading.Event()
+        breaker = self.breakers.get(host)
+        owner = object()
+        attempt = 0
+
+        while True:
+            while not breaker.allow(owner):
+                # Ожидание итога пробной попытки другой задачи — без сообщения о паузе
+                if on_pause and breaker.state == breaker.OPEN:
+                    on_pause(breaker.remaining())
+                if cancel_event.wait(min(max(breaker.remaining(), 0.05), 5.0)):
+                    raise CircuitOpenError(f"Отменено во время паузы сервиса {host}")
+
+            attempt += 1
+            metrics.inc('retry.attempts')
+            self._probe = (breaker, owner) if breaker.holds_probe(owner) else None
+            try:
+                result = func()
+            except Exception as e:
+                kind = classify_error(e)
+                metrics.inc(f'retry.errors.{kind}')
+                breaker.record_failure(kind)
+                if cancel_event.is_set() or not self.policy.should_retry(kind, attempt):
+                    raise
+                delay = self.policy.delay(attempt, kind)
+                metrics.inc('retry.retries')
+                if on_retry:
+                    on_retry(attempt, kind, delay, e)
+                if cancel_event.wait(delay):
+                    raise
+                continue
+            except BaseException:
+                # Прерывание без итога (KeyboardInterrupt и т. п.) не держит пробу навсегда
+                breaker.release_probe(owner)
+                raise
+            finally:
+                self._probe = None
+
+            breaker.record_success()
+            return result
+
+
+# Общий реестр circuit breaker для всех загрузчиков приложения
+breakers = BreakerRegistry()
+metrics.register_section('circuit_breakers', breakers.to_dict)
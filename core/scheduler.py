@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль планировщика задач загрузки
+"""
+
+import collections
+import itertools
+import threading
+import time
+
+from core.jobs import PRIORITIES, RUNNING, COMPLETED, ERROR, CANCELED
+from core.metrics import metrics
+from core.retry import breakers
+
+
+class SlotWaitCancelled(Exception):
+    """Ожидание слота сервиса отменено"""
+
+
+class ServiceSlots:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._limits = {}
+        self._active = {}
+
+    def set_limit(self, service, limit):
+        """Установить максимум одновременных задач сервиса"""
+        with self._lock:
+            self._limits[service] = max(1, int(limit))
+            self._changed.notify_all()
+
+    def active(self, service):
+        """Количество выполняющихся задач сервиса"""
+        with self._lock:
+            return self._active.get(service, 0)
+
+    def try_acquire(self, service, extra=0):
+        """Занять слот без ожидания (True при успехе); extra — сколько слотов можно сверх лимита"""
+        with self._lock:
+            return self._try_acquire_locked(service, extra)
+
+    def _try_acquire_locked(self, service, extra=0):
+        active = self._active.get(service, 0)
+        if active >= self._limits.get(service, 1) + extra:
+            return False
+        self._active[service] = active + 1
+        metrics.set_gauge(f'jobs.active.{service}', active + 1)
+        return True
+
+    def acquire(self, service, cancel_event=None, on_wait=None):
+        """Занять слот сервиса, дождавшись освобождения при необходимости"""
+        with self._lock:
+            notified = False
+            while not self._try_acquire_locked(service):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise SlotWaitCancelled(f"Ожидание слота {service} отменено")
+                if on_wait and not notified:
+                    on_wait()
+                    notified = True
+                self._changed.wait(timeout=0.5)
+
+    def release(self, service):
+        """Освободить слот сервиса"""
+        with self._lock:
+            active = max(self._active.get(service, 0) - 1, 0)
+            self._active[service] = active
+            metrics.set_gauge(f'jobs.active.{service}', active)
+            self._changed.notify_all()
+
+
+# Общие слоты сервисов для всех загрузчиков приложения
+service_slots = ServiceSlots()
+
+
+class JobScheduler:
+    def __init__(self, slots=None, breakers=None, max_workers=3, keep_finished=1000,
+                 windows=None, tick_interval=15.0, interactive_extra=1):
+        self.slots = slots or service_slots
+        self.breakers = breakers
+        self.max_workers = max_workers
+        # Сколько интерактивных задач может выполняться сверх лимитов потоков и слотов;
+        # следующие ждут в очереди впереди остальных
+        self.interactive_extra = interactive_extra
+        # Временные окна для фоновых задач (WindowPolicy или None)
+        self.windows = windows
+        self.tick_interval = tick_interval
+        # Вызывается при постановке задачи на паузу и снятии с паузы: (job, paused)
+        self.on_pause_change = None
+        # Вызывается при смене временного окна: (window или None, выполняющиеся задачи)
+        self.on_window_change = None
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        # Очереди по приоритету и сервису: {rank: {service: deque[(seq, job)]}}
+        self._queues = {rank: {} for rank in sorted(PRIORITIES.values())}
+        self._queued = 0
+        self._seq = itertools.count()
+        self._running = {}
+        self._finished = collections.deque(maxlen=keep_finished)
+        self._workers = 0
+        self._idle = 0
+        self._window = None
+        self._clock = None
+
+    def submit(self, job, runner):
+        """Поставить задачу в очередь; runner(job) выполняется в рабочем потоке"""
+        with self._lock:
+            job.runner = runner
+            services = self._queues[job.rank]
+            services.setdefault(job.service, collections.deque()).append((next(self._seq), job))
+            self._queued += 1
+            metrics.inc('jobs.submitted')
+            self._update_preemption_locked()
+            self._spawn_worker_locked(job)
+            self._start_clock_locked()
+            self._changed.notify_all()
+        return job
+
+    def refresh(self):
+        """Пересчитать окно, паузы и рабочие потоки (вызывается по таймеру)"""
+        with self._lock:
+            window = self.windows.active_window() if self.windows else None
+            if window is not self._window:
+                self._window = window
+                if self.on_window_change:
+                    self.on_window_change(window, list(self._running.values()))
+            self._update_preemption_locked()
+            for _ in range(self._queued):
+                if self._workers >= self._max_workers_locked():
+                    break
+                self._workers += 1
+                threading.Thread(target=self._worker, daemon=True).start()
+            self._changed.notify_all()
+
+    def active_window(self):
+        """Текущее временное окно или None"""
+        return self.windows.active_window() if self.windows else None
+
+    def bulk_allowed(self):
+        """Можно ли сейчас выполнять фоновые задачи"""
+        return self.windows is None or self.windows.bulk_allowed()
+
+    def _max_workers_locked(self):
+        if self.windows is None:
+            return self.max_workers
+        return self.windows.max_workers(self.max_workers)
+
+    def _start_clock_locked(self):
+        """Запустить таймер, отслеживающий границы временных окон"""
+        if self._clock is not None:
+            return
+        self._clock = threading.Thread(target=self._clock_loop, daemon=True)
+        self._clock.start()
+
+    def _clock_loop(self):
+        stop = threading.Event()
+        while not stop.wait(self.tick_interval):
+            self.refresh()
+
+    def cancel(self, job):
+        """Отменить задачу: из очереди удаляется сразу, выполняющаяся прерывается"""
+        with self._lock:
+            queue = self._queues[job.rank].get(job.service)
+            if queue is not None:
+                for item in queue:
+                    if item[1] is job:
+                        queue.remove(item)
+                        self._queued -= 1
+                        job.state = CANCELED
+                        job.finished = time.time()
+                        self._finished.append(job)
+                        self._update_preemption_locked()
+                        self._changed.notify_all()
+                        return
+        job.cancel_event.set()
+        job.resume_event.set()
+
+    def queued_count(self):
+        """Количество задач в очереди"""
+        with self._lock:
+            return self._queued
+
+    def running_jobs(self):
+        """Выполняющиеся задачи"""
+        with self._lock:
+            return list(self._running.values())
+
+    def jobs(self):
+        """Все известные задачи: выполняющиеся, ожидающие (по приоритету) и завершённые"""
+        with self._lock:
+            result = list(self._running.values())
+            for rank in self._queues:
+                queued = [item for queue in self._queues[rank].values() for item in queue]
+                queued.sort(key=lambda item: item[0])
+                result.extend(job for _, job in queued)
+            result.extend(reversed(self._finished))
+            return result
+
+    def _spawn_worker_locked(self, job):
+        """Запустить рабочий поток, если свободных нет"""
+        if self._idle > 0:
+            return
+        # Интерактивная задача получает поток сверх лимита, но не больше interactive_extra
+        limit = self._max_workers_locked()
+        if job.priority == 'interactive':
+            limit += self.interactive_extra
+        if self._workers >= limit:
+            return
+        self._workers += 1
+        thread = threading.Thread(target=self._worker, daemon=True)
+        thread.start()
+
+    def _can_start_locked(self, job):
+        """Можно ли сейчас запустить задачу (circuit breaker и слоты сервиса)
+
+        Пробную попытку breaker не занимает: её берёт RetryScheduler.run задачи
+        """
+        if self.breakers is not None and self.breakers.get(job.service).is_open():
+            return False
+        # Фоновые задачи запускаются только внутри временных окон
+        if job.priority == 'bulk' and not self.bulk_allowed():
+            return False
+        # Интерактивная задача занимает слот сверх лимита (не больше interactive_extra):
+        # фоновые задачи этого сервиса в это время стоят на паузе
+        extra = self.interactive_extra if job.priority == 'interactive' else 0
+        return self.slots.try_acquire(job.service, extra)
+
+    def _next_job_locked(self):
+        """Выбрать следующую задачу: высший приоритет, затем порядок постановки"""
+        for rank, services in self._queues.items():
+            candidates = sorted((queue[0][0], service) for service, queue in services.items() if queue)
+            for _seq, service in candidates:
+                queue = services[service]
+                job = queue[0][1]
+                if self._can_start_locked(job):
+                    queue.popleft()
+                    self._queued -= 1
+                    return job
+        return None
+
+    def _update_preemption_locked(self):
+        """Поставить фоновые задачи на паузу, пока есть интерактивные или вне временного окна"""
+        urgent = any(queue for queue in self._queues[PRIORITIES['interactive']].values()) or any(
+            job.priority == 'interactive' for job in self._running.values())
+        reason = 'interactive' if urgent else None
+        if reason is None and not self.bulk_allowed():
+            reason = 'window'
+        for job in self._running.values():
+            if job.priority != 'bulk' or job.cancel_event.is_set():
+                continue
+            if reason and not job.paused:
+                job.pause_reason = reason
+                job.resume_event.clear()
+                if self.on_pause_change:
+                    self.on_pause_change(job, True)
+            elif reason:
+                job.pause_reason = reason
+            elif job.paused:
+                job.pause_reason = None
+                job.resume_event.set()
+                if self.on_pause_change:
+                    self.on_pause_change(job, False)
+
+    def _worker(self):
+        """Рабочий поток: берёт задачи из очереди, пока она не опустеет"""
+        while True:
+            with self._lock:
+                self._idle += 1
+                job = self._next_job_locked()
+                while job is None:
+                    if self._queued == 0:
+                        self._idle -= 1
+                        self._workers -= 1
+                        return
+                    self._changed.wait(timeout=0.5)
+                    job = self._next_job_locked()
+                self._idle -= 1
+                job.state = RUNNING
+                job.started = time.time()
+                self._running[job.id] = job
+                metrics.set_gauge('jobs.running', len(self._running))
+                self._update_preemption_locked()
+
+            try:
+                job.runner(job)
+            except Exception as e:
+                job.state = ERROR
+                job.error = str(e)
+            finally:
+                with self._lock:
+                    self._running.pop(job.id, None)
+                    if not job.is_finished:
+                        job.state = COMPLETED
+                    job.finished = time.time()
+                    self._finished.append(job)
+                    self.slots.release(job.service)
+                    metrics.set_gauge('jobs.running', len(self._running))
+                    metrics.inc(f'jobs.{job.state}')
+                    self._update_preemption_locked()
+                    self._changed.notify_all()
+
+
+# Общий планировщик задач для всех загрузчиков приложения
+job_scheduler = JobScheduler(service_slots, breakers)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль загрузки фрагмента видео (диапазон времени вместо файла целиком)
+"""
+
+import re
+
+from core.planner import entry_size, format_size
+
+try:
+    from yt_dlp.utils import download_range_func
+    YT_DLP_AVAILABLE = True
+except ImportError:
+    YT_DLP_AVAILABLE = False
+
+
+_TIME = re.compile(r'^(?:(?:(\d+):)?(\d{1,2}):)?(\d+(?:[.,]\d+)?)$')
+
+
+def parse_time(text):
+    """'90', '1:30', '1:02:03.5' -> секунды (пустая строка -> None)"""
+    text = (text or '').strip()
+    if not text:
+        return None
+    match = _TIME.match(text)
+    if not match:
+        raise ValueError(f"Неверное время: {text} (ожидается чч:мм:сс, мм:сс или секунды)")
+    hours, minutes, seconds = match.groups()
+    value = int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds.replace(',', '.'))
+    if (minutes and float(seconds.replace(',', '.')) >= 60) or (hours and int(minutes) >= 60):
+        raise ValueError(f"Неверное время: {text}")
+    return value
+
+
+def format_time(seconds):
+    """Секунды -> 'Ч:ММ:СС' или 'М:СС'"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def parse_section(start_text, end_text):
+    """Начало и конец фрагмента из полей ввода: [start, end] или None (видео целиком).
+
+    Пустое начало — с начала видео, пустой конец — до конца видео.
+    """
+    start = parse_time(start_text)
+    end = parse_time(end_text)
+    if start is None and end is None:
+        return None
+    start = start or 0
+    if end is not None and end <= start:
+        raise ValueError("Конец фрагмента должен быть позже начала")
+    return [start, end]
+
+
+def format_section(section):
+    start, end = section
+    return f"{format_time(start)}–{format_time(end) if end is not None else '…'}"
+
+
+def ydl_options(section, precise=False):
+    """Опции yt-dlp: скачать только диапазон времени.
+
+    yt-dlp передаёт загрузку ffmpeg с позиционированием, и тот читает только
+    нужные байты (HTTP Range) или фрагменты DASH/HLS. precise — резать
+    по точному времени, перекодируя края, а не по ближайшим ключевым кадрам.
+    """
+    start, end = section
+    return {
+        'download_ranges': download_range_func(None, [(start, end if end is not None
+                                                       else float('inf'))]),
+        'force_keyframes_at_cuts': bool(precise),
+    }
+
+
+def outtmpl_with_section(outtmpl, section):
+    """Шаблон имени с диапазоном: фрагменты одного видео не перезаписывают друг друга"""
+    # Открытый конец у yt-dlp — бесконечность, в имя файла она не попадает
+    suffix = ' [%(section_start)d-%(section_end)d]' if section[1] is not None \
+        else ' [%(section_start)d-]'
+    if outtmpl.endswith('.%(ext)s'):
+        return outtmpl[:-len('.%(ext)s')] + suffix + '.%(ext)s'
+    return outtmpl + suffix
+
+
+class SectionReport:
+    """Сколько байт скачано для фрагмента и сколько весило бы видео целиком"""
+
+    def __init__(self, section):
+        self.section = section
+        self.full_bytes = 0
+        self.downloaded_bytes = 0
+        self._entries = set()
+
+    def update(self, d):
+        """Учесть событие 'finished' хука прогресса yt-dlp"""
+        if d.get('status') != 'finished':
+            return
+        self.downloaded_bytes += d.get('total_bytes') or d.get('downloaded_bytes') or 0
+        info = d.get('info_dict') or {}
+        # ffmpeg скачивает видео и звук одним вызовом (info с requested_formats)
+        # или по формату за раз; повторное событие того же формата не учитывается
+        key = (info.get('id'), info.get('section_start'), info.get('format_id'))
+        if key in self._entries:
+            return
+        self._entries.add(key)
+        size, _approx = entry_size(info)
+        self.full_bytes += size or 0
+
+    @property
+    def saved_bytes(self):
+        if not self.full_bytes:
+            return None
+        return max(self.full_bytes - self.downloaded_bytes, 0)
+
+    def message(self):
+        saved = self.saved_bytes
+        text = (f"Фрагмент {format_section(self.section)}: скачано "
+                f"{format_size(self.downloaded_bytes)}")
+        if saved is None:
+            return text + " (размер видео целиком неизвестен)"
+        percent = saved / self.full_bytes * 100
+        return (text + f" вместо {format_size(self.full_bytes)}, сэкономлено "
+                       f"{format_size(saved)} ({percent:.0f}%)")
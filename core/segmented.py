@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль многопоточной загрузки файла по диапазонам байт (HTTP Range)
+"""
+
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+from urllib.parse import urljoin
+
+from core.connections import http_pool
+from core.hashing import StreamHasher, file_hashes
+
+try:
+    from yt_dlp.downloader.common import FileDownloader
+    from yt_dlp.downloader.http import HttpFD
+    from yt_dlp.downloader import external as _external
+    YT_DLP_AVAILABLE = True
+except ImportError:
+    YT_DLP_AVAILABLE = False
+
+
+# Имя для external_downloader в опциях yt-dlp
+EXTERNAL_NAME = 'vdsegmented'
+
+# Размер части файла, запрашиваемой одним Range-запросом
+PIECE_SIZE = 8 * 1024 * 1024
+# Меньше этого файл не делится на части
+MIN_PIECE_SIZE = 1024 * 1024
+READ_CHUNK = 256 * 1024
+# Как часто сохранять состояние частей (байт)
+STATE_SAVE_BYTES = 4 * 1024 * 1024
+# Сколько перенаправлений проходит один запрос
+MAX_REDIRECTS = 5
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+# Сетевые опции yt-dlp, которых нет у пула соединений: с ними файл качает HttpFD
+NATIVE_ONLY_PARAMS = ('proxy', 'nocheckcertificate', 'source_address')
+
+
+class SegmentedError(Exception):
+    """Ошибка многопоточной загрузки"""
+
+
+def parse_content_range(value):
+    """Разобрать 'bytes a-b/total' в (a, b, total или None)"""
+    unit, _, spec = (value or '').partition(' ')
+    if unit.lower() != 'bytes' or '/' not in spec:
+        return None
+    span, _, total = spec.partition('/')
+    if '-' not in span:
+        return None
+    start, _, end = span.partition('-')
+    return int(start), int(end), (int(total) if total.isdigit() else None)
+
+
+def plan_pieces(size, segments, piece_size=PIECE_SIZE):
+    """Разбить файл на части (start, end) включительно"""
+    if size <= 0:
+        return []
+    # Части не крупнее, чем нужно для загрузки всеми соединениями, и не мельче MIN_PIECE_SIZE
+    per_connection = -(-size // max(1, segments))
+    piece_size = max(MIN_PIECE_SIZE, min(piece_size, per_connection))
+    return [(start, min(start + piece_size, size) - 1) for start in range(0, size, piece_size)]
+
+
+def _write_at(fd, data, offset, lock):
+    """Записать данные по смещению (pwrite или seek+write под блокировкой)"""
+    if hasattr(os, 'pwrite'):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+        return
+    with lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        os.write(fd, data)
+
+
+class SegmentedDownload:
+    def __init__(self, url, path, headers=None, segments=4, piece_size=PIECE_SIZE,
+                 timeout=30.0, retries=5, progress=None, cancel_event=None, ratelimit=None,
+                 pool=None, hash_stream=False, resume_event=None):
+        """progress(загружено, всего) вызывается из потока run(); ratelimit() — байт/с или None.
+
+        hash_stream — считать хеш файла по мере записи (см. digest).
+        resume_event — снят, пока задача на паузе: соединения останавливаются между блоками.
+        """
+        self.url = url
+        self.path = path
+        self.state_path = path + '.segments.json'
+        self.headers = dict(headers or {})
+        self.segments = max(1, segments)
+        self.piece_size = piece_size
+        self.retries = retries
+        self.progress = progress
+        self.cancel_event = cancel_event or threading.Event()
+        self.resume_event = resume_event
+        self.ratelimit = ratelimit
+        self.timeout = timeout
+        # Соединения берутся из общего пула и переиспользуются следующими загрузками
+        self.pool = pool or http_pool
+
+        self.size = None
+        self.pieces = []
+        self.done = {}
+        self.resumed_bytes = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._errors = []
+        self._unsaved = 0
+        self._started = None
+        self._paused_at = None
+        self.hasher = StreamHasher() if hash_stream else None
+
+    @property
+    def downloaded(self):
+        with self._lock:
+            return sum(self.done.values())
+
+    @property
+    def digest(self):
+        """Хеш скачанного файла или None (не считался или продолжена прерванная загрузка)"""
+        if self.hasher is None:
+            return None
+        return self.hasher.hexdigest(self.downloaded)
+
+    def run(self, probed=None):
+        """Скачать файл; возвращает размер. probed — уже полученный итог probe()"""
+        self._started = time.monotonic()
+        size, ranges = probed or self.probe()
+        if size is None or not ranges:
+            return self._run_single(size)
+        return self._run_segmented(size)
+
+    def probe(self):
+        """Узнать размер и поддержку Range запросом первого байта.
+
+        Ссылка после перенаправлений запоминается: части запрашиваются сразу по ней.
+        """
+        url, conn, response = self._request(dict(self.headers, Range='bytes=0-0'))
+        try:
+            if response.status == 206:
+                response.read()
+                self.pool.put(url, conn)
+                self.url = url
+                content_range = parse_content_range(response.getheader('Content-Range'))
+                return (content_range[2] if content_range else None), True
+            if response.status == 200:
+                # Range не поддерживается: тело не дочитываем, соединение закрываем
+                length = response.getheader('Content-Length')
+                conn.close()
+                self.url = url
+                return (int(length) if length and length.isdigit() else None), False
+            conn.close()
+            raise SegmentedError(f"HTTP {response.status} {response.reason}")
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            raise
+
+    def _request(self, headers):
+        """GET через пул с переходом по перенаправлениям: (итоговая ссылка, соединение, ответ)"""
+        url = self.url
+        for _ in range(MAX_REDIRECTS + 1):
+            conn, response = self.pool.request(url, headers, timeout=self.timeout)
+            if response.status not in REDIRECT_CODES:
+                return url, conn, response
+            location = response.getheader('Location')
+            try:
+                # Тело перенаправления короткое: дочитать и вернуть соединение в пул
+                response.read()
+            except BaseException:
+                conn.close()
+                raise
+            self.pool.put(url, conn)
+            if not location:
+                raise SegmentedError(f"HTTP {response.status} без Location")
+            url = urljoin(url, location)
+        raise SegmentedError(f"Больше {MAX_REDIRECTS} перенаправлений")
+
+    def _load_state(self, size):
+        """Прочитать сохранённое состояние частей, если оно относится к тому же файлу"""
+        if not os.path.exists(self.state_path) or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if state.get('size') != size or state.get('pieces') != [list(p) for p in self.pieces]:
+            return {}
+        return {int(index): done for index, done in state.get('done', {}).items()}
+
+    def _save_state(self):
+        with self._lock:
+            state = {'size': self.size, 'pieces': [list(p) for p in self.pieces],
+                     'done': {str(index): done for index, done in self.done.items()}}
+            self._unsaved = 0
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _run_segmented(self, size):
+        self.size = size
+        self.pieces = plan_pieces(size, self.segments, self.piece_size)
+        self.done = self._load_state(size)
+        self.resumed_bytes = sum(self.done.values())
+        if self.resumed_bytes:
+            # Байты прошлого запуска в хеш не попали
+            self.hasher = None
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            os.ftruncate(fd, size)
+            work = queue.Queue()
+            for index, (start, end) in enumerate(self.pieces):
+                if self.done.get(index, 0) < end - start + 1:
+                    work.put(index)
+
+            workers = [threading.Thread(target=self._worker, args=(fd, work), daemon=True)
+                       for _ in range(min(self.segments, work.qsize()))]
+            for worker in workers:
+                worker.start()
+            try:
+                while any(worker.is_alive() for worker in workers):
+                    if self.cancel_event.wait(0.25):
+                        raise SegmentedError("Загрузка отменена")
+                    self._report()
+            finally:
+                self._stop.set()
+                for worker in workers:
+                    worker.join()
+                self._save_state()
+        finally:
+            os.close(fd)
+
+        if self._errors:
+            raise SegmentedError(self._errors[0])
+        if self.downloaded != size:
+            raise SegmentedError(f"Скачано {self.downloaded} из {size} байт")
+        os.remove(self.state_path)
+        self._report()
+        return size
+
+    def _worker(self, fd, work):
+        """Рабочий поток: берёт части из очереди и скачивает их по keep-alive соединению"""
+        while not self._stop.is_set():
+            try:
+                index = work.get_nowait()
+            except queue.Empty:
+                return
+            attempt = 0
+            while not self._stop.is_set():
+                try:
+                    if self._fetch_piece(fd, index):
+                        break
+                    # Пауза: часть докачивается с того же места после продолжения
+                    self._wait_resume()
+                except (OSError, http.client.HTTPException, SegmentedError) as e:
+                    attempt += 1
+                    if attempt > self.retries:
+                        with self._lock:
+                            self._errors.append(f"Часть {index}: {e}")
+                        self._stop.set()
+                        return
+                    self._stop.wait(min(2 ** attempt * 0.25, 5.0))
+
+    def _fetch_piece(self, fd, index):
+        """Скачать часть; False — прервано паузой или остановкой"""
+        start, end = self.pieces[index]
+        offset = start + self.done.get(index, 0)
+        if offset > end:
+            return True
+        headers = dict(self.headers, Range=f'bytes={offset}-{end}')
+        url, conn, response = self._request(headers)
+        try:
+            content_range = parse_content_range(response.getheader('Content-Range'))
+            if response.status != 206 or not content_range or content_range[0] != offset:
+                raise SegmentedError(f"Неожиданный ответ на Range: HTTP {response.status}")
+
+            while offset <= end:
+                if self._stop.is_set() or self.paused:
+                    # Ответ не дочитан — соединение нельзя вернуть в пул; на паузе
+                    # оно не держится открытым, а полоса отдаётся другим задачам
+                    conn.close()
+                    return False
+                data = response.read(min(READ_CHUNK, end - offset + 1))
+                if not data:
+                    raise SegmentedError("Соединение закрыто до конца части")
+                _write_at(fd, data, offset, self._write_lock)
+                if self.hasher is not None:
+                    self.hasher.update_at(offset, data)
+                offset += len(data)
+                with self._lock:
+                    self.done[index] = offset - start
+                    self._unsaved += len(data)
+                    save = self._unsaved >= STATE_SAVE_BYTES
+                if save:
+                    self._save_state()
+                self._throttle()
+            response.read()
+            self.pool.put(url, conn)
+            return True
+        except BaseException:
+            conn.close()
+            raise
+
+    @property
+    def paused(self):
+        return self.resume_event is not None and not self.resume_event.is_set()
+
+    def _wait_resume(self):
+        """Ждать снятия паузы (или остановки); время паузы не считается для ratelimit"""
+        if not self.paused:
+            return
+        with self._lock:
+            if self._paused_at is None:
+                self._paused_at = time.monotonic()
+        while not self.resume_event.wait(0.25):
+            if self._stop.is_set() or self.cancel_event.is_set():
+                return
+        with self._lock:
+            if self._paused_at is not None:
+                self._started += time.monotonic() - self._paused_at
+                self._paused_at = None
+
+    def _throttle(self):
+        """Общее ограничение скорости для всех соединений"""
+        limit = self.ratelimit() if self.ratelimit else None
+        if not limit:
+            return
+        elapsed = time.monotonic() - self._started
+        expected = (self.downloaded - self.resumed_bytes) / limit
+        if expected > elapsed:
+            self._stop.wait(expected - elapsed)
+
+    def _run_single(self, size):
+        """Загрузка одним запросом (сервер не поддерживает Range или размер неизвестен)"""
+        self.size = size
+        url, conn, response = self._request(self.headers)
+        try:
+            if response.status != 200:
+                raise SegmentedError(f"HTTP {response.status} {response.reason}")
+            self.pieces = [(0, (size or 0) - 1)]
+            with open(self.path, 'wb') as f:
+                while True:
+                    if self.cancel_event.is_set():
+                        raise SegmentedError("Загрузка отменена")
+                    data = response.read(READ_CHUNK)
+                    if not data:
+                        break
+                    f.write(data)
+                    if self.hasher is not None:
+                        self.hasher.update(data)
+                    with self._lock:
+                        self.done[0] = self.done.get(0, 0) + len(data)
+                    if self.paused:
+                        # Без Range докачать нельзя: соединение ждёт открытым
+                        self._wait_resume()
+                    self._throttle()
+                    self._report()
+            self.pool.put(url, conn)
+        except BaseException:
+            conn.close()
+            raise
+        if size is not None and self.downloaded != size:
+            raise SegmentedError(f"Скачано {self.downloaded} из {size} байт")
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return self.downloaded
+
+    def _report(self):
+        if self.progress:
+            self.progress(self.downloaded, self.size)
+
+
+if YT_DLP_AVAILABLE:
+    class SegmentedFD(FileDownloader):
+        """Загрузчик для yt-dlp: файл по HTTP скачивается несколькими соединениями"""
+
+        EXE_NAME = EXTERNAL_NAME
+
+        @classmethod
+        def get_basename(cls):
+            return EXTERNAL_NAME
+
+        @classmethod
+        def available(cls, path=None):
+            return True
+
+        @classmethod
+        def supports(cls, info_dict):
+            # Фрагмент по времени скачивает ffmpeg с позиционированием
+            return (info_dict.get('protocol') in ('http', 'https')
+                    and not info_dict.get('is_live')
+                    and not info_dict.get('to_stdout')
+                    and info_dict.get('section_start') is None
+                    and info_dict.get('section_end') is None)
+
+        @classmethod
+        def can_download(cls, info_dict, path=None):
+            return cls.supports(info_dict)
+
+        def real_download(self, filename, info_dict):
+            if any(self.params.get(name) for name in NATIVE_ONLY_PARAMS):
+                return self._native_download(filename, info_dict)
+            tmpfilename = self.temp_name(filename)
+            headers = dict(info_dict.get('http_headers') or {})
+            cookiejar = getattr(self.ydl, 'cookiejar', None)
+            if cookiejar is not None and hasattr(cookiejar, 'get_cookie_header'):
+                cookie = cookiejar.get_cookie_header(info_dict['url'])
+                if cookie:
+                    headers['Cookie'] = cookie
+
+            retries = self.params.get('retries', 10)
+            if not isinstance(retries, int):
+                retries = 10
+            started = time.time()
+
+            def progress(downloaded, total):
+                now = time.time()
+                fresh = downloaded - download.resumed_bytes
+                self._hook_progress({
+                    'status': 'downloading',
+                    'downloaded_bytes': downloaded,
+                    'total_bytes': total,
+                    'filename': filename,
+                    'tmpfilename': tmpfilename,
+                    'elapsed': now - started,
+                    'speed': self.calc_speed(started, now, fresh),
+                    'eta': self.calc_eta(started, now, (total or 0) - download.resumed_bytes, fresh)
+                    if total else None,
+                }, info_dict)
+
+            download = SegmentedDownload(
+                info_dict['url'], tmpfilename, headers,
+                segments=self.params.get('vd_segments', 4),
+                retries=retries,
+                timeout=self.params.get('socket_timeout') or 30.0,
+                progress=progress,
+                # Лимит читается на каждом блоке: его можно менять во время загрузки
+                ratelimit=lambda: self.params.get('ratelimit'),
+                hash_stream=self.params.get('vd_hash', False),
+                # Пауза фоновой задачи останавливает и соединения по частям
+                resume_event=self.params.get('vd_resume_event'),
+            )
+            # Части качаются, только если сервер отдал 206 на Range-запрос (после
+            # перенаправлений); при любой ошибке проверки файл качает HttpFD
+            try:
+                probed = download.probe()
+            except (OSError, http.client.HTTPException, SegmentedError) as e:
+                self.report_warning(f'[{EXTERNAL_NAME}] {e}: используется встроенный загрузчик')
+                return self._native_download(filename, info_dict)
+            if probed[0] is None or not probed[1]:
+                return self._native_download(filename, info_dict)
+            self.to_screen(f'[{EXTERNAL_NAME}] {download.segments} соединений: {filename}')
+            total = download.run(probed)
+            self.try_rename(tmpfilename, filename)
+            if download.digest:
+                file_hashes.remember(filename, download.digest)
+            self._hook_progress({
+                'status': 'finished',
+                'downloaded_bytes': total,
+                'total_bytes': total,
+                'filename': filename,
+                'elapsed': time.time() - started,
+            }, info_dict)
+            return True
+
+        def _native_download(self, filename, info_dict):
+            """Скачать файл встроенным загрузчиком yt-dlp с теми же хуками прогресса"""
+            fd = HttpFD(self.ydl, self.params)
+            for hook in self._progress_hooks:
+                fd.add_progress_hook(hook)
+            return fd.real_download(filename, info_dict)
+
+
+def register():
+    """Зарегистрировать загрузчик в yt-dlp под именем EXTERNAL_NAME.
+
+    Публичного способа добавить загрузчик у yt-dlp нет: external_downloader
+    принимает только имя, которое ищется в закрытом реестре _BY_NAME. Если после
+    обновления yt-dlp реестра нет или имя по нему не находится, возвращается
+    False, и файлы качает встроенный загрузчик yt-dlp.
+    """
+    global _fallback_reported
+    if not YT_DLP_AVAILABLE:
+        return False
+    registry = getattr(_external, '_BY_NAME', None)
+    lookup = getattr(_external, 'get_external_downloader', None)
+    if isinstance(registry, dict):
+        registry[EXTERNAL_NAME] = SegmentedFD
+        try:
+            found = lookup(EXTERNAL_NAME) if lookup is not None else SegmentedFD
+        except Exception:
+            found = None
+        if found is SegmentedFD:
+            return True
+        registry.pop(EXTERNAL_NAME, None)
+    if not _fallback_reported:
+        _fallback_reported = True
+        print(f"yt-dlp не поддерживает регистрацию {EXTERNAL_NAME}: "
+              f"используется встроенный загрузчик")
+    return False
+
+
+# Сообщение о недоступной регистрации выводится один раз
+_fallback_reported = False
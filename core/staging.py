@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль промежуточной папки (staging) для загрузок
+"""
+
+import os
+import shutil
+
+from core.hashing import StreamHasher, file_hashes, hash_file
+
+
+# Размер блока при копировании между устройствами
+COPY_CHUNK = 4 * 1024 * 1024
+
+
+class StagingError(Exception):
+    """Ошибка переноса файла из промежуточной папки"""
+
+
+def copy_verified(src, dst, chunk_size=COPY_CHUNK, hasher=None, expected_digest=None):
+    """Скопировать файл одним последовательным проходом и проверить результат.
+
+    hasher получает прочитанные блоки: хеш считается тем же проходом, что и копия.
+    С expected_digest (хеш, посчитанный при загрузке) копия сверяется и по нему.
+    """
+    tmp = dst + '.vdtmp'
+    expected = os.path.getsize(src)
+    if expected_digest and hasher is None:
+        hasher = StreamHasher()
+    with open(src, 'rb') as fin, open(tmp, 'wb') as fout:
+        while True:
+            chunk = fin.read(chunk_size)
+            if not chunk:
+                break
+            fout.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+        fout.flush()
+        os.fsync(fout.fileno())
+
+    actual = os.path.getsize(tmp)
+    if actual != expected:
+        os.remove(tmp)
+        raise StagingError(f"Размер копии не совпадает: {actual} != {expected} ({dst})")
+    if expected_digest and hasher.hexdigest() != expected_digest:
+        os.remove(tmp)
+        raise StagingError(f"Хеш файла не совпадает с посчитанным при загрузке ({src})")
+
+    shutil.copystat(src, tmp)
+    os.replace(tmp, dst)
+    return dst
+
+
+def commit_file(src, staging_root, final_root, hasher=None, expected_digest=None):
+    """Перенести готовый файл из промежуточной папки в итоговую с тем же относительным путём.
+
+    hasher и expected_digest передаются в copy_verified при копировании между устройствами.
+    """
+    rel = os.path.relpath(src, staging_root)
+    dst = os.path.join(final_root, rel)
+    os.makedirs(os.path.dirname(dst) or final_root, exist_ok=True)
+
+    if os.stat(src).st_dev == os.stat(os.path.dirname(dst) or final_root).st_dev:
+        # Одно устройство — атомарное переименование
+        os.replace(src, dst)
+    else:
+        copy_verified(src, dst, hasher=hasher, expected_digest=expected_digest)
+        os.remove(src)
+    return dst
+
+
+class StagingArea:
+    def __init__(self, root, key):
+        self.root = root
+        self.path = os.path.abspath(os.path.join(root, key))
+        self.files = []
+        # Хеши перенесённых файлов: итоговый путь -> хеш
+        self.hashes = {}
+        os.makedirs(self.path, exist_ok=True)
+
+    def collect(self, filename):
+        """post_hook yt-dlp: запомнить готовый файл (после всех постпроцессоров)"""
+        if not filename:
+            return
+        filename = os.path.abspath(filename)
+        if filename not in self.files:
+            self.files.append(filename)
+
+    def commit_all(self, final_root, hash_files=False):
+        """Перенести все готовые файлы в итоговую папку по очереди (hash_files — с хешами)"""
+        committed = []
+        while self.files:
+            filename = self.files[0]
+            if os.path.exists(filename):
+                if hash_files:
+                    committed.append(self._commit_hashed(filename, final_root))
+                else:
+                    committed.append(commit_file(filename, self.path, final_root))
+            self.files.pop(0)
+        return committed
+
+    def _commit_hashed(self, filename, final_root):
+        """Перенести файл и узнать его хеш, не читая файл из итоговой папки"""
+        expected = file_hashes.take(filename)
+        hasher = StreamHasher()
+        dst = commit_file(filename, self.path, final_root, hasher, expected)
+        if hasher.size:
+            # Копия между устройствами: хеш посчитан при копировании
+            self.hashes[dst] = hasher.hexdigest()
+        elif expected:
+            self.hashes[dst] = expected
+        else:
+            # Переименование на том же устройстве, что и промежуточная папка
+            self.hashes[dst] = hash_file(dst)
+        return dst
+
+    def cleanup(self):
+        """Удалить промежуточные файлы задачи (.part, фрагменты, остатки слияния).
+
+        Если какие-то готовые файлы не удалось перенести, папка сохраняется.
+        """
+        if self.files:
+            return False
+        shutil.rmtree(self.path, ignore_errors=True)
+        return True
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль инкрементальной синхронизации плейлистов и каналов
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+def playlist_key(url):
+    """Ключ плейлиста для хранилища (не зависит от регистра и завершающего '/')"""
+    normalized = url.strip().rstrip('/').lower()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def archive_id(entry):
+    """Запись архива yt-dlp для элемента плейлиста: '<extractor> <id>'"""
+    video_id = entry.get('id')
+    extractor = entry.get('ie_key') or entry.get('extractor_key') or entry.get('extractor')
+    if not video_id or not extractor:
+        return None
+    return f"{extractor.lower()} {video_id}"
+
+
+def select_new_entries(entries, known, stop_after_known=10, limit=0):
+    """Выбрать новые элементы, прекращая обход после stop_after_known известных подряд.
+
+    entries может быть ленивым генератором: непросмотренные страницы не запрашиваются.
+    Возвращает (новые элементы, количество просмотренных).
+    """
+    new_entries = []
+    scanned = 0
+    known_in_row = 0
+    for entry in entries:
+        if entry is None:
+            continue
+        scanned += 1
+        record = archive_id(entry)
+        if record is not None and record in known:
+            known_in_row += 1
+            if known_in_row >= stop_after_known:
+                break
+            continue
+        known_in_row = 0
+        new_entries.append(entry)
+        if limit and len(new_entries) >= limit:
+            break
+    return new_entries, scanned
+
+
+class SyncStore:
+    def __init__(self, root=None):
+        self.root = Path(root) if root else Path.home() / '.vd_sync'
+        self.index_path = self.root / 'index.json'
+        self._lock = threading.Lock()
+
+    def archive_path(self, url):
+        """Файл архива yt-dlp (download_archive) с уже скачанными элементами плейлиста"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        return str(self.root / f"{playlist_key(url)}.txt")
+
+    def known_ids(self, url):
+        """Множество уже скачанных элементов плейлиста"""
+        path = self.archive_path(url)
+        if not os.path.exists(path):
+            return set()
+        with open(path, 'r', encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def record_sync(self, url, title=None, scanned=0, new_count=0):
+        """Запомнить результат синхронизации плейлиста"""
+        with self._lock:
+            index = self.load_index()
+            index[playlist_key(url)] = {
+                'url': url,
+                'title': title,
+                'last_sync': time.time(),
+                'scanned': scanned,
+                'new': new_count,
+            }
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.index_path)
+
+    def load_index(self):
+        """Сведения о синхронизированных плейлистах: {ключ: запись}"""
+        if not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Ошибка чтения индекса синхронизации: {e}")
+            return {}
+
+
+# Общее хранилище синхронизации приложения
+sync_store = SyncStore()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль истории скорости загрузки (кольцевые буферы на array, экспорт в CSV)
+"""
+
+import csv
+import threading
+import time
+from array import array
+
+from core.jobs import RUNNING, PAUSED
+from core.metrics import metrics
+
+
+class RingBuffer:
+    """Кольцевой буфер чисел фиксированной ёмкости: память выделяется один раз"""
+
+    def __init__(self, capacity, typecode='d'):
+        self.capacity = capacity
+        self._data = array(typecode, bytes(array(typecode).itemsize * capacity))
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value):
+        end = (self._start + self._count) % self.capacity
+        self._data[end] = value
+        if self._count < self.capacity:
+            self._count += 1
+        else:
+            # Буфер полон: самое старое значение перезаписано
+            self._start = (self._start + 1) % self.capacity
+
+    def values(self):
+        """Значения от старых к новым"""
+        end = self._start + self._count
+        if end <= self.capacity:
+            return self._data[self._start:end].tolist()
+        return (self._data[self._start:] + self._data[:end - self.capacity]).tolist()
+
+    def last(self):
+        if not self._count:
+            return None
+        return self._data[(self._start + self._count - 1) % self.capacity]
+
+
+class ThroughputHistory:
+    """Скорость (байт/с) через равные интервалы: время отсчёта и значение"""
+
+    def __init__(self, capacity=600):
+        self.times = RingBuffer(capacity, 'd')
+        self.rates = RingBuffer(capacity, 'f')
+        self._last_time = None
+        self._last_bytes = 0
+
+    def __len__(self):
+        return len(self.rates)
+
+    def sample(self, now, total_bytes):
+        """Записать скорость по приросту total_bytes с прошлого отсчёта; вернуть прирост"""
+        if self._last_time is None:
+            self._last_time = now
+            self._last_bytes = total_bytes
+            return 0
+        elapsed = now - self._last_time
+        if elapsed <= 0:
+            return 0
+        # Повторная попытка может начать счёт байтов заново
+        delta = max(total_bytes - self._last_bytes, 0)
+        self.times.append(now)
+        self.rates.append(delta / elapsed)
+        self._last_time = now
+        self._last_bytes = total_bytes
+        return delta
+
+    def rows(self):
+        """Пары (время, байт/с) от старых к новым"""
+        return list(zip(self.times.values(), self.rates.values()))
+
+    def write_csv(self, f):
+        """Записать историю в CSV: время (ISO), unix-время, байт/с"""
+        writer = csv.writer(f)
+        writer.writerow(['time', 'timestamp', 'bytes_per_s'])
+        for timestamp, rate in self.rows():
+            stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(timestamp))
+            writer.writerow([stamp, f"{timestamp:.3f}", f"{rate:.0f}"])
+
+    def export_csv(self, path):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            self.write_csv(f)
+
+
+class ThroughputMonitor:
+    """Фоновый опрос скорости выполняющихся задач и суммарной скорости процесса"""
+
+    def __init__(self, interval=1.0, capacity=3600, job_capacity=600, clock=time.time):
+        self.interval = interval
+        self.job_capacity = job_capacity
+        self.clock = clock
+        self.total = ThroughputHistory(capacity)
+        self._total_bytes = 0
+        self._jobs = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, jobs, interval=None):
+        """Опрашивать jobs() каждые interval секунд (повторный вызов только меняет источник)"""
+        with self._lock:
+            self._jobs = jobs
+            if interval:
+                self.interval = interval
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick(self._jobs())
+            except Exception as e:
+                print(f"Ошибка опроса скорости: {e}")
+
+    def tick(self, jobs):
+        """Один отсчёт: скорость каждой выполняющейся задачи и суммарная"""
+        now = self.clock()
+        for job in jobs:
+            if job.state not in (RUNNING, PAUSED):
+                continue
+            if job.throughput is None:
+                # Буферы создаются при первом отсчёте: ждущие в очереди задачи память не занимают
+                job.throughput = ThroughputHistory(self.job_capacity)
+            self._total_bytes += job.throughput.sample(now, job.downloaded_bytes)
+        self.total.sample(now, self._total_bytes)
+
+    def to_dict(self):
+        return {
+            'interval': self.interval,
+            'samples': len(self.total),
+            'bytes_per_s': self.total.rates.last(),
+        }
+
+
+# Общая история скорости приложения
+throughput_monitor = ThroughputMonitor()
+metrics.register_section('throughput', throughput_monitor.to_dict)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль контроля отзывчивости интерфейса (задержки цикла событий Tk)
+"""
+
+import collections
+import functools
+import threading
+import time
+
+from core.metrics import metrics
+
+
+def percentile(sorted_values, fraction):
+    """Перцентиль отсортированного списка (ближайший ранг)"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class UiWatchdog:
+    def __init__(self, interval_ms=100, stall_ms=200, keep=5000, clock=time.perf_counter):
+        self.interval_ms = interval_ms
+        self.stall_ms = stall_ms
+        self.clock = clock
+        self.root = None
+        # Поток цикла событий Tk: секции других потоков его не задерживают
+        self.ui_thread = threading.main_thread()
+
+        self._lock = threading.Lock()
+        self._lags = collections.deque(maxlen=keep)
+        self._ticks = 0
+        # Время секций (колбэков) с предыдущего такта: {имя: мс}
+        self._interval = {}
+        # Задержки, приписанные секциям: {имя: {count, total_ms, max_ms}}
+        self._stalls = {}
+        # Время выполнения секций: {имя: {count, total_ms, max_ms}}
+        self._sections = {}
+        self._local = threading.local()
+        # Вызовы колбэков из рабочих потоков, ждущие потока Tk: {ключ: (имя, func, args, kwargs)}
+        self._pending = collections.OrderedDict()
+        self._pending_seq = 0
+        self._expected = None
+        self._after_id = None
+
+    def start(self, root, interval_ms=None):
+        """Запустить такты в цикле событий Tk"""
+        self.root = root
+        self.ui_thread = threading.current_thread()
+        if interval_ms:
+            self.interval_ms = interval_ms
+        self._expected = self.clock() + self.interval_ms / 1000
+        self._after_id = root.after(self.interval_ms, self._heartbeat)
+
+    def stop(self):
+        """Остановить такты"""
+        if self.root is not None and self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = None
+
+    def _heartbeat(self):
+        now = self.clock()
+        self.record_tick((now - self._expected) * 1000)
+        self.drain()
+        self._expected = self.clock() + self.interval_ms / 1000
+        self._after_id = self.root.after(self.interval_ms, self._heartbeat)
+
+    def record_tick(self, lag_ms):
+        """Учесть опоздание такта и приписать задержку самой долгой секции интервала"""
+        lag_ms = max(0.0, lag_ms)
+        with self._lock:
+            self._ticks += 1
+            self._lags.append(lag_ms)
+            interval, self._interval = self._interval, {}
+            if lag_ms < self.stall_ms:
+                return
+            culprit = max(interval, key=interval.get) if interval else 'other'
+            self._add(self._stalls, culprit, lag_ms)
+        metrics.inc('ui.stalls')
+
+    def section(self, name):
+        """Контекст для измерения колбэка интерфейса"""
+        return _Section(self, name)
+
+    def wrap(self, name, func):
+        """Обернуть колбэк: его время учитывается в секции name"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.section(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def track(self, name):
+        """Декоратор для колбэков интерфейса"""
+        return lambda func: self.wrap(name, func)
+
+    def ui_callback(self, name, coalesce=False):
+        """Декоратор для колбэков, вызываемых из рабочих потоков (прогресс, статусы).
+
+        В потоке Tk колбэк выполняется сразу, из другого потока — ставится в
+        очередь, которую такт разбирает в цикле событий: Tk не вызывается из
+        рабочих потоков, а время колбэка учитывается в секции name.
+        coalesce — из ожидающих вызовов метода одного объекта выполняется последний.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self.root is None or threading.current_thread() is self.ui_thread:
+                    with self.section(name):
+                        return func(*args, **kwargs)
+                with self._lock:
+                    if coalesce:
+                        key = (func, id(args[0]) if args else None)
+                        self._pending.pop(key, None)
+                    else:
+                        self._pending_seq += 1
+                        key = self._pending_seq
+                    self._pending[key] = (name, func, args, kwargs)
+                return None
+            return wrapper
+        return decorator
+
+    def drain(self):
+        """Выполнить ожидающие колбэки в порядке поступления (вызывается в потоке Tk)"""
+        with self._lock:
+            pending, self._pending = self._pending, collections.OrderedDict()
+        for name, func, args, kwargs in pending.values():
+            try:
+                with self.section(name):
+                    func(*args, **kwargs)
+            except Exception as e:
+                print(f"Ошибка колбэка интерфейса {name}: {e}")
+
+    def _record_section(self, name, exclusive_ms):
+        # Колбэк, вызванный из рабочего потока (загрузки), цикл событий не держит
+        if threading.current_thread() is not self.ui_thread:
+            return
+        with self._lock:
+            self._interval[name] = self._interval.get(name, 0.0) + exclusive_ms
+            self._add(self._sections, name, exclusive_ms)
+
+    @staticmethod
+    def _add(table, name, value_ms):
+        entry = table.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        entry['count'] += 1
+        entry['total_ms'] += value_ms
+        entry['max_ms'] = max(entry['max_ms'], value_ms)
+
+    def to_dict(self):
+        """Сводка для метрик: перцентили задержки тактов, зависания и время колбэков"""
+        with self._lock:
+            lags = sorted(self._lags)
+            stalls = {name: dict(entry) for name, entry in self._stalls.items()}
+            sections = {name: dict(entry) for name, entry in self._sections.items()}
+            ticks = self._ticks
+
+        def rounded(value):
+            return round(value, 1) if value is not None else None
+
+        for table in (stalls, sections):
+            for entry in table.values():
+                entry['total_ms'] = round(entry['total_ms'], 1)
+                entry['max_ms'] = round(entry['max_ms'], 1)
+        return {
+            'interval_ms': self.interval_ms,
+            'ticks': ticks,
+            'lag_p50_ms': rounded(percentile(lags, 0.50)),
+            'lag_p99_ms': rounded(percentile(lags, 0.99)),
+            'lag_max_ms': rounded(lags[-1] if lags else None),
+            'stalls': stalls,
+            'callbacks': sections,
+        }
+
+
+class _Section:
+    """Измерение секции с учётом вложенности: родителю засчитывается только своё время"""
+
+    def __init__(self, watchdog, name):
+        self.watchdog = watchdog
+        self.name = name
+
+    def __enter__(self):
+        stack = getattr(self.watchdog._local, 'stack', None)
+        if stack is None:
+            stack = self.watchdog._local.stack = []
+        self.start = self.watchdog.clock()
+        self.children = 0.0
+        stack.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        stack = self.watchdog._local.stack
+        stack.pop()
+        elapsed = (self.watchdog.clock() - self.start) * 1000
+        if stack:
+            stack[-1].children += elapsed
+        self.watchdog._record_section(self.name, elapsed - self.children)
+        return False
+
+
+# Общий контроль отзывчивости интерфейса
+ui_watchdog = UiWatchdog()
+metrics.register_section('ui_latency', ui_watchdog.to_dict)
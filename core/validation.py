@@ -5,7 +5,7 @@
 """
 
 import re
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qs
 
 
 class Validation:
@@ -71,6 +71,15 @@ class Validation:
         except:
             return False
     
+    @staticmethod
+    def detect_service(url):
+        """Определить сервис по URL ('youtube', 'tiktok' или None)"""
+        if Validation.is_youtube_url(url):
+            return 'youtube'
+        if Validation.is_tiktok_url(url):
+            return 'tiktok'
+        return None
+    
     @staticmethod
     def validate_url_for_service(url, service):
         """Валидация URL для конкретного сервиса"""
@@ -92,3 +101,22 @@ class Validation:
             return False, 'unknown_service'
         
         return True, 'valid'
+    
+    @staticmethod
+    def extract_video_id(url):
+        """Id отдельного видео из ссылки без обращения к сети (None — не видео или не распознано)"""
+        service = Validation.detect_service(url)
+        if service is None:
+            return None
+        parsed = urlparse(url)
+        if service == 'youtube':
+            if parsed.hostname.lower() == 'youtu.be':
+                match = re.match(r'^/([\w-]{11})', parsed.path)
+                return match.group(1) if match else None
+            if parsed.path == '/watch':
+                video_id = parse_qs(parsed.query).get('v', [''])[0]
+                return video_id if re.fullmatch(r'[\w-]{11}', video_id) else None
+            match = re.match(r'^/(?:shorts|live|embed)/([\w-]{11})', parsed.path)
+            return match.group(1) if match else None
+        match = re.search(r'/video/(\d+)', parsed.path)
+        return match.group(1) if match else None
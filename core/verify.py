@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль проверки целостности скачанных файлов (ffprobe/ffmpeg в параллельном пуле)
+"""
+
+import json
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.metrics import metrics
+
+try:
+    from yt_dlp.postprocessor.common import PostProcessor
+    YT_DLP_AVAILABLE = True
+except ImportError:
+    YT_DLP_AVAILABLE = False
+
+
+# Сколько секунд начала и конца файла декодируется
+DECODE_SECONDS = 3
+# Допустимое расхождение длительности: секунды или доля ожидаемой, что больше
+DURATION_TOLERANCE_S = 2.0
+DURATION_TOLERANCE_RATIO = 0.01
+# Предел времени одного вызова ffprobe/ffmpeg
+PROCESS_TIMEOUT = 120
+# Суффикс, с которым откладывается файл, не прошедший проверку
+CORRUPT_SUFFIX = '.corrupt'
+
+
+class VerifyTask:
+    """Файл на проверку и что о нём известно из info yt-dlp"""
+
+    __slots__ = ('path', 'url', 'duration', 'video', 'audio')
+
+    def __init__(self, path, url=None, duration=None, video=None, audio=None):
+        self.path = path
+        self.url = url
+        self.duration = duration
+        # True — поток обязателен, None — неизвестно (не проверяется)
+        self.video = video
+        self.audio = audio
+
+    @classmethod
+    def from_info(cls, path, info):
+        def present(codec):
+            return None if not codec else codec != 'none'
+        # Длительность фрагмента зависит от ключевых кадров на границах — не сверяется
+        clip = info.get('section_start') is not None or info.get('section_end') is not None
+        return cls(path, info.get('webpage_url') or info.get('original_url'),
+                   None if clip else info.get('duration'), present(info.get('vcodec')),
+                   present(info.get('acodec')))
+
+
+class VerifyResult:
+    def __init__(self, path, problems, duration=None, checked=None):
+        self.path = path
+        self.problems = problems
+        self.duration = duration
+        self.checked = checked or time.time()
+
+    @property
+    def ok(self):
+        return not self.problems
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'ok': self.ok,
+            'problems': self.problems,
+            'duration': self.duration,
+            'checked': self.checked,
+        }
+
+
+def tools_available():
+    """Есть ли ffprobe и ffmpeg в PATH"""
+    return bool(shutil.which('ffprobe') and shutil.which('ffmpeg'))
+
+
+def _run(args, timeout):
+    """Код возврата и stderr процесса (TimeoutExpired — проверка зависла)"""
+    result = subprocess.run(args, capture_output=True, timeout=timeout)
+    return result.returncode, result.stdout, result.stderr.decode('utf-8', 'replace').strip()
+
+
+def probe(path, timeout=PROCESS_TIMEOUT):
+    """Длительность и потоки файла по ffprobe (dict вывода -of json)"""
+    code, stdout, stderr = _run(['ffprobe', '-v', 'error', '-show_entries',
+                                 'format=duration:stream=codec_type', '-of', 'json', path],
+                                timeout)
+    if code != 0:
+        raise ValueError(stderr.splitlines()[0] if stderr else f"ffprobe: код {code}")
+    return json.loads(stdout or b'{}')
+
+
+def evaluate(data, expected_duration=None, video=None, audio=None):
+    """Проблемы файла по выводу ffprobe: потоки и длительность"""
+    problems = []
+    types = {stream.get('codec_type') for stream in data.get('streams', [])}
+    if video and 'video' not in types:
+        problems.append("нет видеопотока")
+    if audio and 'audio' not in types:
+        problems.append("нет звуковой дорожки")
+    if not types:
+        problems.append("нет потоков")
+    try:
+        duration = float(data.get('format', {}).get('duration'))
+    except (TypeError, ValueError):
+        duration = None
+    if expected_duration:
+        tolerance = max(DURATION_TOLERANCE_S, expected_duration * DURATION_TOLERANCE_RATIO)
+        if duration is None:
+            problems.append("длительность неизвестна")
+        elif abs(duration - expected_duration) > tolerance:
+            problems.append(f"длительность {duration:.1f} с вместо {expected_duration:.1f} с")
+    return problems, duration
+
+
+def decode_problems(path, seconds=DECODE_SECONDS, timeout=PROCESS_TIMEOUT):
+    """Декодировать начало и конец файла; вернуть найденные ошибки"""
+    problems = []
+    for name, position in (('начала', ['-ss', '0']), ('конца', ['-sseof', f'-{seconds}'])):
+        code, _, stderr = _run(['ffmpeg', '-nostdin', '-v', 'error', '-xerror', *position,
+                                '-i', path, '-t', str(seconds), '-f', 'null', '-'], timeout)
+        if code != 0 or stderr:
+            detail = stderr.splitlines()[0] if stderr else f"код {code}"
+            problems.append(f"ошибка декодирования {name}: {detail}")
+    return problems
+
+
+def check_file(task, decode_seconds=DECODE_SECONDS, timeout=PROCESS_TIMEOUT):
+    """Проверить файл: ffprobe, длительность, потоки и декодирование краёв"""
+    try:
+        problems, duration = evaluate(probe(task.path, timeout), task.duration,
+                                      task.video, task.audio)
+        if decode_seconds:
+            problems.extend(decode_problems(task.path, decode_seconds, timeout))
+    except subprocess.TimeoutExpired:
+        return VerifyResult(task.path, [f"проверка не уложилась в {timeout} с"])
+    except (OSError, ValueError) as e:
+        return VerifyResult(task.path, [f"ffprobe: {e}"])
+    return VerifyResult(task.path, problems, duration)
+
+
+class Verifier:
+    """Ограниченный пул проверок: каждая проверка — процессы ffprobe/ffmpeg.
+
+    Загрузка задачи не ждёт проверки: файлы ставятся в пул после задачи,
+    и проверки идут параллельно со следующими загрузками.
+    """
+
+    def __init__(self, max_workers=2, check=check_file):
+        self.max_workers = max_workers
+        self.check = check
+        self._executor = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self.pending = 0
+        self.checked = 0
+        self.failed = 0
+
+    def configure(self, max_workers):
+        """Число одновременных проверок (новый пул для следующих файлов)"""
+        with self._lock:
+            max_workers = max(1, int(max_workers))
+            if max_workers == self.max_workers:
+                return
+            self.max_workers = max_workers
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def submit(self, task, on_done, **options):
+        """Поставить файл в очередь проверки; on_done(task, result) — в потоке пула"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers,
+                                                    thread_name_prefix='verify')
+            self.pending += 1
+            return self._executor.submit(self._run, task, on_done, options)
+
+    def _run(self, task, on_done, options):
+        try:
+            result = self.check(task, **options)
+            with self._lock:
+                self.checked += 1
+                if not result.ok:
+                    self.failed += 1
+            on_done(task, result)
+        except Exception as e:
+            print(f"Ошибка проверки файла {task.path}: {e}")
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self._idle.notify_all()
+
+    def wait(self, timeout=None):
+        """Дождаться окончания всех поставленных проверок"""
+        with self._lock:
+            return self._idle.wait_for(lambda: self.pending == 0, timeout)
+
+    def to_dict(self):
+        return {
+            'workers': self.max_workers,
+            'pending': self.pending,
+            'checked': self.checked,
+            'failed': self.failed,
+        }
+
+
+if YT_DLP_AVAILABLE:
+    class VerifyPostProcessor(PostProcessor):
+        """Запоминает готовые файлы задачи для проверки после её завершения"""
+
+        def __init__(self, tasks, final_path=None, downloader=None):
+            super().__init__(downloader)
+            self.tasks = tasks
+            self.final_path = final_path
+
+        def run(self, info):
+            path = info.get('filepath')
+            if path:
+                if self.final_path:
+                    path = self.final_path(path)
+                self.tasks.append(VerifyTask.from_info(path, info))
+            return [], info
+
+
+def post_processor(tasks, final_path=None):
+    """Постпроцессор сбора файлов на проверку (None, если yt-dlp не установлен)"""
+    if not YT_DLP_AVAILABLE:
+        return None
+    return VerifyPostProcessor(tasks, final_path)
+
+
+# Общий пул проверок приложения
+verifier = Verifier()
+metrics.register_section('verify', verifier.to_dict)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль папки входящих файлов со списками ссылок
+"""
+
+import ctypes
+import ctypes.util
+import datetime
+import json
+import os
+import select
+import shutil
+import struct
+import sys
+import threading
+from urllib.parse import urlparse, parse_qs
+
+from core.metrics import metrics
+from core.validation import Validation
+
+
+# Расширения файлов со ссылками
+WATCH_EXTENSIONS = ('.txt', '.url')
+
+# События inotify
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def parse_url_file(path):
+    """Прочитать ссылки из .txt (по одной в строке) или .url (ярлык Windows)"""
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        lines = [line.strip() for line in f]
+
+    if path.lower().endswith('.url'):
+        return [line.split('=', 1)[1].strip() for line in lines
+                if line.lower().startswith('url=')]
+    return [line for line in lines if line and not line.startswith('#')]
+
+
+def is_playlist_url(url):
+    """Ссылка на плейлист или канал (скачивается фоновой задачей)"""
+    parsed = urlparse(url)
+    if parse_qs(parsed.query).get('list'):
+        return True
+    return parsed.path.startswith(('/playlist', '/@', '/channel/', '/c/', '/user/'))
+
+
+def default_inbox(config):
+    """Папка входящих: watch_dir или download_dir/inbox"""
+    return config.get('watch_dir') or os.path.join(config.get('download_dir', ''), 'inbox')
+
+
+class _Inotify:
+    """Минимальная обёртка над inotify через ctypes (только Linux)"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch")
+
+    def read(self, timeout):
+        """Дождаться событий и вернуть имена записанных/перемещённых файлов"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class WatchFolder:
+    def __init__(self, inbox, submit, processed_dir=None, poll_interval=5.0):
+        """submit(url, service, playlist) ставит ссылку в очередь и возвращает задачу"""
+        self.inbox = inbox
+        self.submit = submit
+        self.processed_dir = processed_dir or os.path.join(inbox, 'processed')
+        self.poll_interval = poll_interval
+        self.on_report = None
+        self.mode = None
+
+        self._seen_urls = set()
+        self._sizes = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запустить наблюдение в фоновом потоке"""
+        os.makedirs(self.inbox, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановить наблюдение"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _run(self):
+        inotify = None
+        if sys.platform.startswith('linux'):
+            try:
+                inotify = _Inotify(self.inbox)
+            except (OSError, AttributeError) as e:
+                print(f"inotify недоступен, используется опрос папки: {e}")
+        self.mode = 'inotify' if inotify else 'polling'
+
+        try:
+            self.scan()
+            while not self._stop.is_set():
+                if inotify:
+                    ready = inotify.read(self.poll_interval)
+                    self.scan(ready)
+                elif not self._stop.wait(self.poll_interval):
+                    self.scan()
+        finally:
+            if inotify:
+                inotify.close()
+
+    def scan(self, ready=()):
+        """Обработать готовые файлы папки.
+
+        Файлы из событий inotify готовы сразу; остальные обрабатываются,
+        когда их размер и время изменения не меняются между двумя проверками.
+        """
+        reports = []
+        try:
+            names = sorted(os.listdir(self.inbox))
+        except OSError as e:
+            print(f"Ошибка чтения папки {self.inbox}: {e}")
+            return reports
+
+        current = {}
+        for name in names:
+            path = os.path.join(self.inbox, name)
+            if not name.lower().endswith(WATCH_EXTENSIONS) or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            signature = (stat.st_size, stat.st_mtime)
+            if name in ready or self._sizes.get(name) == signature:
+                reports.append(self.process_file(path))
+            else:
+                current[name] = signature
+        self._sizes = current
+        return reports
+
+    def process_file(self, path):
+        """Разобрать файл, поставить ссылки в очередь и перенести файл в processed"""
+        name = os.path.basename(path)
+        results = []
+        error = None
+        try:
+            urls = parse_url_file(path)
+        except (OSError, UnicodeError) as e:
+            urls = []
+            error = str(e)
+
+        in_file = set()
+        for url in urls:
+            results.append(self._submit_url(url, in_file))
+
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        target = os.path.join(self.processed_dir, f"{stamp}-{name}")
+        report = {
+            'file': name,
+            'processed_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'error': error,
+            'results': results,
+            'counts': {status: sum(1 for r in results if r['status'] == status)
+                       for status in ('queued', 'duplicate', 'invalid', 'error')},
+        }
+        try:
+            os.makedirs(self.processed_dir, exist_ok=True)
+            shutil.move(path, target)
+            with open(target + '.report.json', 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"Ошибка переноса {name} в {self.processed_dir}: {e}")
+
+        metrics.inc('watch.files')
+        metrics.inc('watch.urls_queued', report['counts']['queued'])
+        if self.on_report:
+            self.on_report(report)
+        return report
+
+    def _submit_url(self, url, in_file):
+        """Проверить ссылку и поставить её в очередь"""
+        service = Validation.detect_service(url)
+        if service is None:
+            return {'url': url, 'status': 'invalid', 'message': "Неподдерживаемая ссылка"}
+        if url in in_file or url in self._seen_urls:
+            return {'url': url, 'status': 'duplicate'}
+        in_file.add(url)
+        try:
+            job = self.submit(url, service, is_playlist_url(url))
+        except Exception as e:
+            return {'url': url, 'status': 'error', 'message': str(e)}
+        self._seen_urls.add(url)
+        return {'url': url, 'status': 'queued', 'service': service,
+                'job_id': getattr(job, 'id', None)}
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль временных окон для фоновых загрузок
+"""
+
+import datetime
+
+
+def parse_time(value):
+    """Разобрать время 'ЧЧ:ММ' в минуты от полуночи"""
+    try:
+        hours, minutes = str(value).strip().split(':')
+        hours, minutes = int(hours), int(minutes)
+    except ValueError:
+        raise ValueError(f"Неверный формат времени: {value} (нужно ЧЧ:ММ)")
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Неверное время: {value}")
+    return hours * 60 + minutes
+
+
+class TimeWindow:
+    def __init__(self, start, end, ratelimit_kbps=None, max_workers=None):
+        self.start = parse_time(start)
+        self.end = parse_time(end)
+        self.ratelimit_kbps = ratelimit_kbps
+        self.max_workers = max_workers
+
+    @classmethod
+    def from_dict(cls, data):
+        """Создать окно из записи настроек"""
+        return cls(data['start'], data['end'],
+                   data.get('ratelimit_kbps'), data.get('max_workers'))
+
+    def contains(self, minute):
+        """Попадает ли минута суток в окно (окно может переходить через полночь)"""
+        if self.start == self.end:
+            return True
+        if self.start < self.end:
+            return self.start <= minute < self.end
+        return minute >= self.start or minute < self.end
+
+    def to_dict(self):
+        """Представление для настроек"""
+        return {
+            'start': f"{self.start // 60:02d}:{self.start % 60:02d}",
+            'end': f"{self.end // 60:02d}:{self.end % 60:02d}",
+            'ratelimit_kbps': self.ratelimit_kbps,
+            'max_workers': self.max_workers,
+        }
+
+
+class WindowPolicy:
+    def __init__(self, windows=None, bulk_only_in_windows=True, clock=datetime.datetime.now):
+        self.windows = list(windows or [])
+        self.bulk_only_in_windows = bulk_only_in_windows
+        self.clock = clock
+
+    @classmethod
+    def from_config(cls, config):
+        """Создать политику из настроек (bandwidth_windows, bulk_only_in_windows)"""
+        windows = [TimeWindow.from_dict(item) for item in config.get('bandwidth_windows') or []]
+        return cls(windows, config.get('bulk_only_in_windows', True))
+
+    def _minute(self, now=None):
+        now = now or self.clock()
+        return now.hour * 60 + now.minute
+
+    def active_window(self, now=None):
+        """Текущее окно (первое подходящее) или None"""
+        minute = self._minute(now)
+        for window in self.windows:
+            if window.contains(minute):
+                return window
+        return None
+
+    def bulk_allowed(self, now=None):
+        """Можно ли сейчас выполнять фоновые задачи"""
+        if not self.windows or not self.bulk_only_in_windows:
+            return True
+        return self.active_window(now) is not None
+
+    def ratelimit_kbps(self, default, now=None):
+        """Лимит скорости фоновых задач в текущем окне"""
+        window = self.active_window(now)
+        if window is not None and window.ratelimit_kbps is not None:
+            return window.ratelimit_kbps
+        return default
+
+    def max_workers(self, default, now=None):
+        """Число рабочих потоков в текущем окне"""
+        window = self.active_window(now)
+        if window is not None and window.max_workers:
+            return window.max_workers
+        return default
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Запуск загрузки без графического интерфейса
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+
+# Добавляем текущую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.config import Config
+from core.i18n import I18n
+from core.validation import Validation
+from core.downloader import Downloader
+from core.sections import parse_section
+from core.watch import WatchFolder, default_inbox
+
+
+def parse_args(argv=None):
+    """Разобрать аргументы командной строки"""
+    parser = argparse.ArgumentParser(description='Video Downloader (без GUI)')
+    parser.add_argument('url', nargs='?', help='Ссылка на видео или плейлист')
+    parser.add_argument('--service', choices=['youtube', 'tiktok'],
+                        help='Сервис (по умолчанию определяется по ссылке)')
+    parser.add_argument('--quality', default='best',
+                        choices=['best', '1080p', '720p', '480p', '360p'])
+    parser.add_argument('--audio-only', action='store_true', help='Только аудио (mp3)')
+    parser.add_argument('--playlist', action='store_true', help='Скачать плейлист')
+    parser.add_argument('--first-n', type=int, default=0, help='Первые N из плейлиста')
+    parser.add_argument('--allow-mix', action='store_true', help='Разрешить MIX/радио')
+    parser.add_argument('--sync', action='store_true',
+                        help='Синхронизация: скачать только новые видео плейлиста/канала')
+    parser.add_argument('--cookies', help='Путь к cookies.txt')
+    parser.add_argument('--priority', choices=['interactive', 'normal', 'bulk'],
+                        help='Приоритет задачи (по умолчанию bulk для плейлиста, иначе interactive)')
+    parser.add_argument('--profile', choices=['cpu', 'memory', 'all'],
+                        help='Профилировать задачу: отчёты .prof/_cpu.txt/_memory.txt '
+                             'в папке загрузки')
+    parser.add_argument('--throughput-csv', metavar='PATH',
+                        help='По окончании сохранить историю скорости (раз в секунду) в CSV')
+    parser.add_argument('--verify', action='store_true', default=None,
+                        help='Проверить готовые файлы ffprobe и скачать повреждённые заново')
+    parser.add_argument('--start', metavar='TIME',
+                        help='Скачать фрагмент с этого времени (чч:мм:сс, мм:сс или секунды)')
+    parser.add_argument('--end', metavar='TIME',
+                        help='Скачать фрагмент до этого времени (по умолчанию — до конца видео)')
+    parser.add_argument('--precise-cut', action='store_true',
+                        help='Резать фрагмент точно по времени (перекодирование краёв), '
+                             'а не по ключевым кадрам')
+    parser.add_argument('--plan', action='store_true',
+                        help='Только построить план (JSON) без скачивания')
+    parser.add_argument('--watch', nargs='?', const='', metavar='DIR',
+                        help='Следить за папкой со списками ссылок (.txt/.url); '
+                             'по умолчанию watch_dir из настроек')
+    args = parser.parse_args(argv)
+    if args.url is None and args.watch is None:
+        parser.error('нужна ссылка или --watch')
+    return args
+
+
+def print_json(data):
+    """Вывести строку JSON"""
+    print(json.dumps(data, ensure_ascii=False), flush=True)
+
+
+def run_watch(config, downloader, args):
+    """Ставить в очередь ссылки из файлов папки входящих, пока не прервано"""
+    inbox = args.watch or default_inbox(config)
+
+    def submit(url, service, playlist):
+        priority = args.priority or ('bulk' if playlist else config.get('watch_priority', 'normal'))
+        return downloader.download(url, service, quality=args.quality, audio_only=args.audio_only,
+                                   playlist=playlist, cookies_file=args.cookies, priority=priority,
+                                   profile=args.profile, verify=args.verify)
+
+    downloader.status_callback = lambda status, message: print_json(
+        {'status': status, 'message': message})
+    watcher = WatchFolder(inbox, submit, poll_interval=config.get('watch_poll_seconds', 5))
+    watcher.on_report = print_json
+    watcher.start()
+    print_json({'status': 'watching', 'message': inbox})
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        watcher.stop()
+        downloader.cancel_download()
+    if args.throughput_csv:
+        downloader.throughput_history().export_csv(args.throughput_csv)
+    return 0
+
+
+def main(argv=None):
+    """Главная функция"""
+    args = parse_args(argv)
+    config = Config()
+    i18n = I18n(config.get('language', 'ru'))
+    downloader = Downloader(config, i18n)
+    downloader.start_dir_index()
+
+    if args.watch is not None:
+        return run_watch(config, downloader, args)
+
+    service = args.service or Validation.detect_service(args.url)
+    if service is None:
+        print(f"Неподдерживаемая ссылка: {args.url}", file=sys.stderr)
+        return 2
+    try:
+        section = parse_section(args.start, args.end)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if section and (args.playlist or args.sync):
+        print("Фрагмент можно задать только для одного видео", file=sys.stderr)
+        return 2
+
+    options = dict(
+        url=args.url,
+        service=service,
+        quality=args.quality,
+        audio_only=args.audio_only,
+        playlist=args.playlist,
+        first_n=args.first_n,
+        allow_mix=args.allow_mix,
+        cookies_file=args.cookies,
+        sync=args.sync,
+        section=section,
+        precise_cut=args.precise_cut,
+    )
+
+    if args.plan:
+        plan = downloader.plan(**options)
+        print(plan.to_json())
+        return 0 if plan.fits is not False else 1
+
+    done = threading.Event()
+    result = {'status': None, 'verify_failed': 0}
+
+    def on_progress(percent, speed, eta, progress=None):
+        record = {'percent': round(percent, 1), 'speed': round(speed) if speed else speed,
+                  'eta': eta}
+        if progress:
+            # Прогресс задачи целиком: элементы плейлиста и объём
+            record.update(entries_done=progress['entries_done'],
+                          entries_total=progress['entries_total'],
+                          downloaded_bytes=progress['downloaded_bytes'],
+                          total_bytes=progress['total_bytes'])
+        print_json(record)
+
+    def on_status(status, message):
+        if status == 'verify_failed':
+            result['verify_failed'] += 1
+        if status in ('completed', 'error', 'canceled'):
+            result['status'] = status
+            done.set()
+        print_json({'status': status, 'message': message})
+
+    downloader.progress_callback = on_progress
+    downloader.status_callback = on_status
+    priority = args.priority or ('bulk' if args.playlist or args.sync else 'interactive')
+    downloader.download(priority=priority, profile=args.profile, verify=args.verify, **options)
+
+    try:
+        done.wait()
+        # Проверка файлов и повторные загрузки повреждённых идут после задачи
+        downloader.wait_idle()
+    except KeyboardInterrupt:
+        downloader.cancel_download()
+    if args.throughput_csv:
+        downloader.throughput_history().export_csv(args.throughput_csv)
+    return 0 if result['status'] == 'completed' and not result['verify_failed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
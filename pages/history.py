@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Страница истории загрузок (поиск по SQLite, постраничный вывод)
+"""
+
+import datetime
+import os
+import subprocess
+import sys
+import tkinter as tk
+from tkinter import ttk, messagebox
+from core.planner import format_size
+from core.uiwatch import ui_watchdog
+
+
+# Строк на странице результатов
+PAGE_SIZE = 100
+# Поиск запускается после паузы в наборе
+SEARCH_DELAY_MS = 250
+
+COLUMNS = ('date', 'service', 'title', 'channel', 'size', 'quality')
+QUALITIES = ('best', '1080p', '720p', '480p', '360p', 'audio')
+
+
+def parse_date(text, end=False):
+    """'ГГГГ-ММ-ДД' -> unix-время начала дня (end=True — начала следующего дня)"""
+    text = (text or '').strip()
+    if not text:
+        return None
+    day = datetime.datetime.strptime(text, '%Y-%m-%d')
+    if end:
+        day += datetime.timedelta(days=1)
+    return day.timestamp()
+
+
+def parse_size_mb(text):
+    """Размер в МБ (дробный) -> байты"""
+    text = (text or '').strip().replace(',', '.')
+    if not text:
+        return None
+    return int(float(text) * 1024 * 1024)
+
+
+def format_history_row(row):
+    """Значения строки таблицы для записи истории"""
+    date = datetime.datetime.fromtimestamp(row['downloaded']).strftime('%Y-%m-%d %H:%M')
+    quality = 'audio' if row['audio_only'] else (row['quality'] or '')
+    return (date, row['service'], row['title'] or row['url'], row['channel'],
+            format_size(row['size']) if row['size'] else '', quality)
+
+
+def open_folder(path):
+    """Открыть папку в файловом менеджере системы"""
+    if hasattr(os, 'startfile'):
+        os.startfile(path)
+    elif sys.platform == 'darwin':
+        subprocess.Popen(['open', path])
+    else:
+        subprocess.Popen(['xdg-open', path])
+
+
+class HistoryPage:
+    def __init__(self, app):
+        self.app = app
+        self.frame = None
+        self.history = app.downloader.history
+        # Курсоры начала открытых страниц: назад — снять последний
+        self.cursors = [None]
+        self.next_cursor = None
+        self.page_rows = []
+        self._search_id = None
+
+    def show(self):
+        """Показать страницу"""
+        if self.frame:
+            self.frame.pack(fill=tk.BOTH, expand=True)
+            self.search()
+            return
+
+        self.frame = ttk.Frame(self.app.content_frame)
+        self.frame.pack(fill=tk.BOTH, expand=True)
+
+        self.title_label = ttk.Label(self.frame, text=self.app.i18n.get('history_title'),
+                                     font=('Arial', 16, 'bold'))
+        self.title_label.pack(pady=(0, 10))
+
+        self.create_filters()
+        self.create_table()
+        self.create_actions()
+        self.search()
+
+    def create_filters(self):
+        """Поля поиска: текст, канал, сервис, даты и размер"""
+        filters = ttk.Frame(self.frame)
+        filters.pack(fill=tk.X, pady=(0, 10))
+
+        self.text_var = tk.StringVar()
+        self.channel_var = tk.StringVar()
+        self.service_var = tk.StringVar()
+        self.date_from_var = tk.StringVar()
+        self.date_to_var = tk.StringVar()
+        self.size_min_var = tk.StringVar()
+        self.size_max_var = tk.StringVar()
+
+        self.filter_labels = []
+        fields = [
+            ('history_search', ttk.Entry(filters, textvariable=self.text_var, width=30)),
+            ('history_channel', ttk.Entry(filters, textvariable=self.channel_var, width=18)),
+            ('history_service', ttk.Combobox(filters, textvariable=self.service_var,
+                                             values=('', 'youtube', 'tiktok'),
+                                             state='readonly', width=9)),
+            ('history_date_from', ttk.Entry(filters, textvariable=self.date_from_var, width=11)),
+            ('history_date_to', ttk.Entry(filters, textvariable=self.date_to_var, width=11)),
+            ('history_size_min', ttk.Entry(filters, textvariable=self.size_min_var, width=7)),
+            ('history_size_max', ttk.Entry(filters, textvariable=self.size_max_var, width=7)),
+        ]
+        for column, (key, widget) in enumerate(fields):
+            label = ttk.Label(filters, text=self.app.i18n.get(key))
+            label.grid(row=0, column=column, sticky=tk.W, padx=(0, 5))
+            widget.grid(row=1, column=column, sticky=tk.W, padx=(0, 5))
+            self.filter_labels.append((label, key))
+        filters.columnconfigure(0, weight=1)
+
+        for var in (self.text_var, self.channel_var, self.service_var, self.date_from_var,
+                    self.date_to_var, self.size_min_var, self.size_max_var):
+            var.trace_add('write', self.schedule_search)
+
+    def create_table(self):
+        """Таблица результатов"""
+        table_frame = ttk.Frame(self.frame)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.tree = ttk.Treeview(table_frame, columns=COLUMNS, show='headings',
+                                 selectmode='browse')
+        self.tree.column('date', width=120, stretch=False)
+        self.tree.column('service', width=70, stretch=False)
+        self.tree.column('title', width=300)
+        self.tree.column('channel', width=150)
+        self.tree.column('size', width=80, anchor=tk.E, stretch=False)
+        self.tree.column('quality', width=70, stretch=False)
+        self.update_headings()
+
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.config(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind('<Double-1>', lambda event: self.open_selected_folder())
+
+    def create_actions(self):
+        """Пагинация и действия с выбранной записью"""
+        bottom_frame = ttk.Frame(self.frame)
+        bottom_frame.pack(fill=tk.X, pady=(10, 0))
+
+        self.prev_btn = ttk.Button(bottom_frame, text=self.app.i18n.get('history_prev'),
+                                   command=self.prev_page)
+        self.prev_btn.pack(side=tk.LEFT)
+        self.next_btn = ttk.Button(bottom_frame, text=self.app.i18n.get('history_next'),
+                                   command=self.next_page)
+        self.next_btn.pack(side=tk.LEFT, padx=(5, 10))
+
+        self.summary_var = tk.StringVar()
+        ttk.Label(bottom_frame, textvariable=self.summary_var).pack(side=tk.LEFT)
+
+        self.folder_btn = ttk.Button(bottom_frame, text=self.app.i18n.get('history_open_folder'),
+                                     command=self.open_selected_folder)
+        self.folder_btn.pack(side=tk.RIGHT)
+
+        self.quality_var = tk.StringVar(value='best')
+        ttk.Combobox(bottom_frame, textvariable=self.quality_var, values=QUALITIES,
+                     state='readonly', width=7).pack(side=tk.RIGHT, padx=(0, 10))
+        self.redownload_btn = ttk.Button(bottom_frame,
+                                         text=self.app.i18n.get('history_redownload'),
+                                         command=self.redownload_selected)
+        self.redownload_btn.pack(side=tk.RIGHT, padx=(0, 5))
+
+    def hide(self):
+        """Скрыть страницу"""
+        if self.frame:
+            self.frame.pack_forget()
+            if self._search_id is not None:
+                self.frame.after_cancel(self._search_id)
+                self._search_id = None
+
+    def update_language(self):
+        """Обновить язык"""
+        if self.frame:
+            self.title_label.config(text=self.app.i18n.get('history_title'))
+            for label, key in self.filter_labels:
+                label.config(text=self.app.i18n.get(key))
+            self.prev_btn.config(text=self.app.i18n.get('history_prev'))
+            self.next_btn.config(text=self.app.i18n.get('history_next'))
+            self.folder_btn.config(text=self.app.i18n.get('history_open_folder'))
+            self.redownload_btn.config(text=self.app.i18n.get('history_redownload'))
+            self.update_headings()
+
+    def update_headings(self):
+        """Заголовки колонок"""
+        for column in COLUMNS:
+            self.tree.heading(column, text=self.app.i18n.get(f'history_col_{column}'))
+
+    def filters(self):
+        """Фильтры из полей страницы (ValueError при неверной дате или размере)"""
+        return {
+            'text': self.text_var.get(),
+            'channel': self.channel_var.get(),
+            'service': self.service_var.get() or None,
+            'date_from': parse_date(self.date_from_var.get()),
+            'date_to': parse_date(self.date_to_var.get(), end=True),
+            'min_size': parse_size_mb(self.size_min_var.get()),
+            'max_size': parse_size_mb(self.size_max_var.get()),
+        }
+
+    def schedule_search(self, *args):
+        """Искать после паузы в наборе, а не на каждую букву"""
+        if self._search_id is not None:
+            self.frame.after_cancel(self._search_id)
+        self._search_id = self.frame.after(SEARCH_DELAY_MS, self.search)
+
+    def search(self):
+        """Новый поиск с первой страницы"""
+        self._search_id = None
+        self.cursors = [None]
+        self.load_page()
+
+    @ui_watchdog.track('history_search')
+    def load_page(self):
+        """Загрузить текущую страницу результатов"""
+        try:
+            filters = self.filters()
+        except ValueError as e:
+            self.summary_var.set(self.app.i18n.get('history_bad_filter').format(error=e))
+            return
+        page = self.history.search(limit=PAGE_SIZE, cursor=self.cursors[-1], **filters)
+        self.page_rows = page.rows
+        self.next_cursor = page.cursor
+
+        self.tree.delete(*self.tree.get_children())
+        for index, row in enumerate(page.rows):
+            self.tree.insert('', tk.END, iid=str(index), values=format_history_row(row))
+
+        first = (len(self.cursors) - 1) * PAGE_SIZE
+        self.summary_var.set(self.app.i18n.get('history_found').format(
+            count=self.history.count(**filters), first=first + 1 if page.rows else 0,
+            last=first + len(page.rows)))
+        self.prev_btn.config(state=tk.NORMAL if len(self.cursors) > 1 else tk.DISABLED)
+        self.next_btn.config(state=tk.NORMAL if self.next_cursor else tk.DISABLED)
+
+    def next_page(self):
+        if self.next_cursor is not None:
+            self.cursors.append(self.next_cursor)
+            self.load_page()
+
+    def prev_page(self):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+            self.load_page()
+
+    def selected_row(self):
+        selection = self.tree.selection()
+        if not selection:
+            return None
+        return self.page_rows[int(selection[0])]
+
+    def redownload_selected(self):
+        """Поставить выбранную запись в очередь в выбранном качестве"""
+        row = self.selected_row()
+        if row is None:
+            return
+        quality = self.quality_var.get()
+        cookies_file = self.app.cookie_manager.get_cookies_file() if self.app.cookie_manager else None
+        try:
+            self.app.downloader.download(row['url'], row['service'],
+                                         quality='best' if quality == 'audio' else quality,
+                                         audio_only=(quality == 'audio'),
+                                         cookies_file=cookies_file, force=True)
+        except Exception as e:
+            messagebox.showerror(self.app.i18n.get('error'), str(e))
+            return
+        messagebox.showinfo(self.app.i18n.get('history_title'),
+                            self.app.i18n.get('history_queued').format(
+                                title=row['title'] or row['url']))
+
+    def open_selected_folder(self):
+        """Открыть папку выбранного файла"""
+        row = self.selected_row()
+        if row is None or not row['path']:
+            return
+        folder = os.path.dirname(row['path'])
+        if not os.path.isdir(folder):
+            messagebox.showerror(self.app.i18n.get('error'), f"Папка не найдена: {folder}")
+            return
+        try:
+            open_folder(folder)
+        except OSError as e:
+            messagebox.showerror(self.app.i18n.get('error'), str(e))
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Страница задач загрузки (виртуализированный список)
+"""
+
+import os
+import tkinter as tk
+from tkinter import ttk
+from core.entries import ENTRY_OK, ENTRY_ERROR
+from core.planner import format_size, format_duration
+from core.uiwatch import ui_watchdog
+
+
+# Интервал обновления таблицы (мс)
+REFRESH_MS = 500
+
+COLUMNS = ('index', 'state', 'service', 'title', 'progress', 'speed', 'eta', 'size')
+
+
+def format_job_row(index, job):
+    """Значения строки таблицы для задачи"""
+    if job.total_bytes:
+        progress = f"{min(job.downloaded_bytes / job.total_bytes * 100, 100):.1f}%"
+    elif job.state == 'completed':
+        progress = '100%'
+    else:
+        progress = ''
+    running = job.state in ('running', 'paused')
+    speed = f"{format_size(job.speed)}/s" if running and job.speed else ''
+    eta = format_duration(job.eta) if running and job.eta else ''
+    size = format_size(job.total_bytes or job.downloaded_bytes) if (
+        job.total_bytes or job.downloaded_bytes) else ''
+    return (index, job.state, job.service, job.title or job.url, progress, speed, eta, size)
+
+
+def format_entry_row(record):
+    """Значения строки таблицы для элемента раскрытого плейлиста"""
+    name = os.path.basename(record.path) if record.path else (record.id or '')
+    return ('', record.status, '', f"    {record.index}. {name}",
+            '100%' if record.status == ENTRY_OK else '', '', '',
+            format_size(record.size) if record.size else '')
+
+
+def visible_rows(jobs, expanded, entries, offset, count):
+    """Видимые строки: задачи, а под раскрытой задачей — элементы её плейлиста.
+
+    Возвращает (номер задачи, задача, запись элемента или None); из таблицы
+    элементов (EntryReader) читаются только попавшие в окно записи.
+    """
+    position = -1
+    if expanded is not None:
+        for index, job in enumerate(jobs):
+            if job is expanded:
+                position = index
+                break
+    nested = len(entries) if position >= 0 else 0
+    end = min(offset + count, len(jobs) + nested)
+    rows = []
+    index = offset
+    while index < end:
+        if index <= position:
+            rows.append((index + 1, jobs[index], None))
+            index += 1
+        elif index <= position + nested:
+            first = index - position - 1
+            take = min(end, position + nested + 1) - index
+            for record in entries.rows(first, take):
+                rows.append((position + 1, expanded, record))
+            index += take
+        else:
+            rows.append((index - nested + 1, jobs[index - nested], None))
+            index += 1
+    return rows
+
+
+class RowWindow:
+    """Окно видимых строк: какие элементы длинного списка сейчас на экране"""
+
+    def __init__(self, visible=20):
+        self.visible = visible
+        self.total = 0
+        self.offset = 0
+
+    def set_total(self, total):
+        self.total = total
+        self._clamp()
+
+    def set_visible(self, visible):
+        self.visible = max(1, visible)
+        self._clamp()
+
+    def scroll(self, rows):
+        """Прокрутить на rows строк (отрицательное — вверх)"""
+        self.offset += rows
+        self._clamp()
+
+    def moveto(self, fraction):
+        """Перейти к доле списка (как у полосы прокрутки)"""
+        self.offset = int(round(float(fraction) * self.total))
+        self._clamp()
+
+    def fractions(self):
+        """Положение для полосы прокрутки: (начало, конец)"""
+        if self.total <= 0:
+            return 0.0, 1.0
+        return self.offset / self.total, min(1.0, (self.offset + self.visible) / self.total)
+
+    def slice(self, items):
+        """Видимая часть списка"""
+        return items[self.offset:self.offset + self.visible]
+
+    def _clamp(self):
+        self.offset = max(0, min(self.offset, self.total - self.visible))
+
+
+class JobsPage:
+    def __init__(self, app):
+        self.app = app
+        self.frame = None
+        self.rows = RowWindow()
+        # Строки Treeview создаются только для видимой части списка и переиспользуются
+        self.items = []
+        self.item_values = []
+        self.item_jobs = []
+        # Раскрытый плейлист: его элементы читаются из таблицы на диске (EntryReader)
+        self.expanded = None
+        self.entries = None
+        self._after_id = None
+
+    def show(self):
+        """Показать страницу"""
+        if self.frame:
+            self.frame.pack(fill=tk.BOTH, expand=True)
+            self.schedule_refresh()
+            return
+
+        self.frame = ttk.Frame(self.app.content_frame)
+        self.frame.pack(fill=tk.BOTH, expand=True)
+
+        # Заголовок
+        self.title_label = ttk.Label(self.frame, text=self.app.i18n.get('jobs_title'),
+                                     font=('Arial', 16, 'bold'))
+        self.title_label.pack(pady=(0, 10))
+
+        # Таблица задач
+        table_frame = ttk.Frame(self.frame)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.tree = ttk.Treeview(table_frame, columns=COLUMNS, show='headings',
+                                 selectmode='browse')
+        self.tree.column('index', width=50, anchor=tk.E, stretch=False)
+        self.tree.column('state', width=90, stretch=False)
+        self.tree.column('service', width=70, stretch=False)
+        self.tree.column('title', width=260)
+        self.tree.column('progress', width=70, anchor=tk.E, stretch=False)
+        self.tree.column('speed', width=90, anchor=tk.E, stretch=False)
+        self.tree.column('eta', width=70, anchor=tk.E, stretch=False)
+        self.tree.column('size', width=80, anchor=tk.E, stretch=False)
+        self.tree.tag_configure('error', foreground='red')
+        self.tree.tag_configure('paused', foreground='gray')
+        self.update_headings()
+
+        # Полоса прокрутки управляет окном строк, а не самим Treeview
+        self.scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll_rows(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_rows(3))
+        self.tree.bind('<Double-1>', self.on_double_click)
+
+        # Итоги и действия
+        bottom_frame = ttk.Frame(self.frame)
+        bottom_frame.pack(fill=tk.X, pady=(10, 0))
+
+        self.summary_var = tk.StringVar()
+        ttk.Label(bottom_frame, textvariable=self.summary_var).pack(side=tk.LEFT)
+        self.hint_label = ttk.Label(bottom_frame, text=self.app.i18n.get('jobs_expand_hint'),
+                                    foreground='gray')
+        self.hint_label.pack(side=tk.LEFT, padx=(10, 0))
+
+        self.cancel_btn = ttk.Button(bottom_frame, text=self.app.i18n.get('cancel_job'),
+                                     command=self.cancel_selected)
+        self.cancel_btn.pack(side=tk.RIGHT)
+
+        self.schedule_refresh()
+
+    def hide(self):
+        """Скрыть страницу"""
+        if self.frame:
+            self.frame.pack_forget()
+        # Скрытая страница не обновляется
+        if self._after_id is not None:
+            self.frame.after_cancel(self._after_id)
+            self._after_id = None
+
+    def update_language(self):
+        """Обновить язык"""
+        if self.frame:
+            self.title_label.config(text=self.app.i18n.get('jobs_title'))
+            self.cancel_btn.config(text=self.app.i18n.get('cancel_job'))
+            self.hint_label.config(text=self.app.i18n.get('jobs_expand_hint'))
+            self.update_headings()
+
+    def update_headings(self):
+        """Заголовки колонок"""
+        self.tree.heading('index', text='#')
+        for column in COLUMNS[1:]:
+            self.tree.heading(column, text=self.app.i18n.get(f'jobs_col_{column}'))
+
+    def schedule_refresh(self):
+        """Обновлять таблицу, пока страница видна"""
+        if self._after_id is not None:
+            self.frame.after_cancel(self._after_id)
+        self.refresh()
+        self._after_id = self.frame.after(REFRESH_MS, self.schedule_refresh)
+
+    @ui_watchdog.track('jobs_refresh')
+    def refresh(self):
+        """Перерисовать видимые строки: меняются только изменившиеся значения"""
+        scheduler = self.app.downloader.scheduler
+        jobs = scheduler.jobs()
+        if self.expanded is not None and not any(job is self.expanded for job in jobs):
+            self.expanded = self.entries = None
+        nested = self.entries.refresh() if self.entries is not None else 0
+        self.rows.set_total(len(jobs) + nested)
+        visible = visible_rows(jobs, self.expanded, self.entries, self.rows.offset,
+                               self.rows.visible)
+        self.ensure_items(self.rows.visible)
+
+        for slot, item in enumerate(self.items):
+            if slot < len(visible):
+                number, job, record = visible[slot]
+                if record is not None:
+                    values = format_entry_row(record)
+                    # Отмена и раскрытие относятся к задаче, а не к элементу
+                    self.item_jobs[slot] = None
+                else:
+                    values = format_job_row(number, job)
+                    if job.params.get('playlist'):
+                        marker = '▼ ' if job is self.expanded else '▶ '
+                        values = values[:3] + (marker + values[3],) + values[4:]
+                    self.item_jobs[slot] = job
+            else:
+                values = ()
+                self.item_jobs[slot] = None
+            if values != self.item_values[slot]:
+                state = values[1] if values else ''
+                self.tree.item(item, values=values,
+                               tags=(state,) if state in (ENTRY_ERROR, 'paused') else ())
+                self.item_values[slot] = values
+
+        self.scrollbar.set(*self.rows.fractions())
+        summary = self.app.i18n.get('jobs_summary').format(
+            running=len(scheduler.running_jobs()), queued=scheduler.queued_count(),
+            total=len(jobs))
+        if self.entries is not None:
+            summary += ', ' + self.app.i18n.get('jobs_entries').format(count=nested)
+        self.summary_var.set(summary)
+
+    def ensure_items(self, count):
+        """Создать или удалить строки Treeview под число видимых строк"""
+        while len(self.items) < count:
+            self.items.append(self.tree.insert('', tk.END, values=()))
+            self.item_values.append(())
+            self.item_jobs.append(None)
+        while len(self.items) > count:
+            self.tree.delete(self.items.pop())
+            self.item_values.pop()
+            self.item_jobs.pop()
+
+    def on_resize(self, event):
+        """Пересчитать число видимых строк по высоте таблицы"""
+        style = ttk.Style()
+        try:
+            row_height = int(style.lookup('Treeview', 'rowheight') or 20)
+        except (ValueError, tk.TclError):
+            row_height = 20
+        # Вычесть высоту заголовка
+        self.rows.set_visible((event.height - 25) // row_height)
+        self.refresh()
+
+    def on_scroll(self, *args):
+        """Команда полосы прокрутки: moveto <доля> или scroll <n> units|pages"""
+        if args[0] == 'moveto':
+            self.rows.moveto(args[1])
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.rows.visible
+            self.rows.scroll(step)
+        self.refresh()
+
+    def on_mousewheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    def scroll_rows(self, rows):
+        self.rows.scroll(rows)
+        self.refresh()
+
+    def on_double_click(self, event):
+        """Раскрыть или свернуть элементы плейлиста задачи"""
+        item = self.tree.identify_row(event.y)
+        if item not in self.items:
+            return
+        job = self.item_jobs[self.items.index(item)]
+        if job is None or not job.params.get('playlist'):
+            return
+        if job is self.expanded:
+            self.expanded = self.entries = None
+        else:
+            self.expanded = job
+            self.entries = self.app.downloader.entry_store.reader(job.id)
+        self.refresh()
+
+    def cancel_selected(self):
+        """Отменить выбранную задачу"""
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.items:
+            return
+        job = self.item_jobs[self.items.index(selection[0])]
+        if job is not None and not job.is_finished:
+            self.app.downloader.cancel_download(job)
+            self.refresh()
@@ -6,8 +6,13 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
+import threading
 from core.validation import Validation
-from core.downloader import Downloader
+from pages.plan_dialog import PlanDialog
+from core.uiwatch import ui_watchdog
+from core.jobs import JobGroup
+from core.planner import format_duration
+from pages.sparkline import ThroughputGraph
 from I18N import tr
 
 
@@ -15,18 +20,22 @@ class TikTokPage:
     def __init__(self, app):
         self.app = app
         self.frame = None
-        self.downloader = Downloader(app.config, app.i18n)
+        # Общий загрузчик приложения; страница только отображает задачи сервиса
+        self.downloader = app.downloader
+        # Задачи, запущенные с этой страницы
+        self.page_jobs = JobGroup()
         self.setup_callbacks()
     
     def setup_callbacks(self):
-        """Настроить колбэки для загрузчика"""
-        self.downloader.progress_callback = self.on_progress
-        self.downloader.status_callback = self.on_status
+        """Подписаться на задачи сервиса"""
+        self.downloader.subscribe('tiktok', self.on_progress, self.on_status)
     
     def show(self):
         """Показать страницу"""
         if self.frame:
             self.frame.pack(fill=tk.BOTH, expand=True)
+            self.refresh_state()
+            self.throughput_graph.start()
             return
         
         self.frame = ttk.Frame(self.app.content_frame)
@@ -83,6 +92,8 @@ class TikTokPage:
         
         # Правая панель - прогресс и логи
         self.create_progress_panel()
+        
+        self.refresh_state()
     
     def create_control_buttons(self, parent):
         """Создать кнопки управления"""
@@ -95,12 +106,16 @@ class TikTokPage:
         
         self.cancel_btn = ttk.Button(buttons_frame, text=self.app.i18n.get('cancel'),
                                    command=self.cancel_download, state=tk.DISABLED)
-        self.cancel_btn.pack(side=tk.LEFT)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.plan_btn = ttk.Button(buttons_frame, text=self.app.i18n.get('plan'),
+                                 command=self.start_plan)
+        self.plan_btn.pack(side=tk.LEFT)
     
     def _on_enter_pressed(self, event=None):
         """Обработка нажатия Enter для запуска загрузки"""
-        # Проверяем, что загрузка не идет
-        if not self.downloader.is_downloading_active():
+        # Проверяем, что загрузка со страницы не идет
+        if not self.page_jobs.busy():
             self.start_download()
     
     def create_progress_panel(self):
@@ -121,6 +136,11 @@ class TikTokPage:
         self.progress_info_var = tk.StringVar(value="Готов к загрузке")
         ttk.Label(progress_frame, textvariable=self.progress_info_var).pack()
         
+        # График скорости: провалы (например, до ~50 KB/s) видны во времени
+        self.throughput_graph = ThroughputGraph(progress_frame, self.app, 'tiktok')
+        self.throughput_graph.pack(fill=tk.X, pady=(5, 0))
+        self.throughput_graph.start()
+        
         # Логи
         logs_frame = ttk.LabelFrame(right_frame, text=self.app.i18n.get('logs'), padding=10)
         logs_frame.pack(fill=tk.BOTH, expand=True)
@@ -138,8 +158,8 @@ class TikTokPage:
         ttk.Checkbutton(logs_frame, text=self.app.i18n.get('auto_save_logs'),
                        variable=self.auto_save_logs_var).pack(anchor=tk.W, pady=(5, 0))
     
-    def start_download(self):
-        """Начать загрузку"""
+    def collect_options(self):
+        """Проверить URL и собрать параметры загрузки (None при ошибке)"""
         url = self.url_var.get().strip()
         
         # Валидация URL
@@ -152,52 +172,102 @@ class TikTokPage:
             elif error_type == 'invalid_domain':
                 messagebox.showerror(self.app.i18n.get('error'), 
                                    self.app.i18n.get('error_invalid_domain'))
+            return None
+        
+        # Получить cookies
+        cookies_file = None
+        if hasattr(self.app, 'cookie_manager') and self.app.cookie_manager:
+            cookies_file = self.app.cookie_manager.get_cookies_file()
+        
+        return {
+            'url': url,
+            'service': 'tiktok',
+            'quality': self.quality_var.get(),
+            'audio_only': self.audio_only_var.get(),
+            'playlist': False,
+            'first_n': 0,
+            'allow_mix': False,
+            'cookies_file': cookies_file,
+        }
+    
+    def start_download(self):
+        """Начать загрузку"""
+        options = self.collect_options()
+        if options is None:
             return
         
-        # Получить настройки
-        quality = self.quality_var.get()
-        audio_only = self.audio_only_var.get()
+        # Плейлист идёт фоновой задачей: одиночное видео можно запустить
+        # поверх него, и оно получит приоритет
+        priority = 'bulk' if options['playlist'] else 'interactive'
         
         # Обновить интерфейс
-        self.download_btn.config(state=tk.DISABLED)
-        self.cancel_btn.config(state=tk.NORMAL)
         self.progress_var.set(0)
         self.progress_info_var.set("Начинаем загрузку...")
         
         # Очистить логи
-        self.log_text.delete(1.0, tk.END)
+        if not self.downloader.is_downloading_active('tiktok'):
+            self.log_text.delete(1.0, tk.END)
         self.log("Начинаем загрузку...")
         
-        # Получить cookies
-        cookies_file = None
-        if hasattr(self.app, 'cookie_manager') and self.app.cookie_manager:
-            cookies_file = self.app.cookie_manager.get_cookies_file()
-        
         # Запустить загрузку
         try:
-            self.downloader.download(
-                url=url,
-                service='tiktok',
-                quality=quality,
-                audio_only=audio_only,
-                playlist=False,
-                first_n=0,
-                allow_mix=False,
-                cookies_file=cookies_file
-            )
+            self.page_jobs.add(self.downloader.download(priority=priority, **options))
         except Exception as e:
             self.log(f"Ошибка: {str(e)}")
-            self.reset_ui()
+            self.refresh_state()
             messagebox.showerror(self.app.i18n.get('error'), str(e))
+            return
+        self.refresh_state()
+    
+    def start_plan(self):
+        """Построить план загрузки без скачивания"""
+        options = self.collect_options()
+        if options is None:
+            return
+        
+        self.plan_btn.config(state=tk.DISABLED)
+        self.log(self.app.i18n.get('plan_running'))
+        
+        def plan_thread():
+            try:
+                plan = self.downloader.plan(**options)
+                self.frame.after(0, lambda: self.on_plan_ready(plan))
+            except Exception as e:
+                message = str(e)
+                self.frame.after(0, lambda: self.on_plan_error(message))
+        
+        threading.Thread(target=plan_thread, daemon=True).start()
+    
+    def on_plan_ready(self, plan):
+        """Показать построенный план"""
+        self.plan_btn.config(state=tk.NORMAL)
+        PlanDialog(self.app, plan)
+    
+    def on_plan_error(self, message):
+        """Обработка ошибки построения плана"""
+        self.plan_btn.config(state=tk.NORMAL)
+        self.log(f"Ошибка: {message}")
+        messagebox.showerror(self.app.i18n.get('error'), message)
+    
+    def refresh_state(self):
+        """Привести кнопки в соответствие с задачами, запущенными со страницы"""
+        if self.frame is None:
+            return
+        self.download_btn.config(state=tk.DISABLED if self.page_jobs.busy() else tk.NORMAL)
+        self.cancel_btn.config(state=tk.NORMAL if self.page_jobs.active() else tk.DISABLED)
     
     def cancel_download(self):
-        """Отменить загрузку"""
-        self.downloader.cancel_download()
+        """Отменить загрузки, запущенные со страницы (фоновые задачи сервиса не трогаются)"""
+        self.page_jobs.cancel(self.downloader)
         self.log("Загрузка отменена пользователем")
-        self.reset_ui()
+        self.refresh_state()
     
-    def on_progress(self, percent, speed, eta):
-        """Обработка прогресса загрузки"""
+    @ui_watchdog.ui_callback('progress', coalesce=True)
+    def on_progress(self, percent, speed, eta, progress=None):
+        """Обработка прогресса загрузки (по задаче целиком)"""
+        # Страница ещё не открывалась — отображать некуда
+        if self.frame is None:
+            return
         self.progress_var.set(percent)
         
         # Форматирование скорости
@@ -211,30 +281,47 @@ class TikTokPage:
         else:
             speed_str = "0 B/s"
         
-        # Форматирование ETA
+        # Форматирование ETA (у ночного плейлиста — часы)
         if eta and eta > 0:
-            eta_str = f"{eta // 60:02d}:{eta % 60:02d}"
+            eta_str = format_duration(eta)
         else:
             eta_str = "--:--"
         
-        self.progress_info_var.set(f"{percent:.1f}% | {speed_str} | ETA: {eta_str}")
+        # Плейлист: сколько элементов готово
+        entries_str = ""
+        if progress and progress.get('entries_total'):
+            entries_str = f"{progress['entries_done']}/{progress['entries_total']} | "
+        
+        self.progress_info_var.set(f"{entries_str}{percent:.1f}% | {speed_str} | ETA: {eta_str}")
     
+    @ui_watchdog.ui_callback('status')
     def on_status(self, status, message):
         """Обработка изменения статуса"""
+        if self.frame is None:
+            return
         if status == 'completed':
             self.log("Загрузка завершена успешно!")
             self.progress_info_var.set("Загрузка завершена")
-            self.reset_ui()
+            self.refresh_state()
         elif status == 'error':
             self.log(f"Ошибка загрузки: {message}")
             self.progress_info_var.set("Ошибка загрузки")
-            self.reset_ui()
+            self.refresh_state()
             messagebox.showerror(self.app.i18n.get('error'), message)
         elif status == 'canceled':
             self.log("Загрузка отменена")
             self.progress_info_var.set("Загрузка отменена")
-            self.reset_ui()
+            self.refresh_state()
+        elif status == 'waiting':
+            self.log(message)
+            self.progress_info_var.set(message)
+        elif status == 'exists':
+            self.log(f"Файл уже скачан: {message}")
+        elif status in ('moving', 'moved', 'retry', 'queued', 'paused', 'resumed', 'sync', 'profile', 'entries',
+                        'verify', 'verified', 'corrupt', 'verify_failed', 'duplicate', 'section'):
+            self.log(message)
     
+    @ui_watchdog.track('log')
     def log(self, message):
         """Добавить сообщение в лог"""
         self.log_text.insert(tk.END, f"{message}\n")
@@ -244,6 +331,7 @@ class TikTokPage:
         if self.auto_save_logs_var.get():
             self.save_logs()
     
+    @ui_watchdog.track('save_logs')
     def save_logs(self):
         """Сохранить логи в файл"""
         try:
@@ -254,19 +342,17 @@ class TikTokPage:
         except Exception as e:
             print(f"Ошибка сохранения логов: {e}")
     
-    def reset_ui(self):
-        """Сбросить интерфейс"""
-        self.download_btn.config(state=tk.NORMAL)
-        self.cancel_btn.config(state=tk.DISABLED)
-    
     def hide(self):
         """Скрыть страницу"""
         if self.frame:
             self.frame.pack_forget()
+            # Скрытая страница график не перерисовывает
+            self.throughput_graph.stop()
     
     def update_language(self):
         """Обновить язык"""
         if self.frame:
+            self.throughput_graph.update_language()
             # Обновить заголовок
             from tkinter import font as tkfont
             for widget in self.frame.winfo_children():
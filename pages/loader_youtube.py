@@ -7,9 +7,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import re
+import threading
 from urllib.parse import urlparse, parse_qs
 from core.validation import Validation
-from core.downloader import Downloader
+from pages.plan_dialog import PlanDialog
+from core.uiwatch import ui_watchdog
+from core.jobs import JobGroup
+from core.planner import format_duration
+from core.sections import parse_section
+from pages.sparkline import ThroughputGraph
 from I18N import tr
 
 
@@ -73,18 +79,22 @@ class YouTubePage:
     def __init__(self, app):
         self.app = app
         self.frame = None
-        self.downloader = Downloader(app.config, app.i18n)
+        # Общий загрузчик приложения; страница только отображает задачи сервиса
+        self.downloader = app.downloader
+        # Задачи, запущенные с этой страницы
+        self.page_jobs = JobGroup()
         self.setup_callbacks()
     
     def setup_callbacks(self):
-        """Настроить колбэки для загрузчика"""
-        self.downloader.progress_callback = self.on_progress
-        self.downloader.status_callback = self.on_status
+        """Подписаться на задачи сервиса"""
+        self.downloader.subscribe('youtube', self.on_progress, self.on_status)
     
     def show(self):
         """Показать страницу"""
         if self.frame:
             self.frame.pack(fill=tk.BOTH, expand=True)
+            self.refresh_state()
+            self.throughput_graph.start()
             return
         
         self.frame = ttk.Frame(self.app.content_frame)
@@ -159,9 +169,31 @@ class YouTubePage:
         ttk.Entry(first_n_frame, textvariable=self.first_n_var, width=5).pack(side=tk.LEFT, padx=(5, 5))
         ttk.Label(first_n_frame, text=self.app.i18n.get('all_zero')).pack(side=tk.LEFT)
         
+        self.sync_var = tk.BooleanVar()
+        ttk.Checkbutton(self.playlist_options_frame, text=self.app.i18n.get('sync_playlist'),
+                       variable=self.sync_var).pack(anchor=tk.W, pady=(5, 0))
+        
         # Привязываем обновление видимости к изменению переменной режима
         self.download_mode_var.trace_add('write', self._on_mode_change)
         
+        # Фрагмент видео: начало и конец (чч:мм:сс, мм:сс или секунды)
+        section_frame = ttk.Frame(options_frame)
+        section_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Label(section_frame, text=self.app.i18n.get('section_label')).pack(anchor=tk.W)
+        
+        section_times = ttk.Frame(section_frame)
+        section_times.pack(fill=tk.X, pady=(5, 0))
+        self.section_start_var = tk.StringVar()
+        self.section_end_var = tk.StringVar()
+        ttk.Label(section_times, text=self.app.i18n.get('section_start')).pack(side=tk.LEFT)
+        ttk.Entry(section_times, textvariable=self.section_start_var, width=9).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(section_times, text=self.app.i18n.get('section_end')).pack(side=tk.LEFT)
+        ttk.Entry(section_times, textvariable=self.section_end_var, width=9).pack(side=tk.LEFT, padx=(5, 0))
+        
+        self.precise_cut_var = tk.BooleanVar()
+        ttk.Checkbutton(section_frame, text=self.app.i18n.get('section_precise'),
+                       variable=self.precise_cut_var).pack(anchor=tk.W, pady=(5, 0))
+        
         # Качество - Radio Group
         quality_frame = ttk.LabelFrame(left_frame, text=self.app.i18n.get('quality'), padding=10)
         quality_frame.pack(fill=tk.X, pady=(0, 10))
@@ -203,6 +235,8 @@ class YouTubePage:
         
         # Обновить состояние опций плейлиста
         self.on_type_change()
+        
+        self.refresh_state()
     
     def _on_url_change(self, event=None):
         """Обработка изменения URL для автоопределения режима"""
@@ -224,8 +258,8 @@ class YouTubePage:
     
     def _on_enter_pressed(self, event=None):
         """Обработка нажатия Enter для запуска загрузки"""
-        # Проверяем, что загрузка не идет
-        if not self.downloader.is_downloading_active():
+        # Проверяем, что загрузка со страницы не идет
+        if not self.page_jobs.busy():
             self.start_download()
     
     def _on_mode_change(self, *args):
@@ -254,7 +288,11 @@ class YouTubePage:
         
         self.cancel_btn = ttk.Button(buttons_frame, text=self.app.i18n.get('cancel'),
                                    command=self.cancel_download, state=tk.DISABLED)
-        self.cancel_btn.pack(side=tk.LEFT)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.plan_btn = ttk.Button(buttons_frame, text=self.app.i18n.get('plan'),
+                                 command=self.start_plan)
+        self.plan_btn.pack(side=tk.LEFT)
     
     def create_progress_panel(self):
         """Создать панель прогресса"""
@@ -274,6 +312,11 @@ class YouTubePage:
         self.progress_info_var = tk.StringVar(value="Готов к загрузке")
         ttk.Label(progress_frame, textvariable=self.progress_info_var).pack()
         
+        # График скорости: провалы (например, до ~50 KB/s) видны во времени
+        self.throughput_graph = ThroughputGraph(progress_frame, self.app, 'youtube')
+        self.throughput_graph.pack(fill=tk.X, pady=(5, 0))
+        self.throughput_graph.start()
+        
         # Логи
         logs_frame = ttk.LabelFrame(right_frame, text=self.app.i18n.get('logs'), padding=10)
         logs_frame.pack(fill=tk.BOTH, expand=True)
@@ -295,22 +338,22 @@ class YouTubePage:
         """Обработка изменения типа загрузки"""
         self._on_mode_change()
     
-    def start_download(self):
-        """Начать загрузку"""
+    def collect_options(self):
+        """Проверить URL и собрать параметры загрузки (None при ошибке)"""
         url = self.url_var.get().strip()
         
         # Валидация URL с улучшенным сообщением
         if not url.strip():
             messagebox.showerror(tr('err.url.title'), tr('err.url.body', domains='youtube.com, m.youtube.com, youtu.be'))
-            return
+            return None
         
         if not validate_url_or_warn(url):
-            return
+            return None
         
         # Проверка RD-плейлиста и опции Allow MIX
         if is_rd_playlist(url) and not self.allow_mix_var.get():
             messagebox.showwarning(tr('warning.rd_playlist.title'), tr('warning.rd_playlist.body'))
-            return
+            return None
         
         # Финальная проверка URL vs выбранного режима
         selected_mode = self.download_mode_var.get()
@@ -322,57 +365,118 @@ class YouTubePage:
                 self.log_text.insert(tk.END, tr('info.mode.adjusted', m=detected_mode) + "\n")
                 self.log_text.see(tk.END)
         
-        # Получить настройки
-        quality = self.quality_var.get()
-        audio_only = self.audio_only_var.get()
-        playlist = (self.download_mode_var.get() == "playlist")
-        allow_mix = self.allow_mix_var.get()
-        
         try:
             first_n = int(self.first_n_var.get()) if self.first_n_var.get().isdigit() else 0
         except ValueError:
             first_n = 0
         
+        try:
+            section = parse_section(self.section_start_var.get(), self.section_end_var.get())
+        except ValueError as e:
+            messagebox.showerror(self.app.i18n.get('section_title'), str(e))
+            return None
+        if section and self.download_mode_var.get() == "playlist":
+            messagebox.showerror(self.app.i18n.get('section_title'),
+                                 self.app.i18n.get('section_playlist'))
+            return None
+        
+        # Получить cookies
+        cookies_file = None
+        if hasattr(self.app, 'cookie_manager') and self.app.cookie_manager:
+            cookies_file = self.app.cookie_manager.get_cookies_file()
+        
+        return {
+            'url': url,
+            'service': 'youtube',
+            'quality': self.quality_var.get(),
+            'audio_only': self.audio_only_var.get(),
+            'playlist': (self.download_mode_var.get() == "playlist"),
+            'first_n': first_n,
+            'allow_mix': self.allow_mix_var.get(),
+            'cookies_file': cookies_file,
+            'sync': (self.download_mode_var.get() == "playlist") and self.sync_var.get(),
+            'section': section,
+            'precise_cut': self.precise_cut_var.get(),
+        }
+    
+    def start_download(self):
+        """Начать загрузку"""
+        options = self.collect_options()
+        if options is None:
+            return
+        
+        # Плейлист идёт фоновой задачей: одиночное видео можно запустить
+        # поверх него, и оно получит приоритет
+        priority = 'bulk' if options['playlist'] else 'interactive'
+        
         # Обновить интерфейс
-        self.download_btn.config(state=tk.DISABLED)
-        self.cancel_btn.config(state=tk.NORMAL)
         self.progress_var.set(0)
         self.progress_info_var.set("Начинаем загрузку...")
         
         # Очистить логи
-        self.log_text.delete(1.0, tk.END)
+        if not self.downloader.is_downloading_active('youtube'):
+            self.log_text.delete(1.0, tk.END)
         self.log("Начинаем загрузку...")
         
-        # Получить cookies
-        cookies_file = None
-        if hasattr(self.app, 'cookie_manager') and self.app.cookie_manager:
-            cookies_file = self.app.cookie_manager.get_cookies_file()
-        
         # Запустить загрузку
         try:
-            self.downloader.download(
-                url=url,
-                service='youtube',
-                quality=quality,
-                audio_only=audio_only,
-                playlist=playlist,
-                first_n=first_n,
-                allow_mix=allow_mix,
-                cookies_file=cookies_file
-            )
+            self.page_jobs.add(self.downloader.download(priority=priority, **options))
         except Exception as e:
             self.log(f"Ошибка: {str(e)}")
-            self.reset_ui()
+            self.refresh_state()
             messagebox.showerror(self.app.i18n.get('error'), str(e))
+            return
+        self.refresh_state()
+    
+    def start_plan(self):
+        """Построить план загрузки без скачивания"""
+        options = self.collect_options()
+        if options is None:
+            return
+        
+        self.plan_btn.config(state=tk.DISABLED)
+        self.log(self.app.i18n.get('plan_running'))
+        
+        def plan_thread():
+            try:
+                plan = self.downloader.plan(**options)
+                self.frame.after(0, lambda: self.on_plan_ready(plan))
+            except Exception as e:
+                message = str(e)
+                self.frame.after(0, lambda: self.on_plan_error(message))
+        
+        threading.Thread(target=plan_thread, daemon=True).start()
+    
+    def on_plan_ready(self, plan):
+        """Показать построенный план"""
+        self.plan_btn.config(state=tk.NORMAL)
+        PlanDialog(self.app, plan)
+    
+    def on_plan_error(self, message):
+        """Обработка ошибки построения плана"""
+        self.plan_btn.config(state=tk.NORMAL)
+        self.log(f"Ошибка: {message}")
+        messagebox.showerror(self.app.i18n.get('error'), message)
+    
+    def refresh_state(self):
+        """Привести кнопки в соответствие с задачами, запущенными со страницы"""
+        if self.frame is None:
+            return
+        self.download_btn.config(state=tk.DISABLED if self.page_jobs.busy() else tk.NORMAL)
+        self.cancel_btn.config(state=tk.NORMAL if self.page_jobs.active() else tk.DISABLED)
     
     def cancel_download(self):
-        """Отменить загрузку"""
-        self.downloader.cancel_download()
+        """Отменить загрузки, запущенные со страницы (фоновые задачи сервиса не трогаются)"""
+        self.page_jobs.cancel(self.downloader)
         self.log("Загрузка отменена пользователем")
-        self.reset_ui()
+        self.refresh_state()
     
-    def on_progress(self, percent, speed, eta):
-        """Обработка прогресса загрузки"""
+    @ui_watchdog.ui_callback('progress', coalesce=True)
+    def on_progress(self, percent, speed, eta, progress=None):
+        """Обработка прогресса загрузки (по задаче целиком)"""
+        # Страница ещё не открывалась — отображать некуда
+        if self.frame is None:
+            return
         self.progress_var.set(percent)
         
         # Форматирование скорости
@@ -386,30 +490,47 @@ class YouTubePage:
         else:
             speed_str = "0 B/s"
         
-        # Форматирование ETA
+        # Форматирование ETA (у ночного плейлиста — часы)
         if eta and eta > 0:
-            eta_str = f"{eta // 60:02d}:{eta % 60:02d}"
+            eta_str = format_duration(eta)
         else:
             eta_str = "--:--"
         
-        self.progress_info_var.set(f"{percent:.1f}% | {speed_str} | ETA: {eta_str}")
+        # Плейлист: сколько элементов готово
+        entries_str = ""
+        if progress and progress.get('entries_total'):
+            entries_str = f"{progress['entries_done']}/{progress['entries_total']} | "
+        
+        self.progress_info_var.set(f"{entries_str}{percent:.1f}% | {speed_str} | ETA: {eta_str}")
     
+    @ui_watchdog.ui_callback('status')
     def on_status(self, status, message):
         """Обработка изменения статуса"""
+        if self.frame is None:
+            return
         if status == 'completed':
             self.log("Загрузка завершена успешно!")
             self.progress_info_var.set("Загрузка завершена")
-            self.reset_ui()
+            self.refresh_state()
         elif status == 'error':
             self.log(f"Ошибка загрузки: {message}")
             self.progress_info_var.set("Ошибка загрузки")
-            self.reset_ui()
+            self.refresh_state()
             messagebox.showerror(self.app.i18n.get('error'), message)
         elif status == 'canceled':
             self.log("Загрузка отменена")
             self.progress_info_var.set("Загрузка отменена")
-            self.reset_ui()
+            self.refresh_state()
+        elif status == 'waiting':
+            self.log(message)
+            self.progress_info_var.set(message)
+        elif status == 'exists':
+            self.log(f"Файл уже скачан: {message}")
+        elif status in ('moving', 'moved', 'retry', 'queued', 'paused', 'resumed', 'sync', 'profile', 'entries',
+                        'verify', 'verified', 'corrupt', 'verify_failed', 'duplicate', 'section'):
+            self.log(message)
     
+    @ui_watchdog.track('log')
     def log(self, message):
         """Добавить сообщение в лог"""
         self.log_text.insert(tk.END, f"{message}\n")
@@ -419,6 +540,7 @@ class YouTubePage:
         if self.auto_save_logs_var.get():
             self.save_logs()
     
+    @ui_watchdog.track('save_logs')
     def save_logs(self):
         """Сохранить логи в файл"""
         try:
@@ -429,15 +551,12 @@ class YouTubePage:
         except Exception as e:
             print(f"Ошибка сохранения логов: {e}")
     
-    def reset_ui(self):
-        """Сбросить интерфейс"""
-        self.download_btn.config(state=tk.NORMAL)
-        self.cancel_btn.config(state=tk.DISABLED)
-    
     def hide(self):
         """Скрыть страницу"""
         if self.frame:
             self.frame.pack_forget()
+            # Скрытая страница график не перерисовывает
+            self.throughput_graph.stop()
     
     def update_language(self):
         """Обновить язык"""
@@ -458,3 +577,5 @@ class YouTubePage:
                 self.download_btn.config(text=tr('yt.download'))
             if hasattr(self, 'cancel_btn'):
                 self.cancel_btn.config(text=tr('yt.cancel'))
+            if hasattr(self, 'throughput_graph'):
+                self.throughput_graph.update_language()
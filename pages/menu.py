@@ -83,7 +83,27 @@ class MenuPage:
         # Обновление yt-dlp
         update_btn = ttk.Button(settings_buttons_frame, text=self.app.i18n.get('update_yt_dlp'),
                               command=self.update_yt_dlp)
-        update_btn.pack(side=tk.LEFT)
+        update_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # Профили сервисов
+        profiles_btn = ttk.Button(settings_buttons_frame, text=self.app.i18n.get('service_profiles'),
+                                command=self.edit_profiles)
+        profiles_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # Задачи загрузки
+        jobs_btn = ttk.Button(settings_buttons_frame, text=self.app.i18n.get('jobs'),
+                              command=lambda: self.app.show_page('jobs'))
+        jobs_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # История загрузок
+        history_btn = ttk.Button(settings_buttons_frame, text=self.app.i18n.get('history'),
+                                 command=lambda: self.app.show_page('history'))
+        history_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # Экспорт метрик
+        metrics_btn = ttk.Button(settings_buttons_frame, text=self.app.i18n.get('export_metrics'),
+                                 command=self.export_metrics)
+        metrics_btn.pack(side=tk.LEFT)
     
     def hide(self):
         """Скрыть страницу"""
@@ -94,22 +114,36 @@ class MenuPage:
         """Создать cookies из браузера"""
         self.app.cookie_manager.create_cookies_from_browser()
     
+    def edit_profiles(self):
+        """Открыть настройки профилей сервисов"""
+        from pages.profiles_dialog import ProfilesDialog
+        ProfilesDialog(self.app)
+    
+    def export_metrics(self):
+        """Сохранить метрики (включая отзывчивость интерфейса) в JSON"""
+        from tkinter import filedialog, messagebox
+        from core.metrics import metrics
+        path = filedialog.asksaveasfilename(defaultextension='.json',
+                                            filetypes=[('JSON', '*.json')],
+                                            initialfile='vd_metrics.json')
+        if not path:
+            return
+        try:
+            metrics.export(path)
+        except OSError as e:
+            messagebox.showerror(self.app.i18n.get('error'), str(e))
+    
     def check_version(self):
         """Проверить версию yt-dlp"""
-        from core.downloader import Downloader
-        downloader = Downloader(self.app.config, self.app.i18n)
-        version = downloader.get_yt_dlp_version()
+        version = self.app.downloader.get_yt_dlp_version()
         
         from tkinter import messagebox
         messagebox.showinfo(self.app.i18n.get('yt_dlp_version'), version)
     
     def update_yt_dlp(self):
         """Обновить yt-dlp"""
-        from core.downloader import Downloader
-        downloader = Downloader(self.app.config, self.app.i18n)
-        
         from tkinter import messagebox
-        if downloader.update_yt_dlp():
+        if self.app.downloader.update_yt_dlp():
             messagebox.showinfo(self.app.i18n.get('success'), 
                               "yt-dlp успешно обновлен")
         else:
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Окно с планом загрузки (dry-run)
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from core.planner import format_size, format_duration
+
+
+class PlanDialog:
+    def __init__(self, app, plan):
+        self.app = app
+        self.plan = plan
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title(app.i18n.get('plan_title'))
+        self.window.geometry("700x450")
+        self.window.transient(app.root)
+
+        self.create_content()
+
+    def create_content(self):
+        """Создать содержимое окна"""
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        # Таблица записей
+        table_frame = ttk.Frame(frame)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+
+        columns = ('index', 'title', 'format', 'size')
+        self.tree = ttk.Treeview(table_frame, columns=columns, show='headings')
+        self.tree.heading('index', text='#')
+        self.tree.heading('title', text=self.app.i18n.get('plan_col_title'))
+        self.tree.heading('format', text=self.app.i18n.get('plan_col_format'))
+        self.tree.heading('size', text=self.app.i18n.get('plan_col_size'))
+        self.tree.column('index', width=50, anchor=tk.E, stretch=False)
+        self.tree.column('title', width=380)
+        self.tree.column('format', width=100, stretch=False)
+        self.tree.column('size', width=100, anchor=tk.E, stretch=False)
+        self.tree.tag_configure('unknown', foreground='red')
+
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.config(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        for entry in self.plan.entries:
+            size_str = format_size(entry.size)
+            if entry.approx and entry.size is not None:
+                size_str = '~' + size_str
+            tags = ('unknown',) if entry.unknown_size else ()
+            self.tree.insert('', tk.END, values=(entry.index, entry.title,
+                                                 entry.format_id or '', size_str), tags=tags)
+
+        # Итоги
+        summary_frame = ttk.Frame(frame)
+        summary_frame.pack(fill=tk.X, pady=(10, 0))
+
+        lines = [
+            f"{self.app.i18n.get('plan_total')}: {format_size(self.plan.total_bytes)}"
+            f" ({len(self.plan.entries)})",
+            f"{self.app.i18n.get('plan_unknown')}: {self.plan.unknown_count}",
+            f"{self.app.i18n.get('plan_free')}: {format_size(self.plan.free_bytes)}",
+            f"{self.app.i18n.get('plan_eta')}: {format_duration(self.plan.estimated_seconds)}",
+        ]
+        for line in lines:
+            ttk.Label(summary_frame, text=line).pack(anchor=tk.W)
+
+        if self.plan.fits is False:
+            ttk.Label(summary_frame, text=self.app.i18n.get('plan_no_space'),
+                      foreground='red').pack(anchor=tk.W, pady=(5, 0))
+
+        ttk.Button(frame, text=self.app.i18n.get('close'),
+                   command=self.window.destroy).pack(anchor=tk.E, pady=(10, 0))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Окно настройки профилей сервисов
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from core.profiles import PROFILE_FIELDS, SERVICES, DEFAULT_PROFILES, get_profile, save_profile
+from core.scheduler import service_slots
+
+
+class ProfilesDialog:
+    def __init__(self, app):
+        self.app = app
+        self.vars = {}
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title(app.i18n.get('service_profiles'))
+        self.window.transient(app.root)
+        self.window.resizable(False, False)
+
+        self.create_content()
+
+    def create_content(self):
+        """Создать содержимое окна"""
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        # Заголовки колонок — сервисы
+        for column, service in enumerate(SERVICES, start=1):
+            ttk.Label(frame, text=self.app.i18n.get(service),
+                      font=('Arial', 9, 'bold')).grid(row=0, column=column, padx=5, pady=(0, 5))
+
+        for row, (key, _type, label_key) in enumerate(PROFILE_FIELDS, start=1):
+            ttk.Label(frame, text=self.app.i18n.get(label_key)).grid(row=row, column=0,
+                                                                   sticky=tk.W, padx=(0, 10))
+            for column, service in enumerate(SERVICES, start=1):
+                profile = get_profile(self.app.config, service)
+                var = tk.StringVar(value=str(profile[key]))
+                ttk.Entry(frame, textvariable=var, width=8).grid(row=row, column=column, padx=5, pady=2)
+                self.vars[(service, key)] = var
+
+        buttons_frame = ttk.Frame(frame)
+        buttons_frame.grid(row=len(PROFILE_FIELDS) + 1, column=0, columnspan=len(SERVICES) + 1,
+                           sticky=tk.E, pady=(10, 0))
+        ttk.Button(buttons_frame, text=self.app.i18n.get('reset_defaults'),
+                   command=self.reset_defaults).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(buttons_frame, text=self.app.i18n.get('save'),
+                   command=self.save).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(buttons_frame, text=self.app.i18n.get('close'),
+                   command=self.window.destroy).pack(side=tk.LEFT)
+
+    def reset_defaults(self):
+        """Вернуть встроенные значения"""
+        for (service, key), var in self.vars.items():
+            var.set(str(DEFAULT_PROFILES[service][key]))
+
+    def save(self):
+        """Сохранить профили"""
+        values = {service: {} for service in SERVICES}
+        try:
+            for key, type_, label_key in PROFILE_FIELDS:
+                for service in SERVICES:
+                    value = type_(self.vars[(service, key)].get().strip())
+                    if value < 0:
+                        raise ValueError(self.app.i18n.get(label_key))
+                    values[service][key] = value
+        except ValueError as e:
+            messagebox.showerror(self.app.i18n.get('error'),
+                                 f"{self.app.i18n.get('error_invalid_value')}: {e}",
+                                 parent=self.window)
+            return
+
+        for service, profile in values.items():
+            save_profile(self.app.config, service, profile)
+            service_slots.set_limit(service, profile['max_jobs'])
+        self.window.destroy()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+График скорости загрузки для панели прогресса
+"""
+
+import datetime
+import tkinter as tk
+from tkinter import ttk
+
+from core.planner import format_size
+from core.uiwatch import ui_watchdog
+
+
+# Период перерисовки графика
+GRAPH_REFRESH_MS = 1000
+# Пикселей на отсчёт: график показывает последние width / PIXELS_PER_SAMPLE отсчётов
+PIXELS_PER_SAMPLE = 2
+
+
+def sparkline_points(values, width, height, pad=2):
+    """Координаты ломаной (x1, y1, x2, y2, ...) для значений; пусто, если точек меньше двух"""
+    if len(values) < 2:
+        return []
+    peak = max(values) or 1
+    step = (width - 2 * pad) / (len(values) - 1)
+    usable = height - 2 * pad
+    coords = []
+    for index, value in enumerate(values):
+        coords.append(pad + index * step)
+        coords.append(height - pad - value / peak * usable)
+    return coords
+
+
+def sparkline_label(values):
+    """Подпись графика: текущая скорость и минимум за видимый период"""
+    if not values:
+        return ''
+    return f"{format_size(values[-1])}/s (min {format_size(min(values))}/s)"
+
+
+class ThroughputGraph:
+    """Спарклайн скорости последней задачи сервиса и экспорт её истории в CSV"""
+
+    def __init__(self, parent, app, service, width=300, height=40):
+        self.app = app
+        self.service = service
+        self.width = width
+        self.height = height
+        self.history = None
+        self._after_id = None
+
+        self.frame = ttk.Frame(parent)
+        self.canvas = tk.Canvas(self.frame, width=width, height=height, background='white',
+                                highlightthickness=1, highlightbackground='#cccccc')
+        self.canvas.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self._line = self.canvas.create_line(0, 0, 0, 0, fill='#1f77b4', width=1.5)
+        self._label = self.canvas.create_text(width - 4, 2, anchor=tk.NE, text='',
+                                              font=('Arial', 8))
+        self.export_btn = ttk.Button(self.frame, text=app.i18n.get('throughput_export'),
+                                     command=self.export)
+        self.export_btn.pack(side=tk.RIGHT, padx=(5, 0))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def start(self):
+        """Перерисовывать график, пока страница видна"""
+        self.stop()
+        self.refresh()
+        self._after_id = self.frame.after(GRAPH_REFRESH_MS, self.start)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.frame.after_cancel(self._after_id)
+            self._after_id = None
+
+    @ui_watchdog.track('throughput_graph')
+    def refresh(self):
+        # После завершения задачи график остаётся на последней истории
+        history = self.app.downloader.throughput_history(self.service)
+        if history is not None:
+            self.history = history
+        if self.history is None:
+            return
+        width = self.canvas.winfo_width()
+        if width <= 1:
+            width = self.width
+        values = self.history.rates.values()[-max(width // PIXELS_PER_SAMPLE, 2):]
+        coords = sparkline_points(values, width, self.height)
+        if coords:
+            self.canvas.coords(self._line, *coords)
+        self.canvas.coords(self._label, width - 4, 2)
+        self.canvas.itemconfig(self._label, text=sparkline_label(values))
+
+    def export(self):
+        """Сохранить историю скорости в CSV"""
+        from tkinter import filedialog, messagebox
+        history = self.history or self.app.downloader.throughput_history()
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = filedialog.asksaveasfilename(defaultextension='.csv',
+                                            filetypes=[('CSV', '*.csv')],
+                                            initialfile=f"{self.service}_throughput_{stamp}.csv")
+        if not path:
+            return
+        try:
+            history.export_csv(path)
+        except OSError as e:
+            messagebox.showerror(self.app.i18n.get('error'), str(e))
+
+    def update_language(self):
+        self.export_btn.config(text=self.app.i18n.get('throughput_export'))
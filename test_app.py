@@ -7,7 +7,17 @@
 import unittest
 import sys
 import os
+import tempfile
+import json
+import datetime
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from unittest import mock
 
 # Добавляем путь к модулям
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -15,6 +25,41 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from core.validation import Validation
 from core.config import Config
 from core.i18n import I18n
+from core.planner import build_plan, entry_size, clip_size
+from core.diskspace import DiskReservations, InsufficientSpaceError
+from core.staging import StagingArea, StagingError, copy_verified
+from core.profiles import get_profile, save_profile
+from core.scheduler import ServiceSlots, SlotWaitCancelled, JobScheduler
+from core.jobs import Job, JobGroup, COMPLETED, CANCELED
+from core.journal import JobJournal
+from core.windows import TimeWindow, WindowPolicy
+from core.sync import SyncStore, select_new_entries, archive_id
+from core.watch import WatchFolder, parse_url_file
+from pages.jobs import RowWindow, format_job_row, format_entry_row, visible_rows
+from core.uiwatch import UiWatchdog
+from core.connections import HttpPool, DnsCache
+from benchmarks.media_server import MediaServer
+from benchmarks.run import compare
+from core.profiling import JobProfiler
+from core.progress import JobProgress
+from core.history import HistoryStore, fts_query
+from pages.history import parse_date, parse_size_mb, format_history_row
+from core.throughput import RingBuffer, ThroughputHistory, ThroughputMonitor
+from pages.sparkline import sparkline_points, sparkline_label
+from core.entries import (EntryStore, EntryRecord, EntryReader, ENTRY_OK, ENTRY_SKIPPED,
+                          ENTRY_ERROR)
+from core.downloader import Downloader
+from core.dirindex import DirectoryIndex, template_regex, is_partial
+from core.verify import Verifier, VerifyTask, VerifyResult, evaluate
+from core.hashing import StreamHasher, FileHashes, new_hash, hash_file
+from core.sections import parse_time, parse_section, outtmpl_with_section, SectionReport
+from core.history import section_label
+from core import hashing
+from core import downloader as downloader_module
+from core import segmented as segmented_module
+from core.segmented import SegmentedDownload, SegmentedError, plan_pieces, parse_content_range
+from core.retry import (RetryPolicy, RetryScheduler, BreakerRegistry, CircuitBreaker,
+                        DownloadFailed, classify_error)
 
 # Импорт функций автоопределения режима
 try:
@@ -88,6 +133,22 @@ class TestValidation(unittest.TestCase):
                 is_valid_tiktok, _ = Validation.validate_url_for_service(url, 'tiktok')
                 self.assertFalse(is_valid_youtube)
                 self.assertFalse(is_valid_tiktok)
+    
+    def test_extract_video_id(self):
+        """Тест: id видео из ссылки без обращения к сети"""
+        cases = {
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10": 'dQw4w9WgXcQ',
+            "https://youtu.be/dQw4w9WgXcQ?si=x": 'dQw4w9WgXcQ',
+            "https://youtube.com/shorts/dQw4w9WgXcQ": 'dQw4w9WgXcQ',
+            "https://www.tiktok.com/@user/video/1234567890": '1234567890',
+            "https://www.youtube.com/playlist?list=PL123": None,
+            "https://www.youtube.com/@channel": None,
+            "https://vt.tiktok.com/ZSd8K9m2/": None,
+            "https://example.com/watch?v=dQw4w9WgXcQ": None,
+        }
+        for url, video_id in cases.items():
+            with self.subTest(url=url):
+                self.assertEqual(Validation.extract_video_id(url), video_id)
 
 
 class TestConfig(unittest.TestCase):
@@ -202,6 +263,2139 @@ class TestI18n(unittest.TestCase):
         self.assertEqual(self.i18n_ru.language, 'en')
 
 
+class TestPlanner(unittest.TestCase):
+    """Тесты планировщика загрузки (dry-run)"""
+    
+    def test_entry_size(self):
+        """Тест оценки размера записи"""
+        self.assertEqual(entry_size({'filesize': 100}), (100, False))
+        self.assertEqual(entry_size({'filesize_approx': 50}), (50, True))
+        self.assertEqual(entry_size({}), (None, True))
+        merged = {'requested_formats': [{'filesize': 100}, {'filesize_approx': 20}]}
+        self.assertEqual(entry_size(merged), (120, True))
+    
+    def test_playlist_plan(self):
+        """Тест плана для плейлиста"""
+        info = {
+            '_type': 'playlist',
+            'entries': [
+                {'id': 'a', 'title': 'A', 'format_id': '18', 'filesize': 1000},
+                None,
+                {'id': 'b', 'title': 'B', 'format_id': '22'},
+                {'id': 'c', 'title': 'C', 'filesize_approx': 3000},
+            ]
+        }
+        plan = build_plan('https://youtube.com/playlist?list=PL1', info, '.', throughput_bps=1000)
+        self.assertEqual(len(plan.entries), 3)
+        self.assertEqual(plan.total_bytes, 4000)
+        self.assertEqual(plan.unknown_count, 1)
+        self.assertEqual(plan.estimated_seconds, 4.0)
+        self.assertTrue(plan.fits)
+        
+        data = plan.to_dict()
+        self.assertEqual(data['entry_count'], 3)
+        self.assertTrue(data['entries'][1]['unknown_size'])
+    
+    def test_plan_without_throughput(self):
+        """Тест плана без измеренной скорости"""
+        plan = build_plan('u', {'id': 'x', 'filesize': 10}, '.')
+        self.assertIsNone(plan.estimated_seconds)
+
+
+class TestDiskReservations(unittest.TestCase):
+    """Тесты резервирования места на диске"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.registry = DiskReservations()
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_reservations_are_not_shared(self):
+        """Тест: две задачи не могут занять одно и то же свободное место"""
+        free = self.registry.available(self.dir)
+        size = free // 2 + 1
+        self.registry.reserve('a', self.dir, size, use_placeholder=False)
+        with self.assertRaises(InsufficientSpaceError):
+            self.registry.reserve('b', self.dir, size, use_placeholder=False)
+        self.registry.release('a')
+        self.registry.reserve('b', self.dir, size, use_placeholder=False)
+        self.registry.release('b')
+    
+    def test_remove_stale_placeholders(self):
+        """Тест: заполнители прошлого запуска удаляются, активные остаются"""
+        stale = os.path.join(self.dir, '.vd-reserve-oldjob')
+        with open(stale, 'wb') as f:
+            f.write(b'x' * 1024)
+        keep = os.path.join(self.dir, 'video.mp4')
+        with open(keep, 'wb') as f:
+            f.write(b'x')
+        reservation = self.registry.reserve('live', self.dir, 4096)
+        
+        self.assertEqual(self.registry.remove_stale(self.dir), 1)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(keep))
+        if reservation.placeholder:
+            self.assertTrue(os.path.exists(reservation.placeholder))
+        self.registry.release('live')
+        self.assertEqual(self.registry.remove_stale(os.path.join(self.dir, 'missing')), 0)
+    
+    def test_downloader_removes_stale_placeholders(self):
+        """Тест: загрузчик при запуске удаляет заполнители в папке загрузки и промежуточной"""
+        staging_job = os.path.join(self.dir, 'staging', 'job1')
+        os.makedirs(staging_job)
+        paths = [os.path.join(self.dir, '.vd-reserve-a'),
+                 os.path.join(staging_job, '.vd-reserve-job1')]
+        for path in paths:
+            with open(path, 'wb') as f:
+                f.write(b'x')
+        Downloader(MemoryConfig(dns_cache_ttl=0, download_dir=self.dir,
+                                staging_dir=os.path.join(self.dir, 'staging')), I18n('ru'))
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+    
+    def test_waiting_job_starts_after_release(self):
+        """Тест: ожидающая задача получает место после отмены другой"""
+        free = self.registry.available(self.dir)
+        size = free // 2 + 1
+        self.registry.reserve('a', self.dir, size, use_placeholder=False)
+        waited = threading.Event()
+        result = {}
+        
+        def worker():
+            self.registry.reserve('b', self.dir, size, wait=True,
+                                  on_wait=lambda n, a: waited.set(), use_placeholder=False)
+            result['ok'] = True
+        
+        thread = threading.Thread(target=worker)
+        thread.start()
+        self.assertTrue(waited.wait(5))
+        self.registry.release('a')
+        thread.join(5)
+        self.assertTrue(result.get('ok'))
+        self.registry.release('b')
+    
+    def test_slow_work_outside_lock(self):
+        """Тест: выделение заполнителя и on_wait не держат блокировку реестра"""
+        lock_free = []
+        
+        def slow_preallocate(path, size):
+            # В это время consume других задач должен проходить
+            lock_free.append(self.registry._lock.acquire(blocking=False))
+            self.registry._lock.release()
+            return False
+        
+        with mock.patch('core.diskspace.preallocate', slow_preallocate):
+            self.registry.reserve('a', self.dir, 4096)
+        self.assertEqual(lock_free, [True])
+        self.registry.release('a')
+        
+        # on_wait может обращаться к реестру: освободить место прямо из колбэка
+        free = self.registry.available(self.dir)
+        size = free // 2 + 1
+        self.registry.reserve('a', self.dir, size, use_placeholder=False)
+        waits = []
+        
+        def on_wait(needed, available):
+            waits.append(needed)
+            self.registry.release('a')
+        
+        self.registry.reserve('b', self.dir, size, wait=True, on_wait=on_wait,
+                              use_placeholder=False)
+        self.assertEqual(waits, [size])
+        self.registry.release('b')
+    
+    def test_too_big_job_is_refused(self):
+        """Тест: задача больше диска отклоняется сразу даже в режиме ожидания"""
+        free = self.registry.available(self.dir)
+        with self.assertRaises(InsufficientSpaceError):
+            self.registry.reserve('a', self.dir, free * 2, wait=True, use_placeholder=False)
+    
+    def test_placeholder_shrinks_and_is_removed(self):
+        """Тест: файл-заполнитель уменьшается по мере загрузки и удаляется"""
+        size = 32 * 1024 * 1024
+        reservation = self.registry.reserve('a', self.dir, size)
+        if reservation.placeholder is None:
+            self.skipTest('ФС не поддерживает preallocation')
+        self.assertEqual(os.path.getsize(reservation.placeholder), size)
+        self.registry.consume('a', 16 * 1024 * 1024)
+        self.assertEqual(os.path.getsize(reservation.placeholder), 16 * 1024 * 1024)
+        placeholder = reservation.placeholder
+        self.registry.release('a')
+        self.assertFalse(os.path.exists(placeholder))
+
+
+class TestStaging(unittest.TestCase):
+    """Тесты промежуточной папки"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.staging_root = os.path.join(self.tmp.name, 'scratch')
+        self.final_root = os.path.join(self.tmp.name, 'final')
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_commit_keeps_relative_path(self):
+        """Тест: файл переносится с сохранением относительного пути outtmpl"""
+        staging = StagingArea(self.staging_root, 'job1')
+        src = os.path.join(staging.path, 'Playlist', '001 - video.mp4')
+        os.makedirs(os.path.dirname(src))
+        with open(src, 'wb') as f:
+            f.write(b'x' * 1000)
+        with open(os.path.join(staging.path, 'Playlist', '002 - video.mp4.part'), 'wb') as f:
+            f.write(b'partial')
+        
+        staging.collect(src)
+        committed = staging.commit_all(self.final_root)
+        
+        expected = os.path.join(self.final_root, 'Playlist', '001 - video.mp4')
+        self.assertEqual(committed, [expected])
+        self.assertEqual(os.path.getsize(expected), 1000)
+        self.assertTrue(staging.cleanup())
+        self.assertFalse(os.path.exists(staging.path))
+    
+    def test_copy_verified(self):
+        """Тест последовательного копирования с проверкой"""
+        src = os.path.join(self.tmp.name, 'src.bin')
+        dst = os.path.join(self.tmp.name, 'dst.bin')
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        with open(src, 'wb') as f:
+            f.write(data)
+        hasher = StreamHasher()
+        copy_verified(src, dst, chunk_size=1024 * 1024, hasher=hasher)
+        with open(dst, 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertFalse(os.path.exists(dst + '.vdtmp'))
+        self.assertEqual(hasher.hexdigest(), hash_file(src))
+        # Хеш при загрузке не совпал с копией: файл не переносится
+        with self.assertRaises(StagingError):
+            copy_verified(src, dst + '2', expected_digest='0' * 64)
+        self.assertFalse(os.path.exists(dst + '2'))
+    
+    def test_commit_hashes(self):
+        """Тест: хеш посчитанный при загрузке переносится вместе с файлом"""
+        staging = StagingArea(self.staging_root, 'job3')
+        src = os.path.join(staging.path, 'video.mp4')
+        with open(src, 'wb') as f:
+            f.write(b'data' * 1000)
+        digest = hash_file(src)
+        hashing.file_hashes.remember(src, 'streamed')
+        staging.collect(src)
+        dst = staging.commit_all(self.final_root, hash_files=True)[0]
+        self.assertEqual(staging.hashes[dst], 'streamed')
+        
+        # Без хеша от загрузки файл читается в промежуточной папке
+        other = StagingArea(self.staging_root, 'job4')
+        src = os.path.join(other.path, 'other.mp4')
+        with open(src, 'wb') as f:
+            f.write(b'data' * 1000)
+        other.collect(src)
+        dst = other.commit_all(self.final_root, hash_files=True)[0]
+        self.assertEqual(other.hashes[dst], digest)
+    
+    def test_cleanup_keeps_uncommitted_files(self):
+        """Тест: промежуточная папка не удаляется, пока есть неперенесённые файлы"""
+        staging = StagingArea(self.staging_root, 'job2')
+        src = os.path.join(staging.path, 'video.mp4')
+        with open(src, 'wb') as f:
+            f.write(b'data')
+        staging.collect(src)
+        self.assertFalse(staging.cleanup())
+        self.assertTrue(os.path.exists(src))
+    
+    def test_files_committed_as_they_finish(self):
+        """Тест: готовый файл плейлиста переносится сразу, а не в конце задачи"""
+        downloader = Downloader(MemoryConfig(dns_cache_ttl=0, hash_downloads=False,
+                                             download_dir=self.final_root,
+                                             staging_dir=self.staging_root), I18n('ru'))
+        try:
+            staging = StagingArea(self.staging_root, 'job5')
+            statuses = []
+            job = Job('https://youtube.com/playlist?list=x', 'youtube',
+                      status_callback=lambda status, message: statuses.append(status))
+            for index in range(3):
+                src = os.path.join(staging.path, 'Playlist', f'{index:03d} - video.mp4')
+                os.makedirs(os.path.dirname(src), exist_ok=True)
+                with open(src, 'wb') as f:
+                    f.write(b'x' * 1000)
+                # post_hook yt-dlp после обработки элемента
+                downloader._commit_staged_file(job, staging, self.final_root, src)
+                self.assertFalse(os.path.exists(src))
+                self.assertTrue(os.path.exists(os.path.join(self.final_root, 'Playlist',
+                                                            f'{index:03d} - video.mp4')))
+                self.assertEqual(staging.files, [])
+            self.assertEqual(statuses, ['moved'] * 3)
+            self.assertTrue(staging.cleanup())
+        finally:
+            downloader.history.close()
+
+
+class FaultInjectingServer:
+    """Локальный HTTP-сервер, отвечающий заданной последовательностью кодов"""
+    
+    def __init__(self, codes, default=200):
+        self.codes = list(codes)
+        self.default = default
+        self.requests = 0
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                code = server.codes.pop(0) if server.codes else server.default
+                body = b'ok' if code == 200 else b'fail'
+                self.send_response(code)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/video"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+    
+    def fetch(self):
+        with urllib.request.urlopen(self.url, timeout=5) as response:
+            return response.read()
+    
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class RangeServer:
+    """Локальный HTTP-сервер с поддержкой Range и keep-alive"""
+    
+    def __init__(self, body, ranges=True):
+        self.body = body
+        self.ranges = ranges
+        self.requests = 0
+        self.connections = 0
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def setup(self):
+                super().setup()
+                server.connections += 1
+            
+            def do_GET(self):
+                server.requests += 1
+                if self.path.startswith('/r'):
+                    # /rN перенаправляет на /r(N-1), /r0 — на файл
+                    hops = int(self.path[2:])
+                    self.send_response(302)
+                    self.send_header('Location', f'/r{hops - 1}' if hops else '/video.mp4')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.body
+                spec = self.headers.get('Range')
+                if server.ranges and spec and spec.startswith('bytes='):
+                    start, _, end = spec[len('bytes='):].partition('-')
+                    start = int(start)
+                    end = min(int(end) if end else len(body) - 1, len(body) - 1)
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+                    body = body[start:end + 1]
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/video.mp4"
+        self.redirect_url = lambda hops: self.url.replace('/video.mp4', f'/r{hops - 1}')
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+    
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestRetry(unittest.TestCase):
+    """Тесты повторных попыток и circuit breaker"""
+    
+    def setUp(self):
+        self.policy = RetryPolicy(max_attempts=4, base_delay=0.01, max_delay=0.05)
+        self.servers = []
+    
+    def tearDown(self):
+        for server in self.servers:
+            server.close()
+    
+    def server(self, codes, default=200):
+        server = FaultInjectingServer(codes, default)
+        self.servers.append(server)
+        return server
+    
+    def test_classify_messages(self):
+        """Тест классификации ошибок yt-dlp"""
+        self.assertEqual(classify_error('Unable to download webpage: HTTP Error 429: Too Many Requests'),
+                         'throttled')
+        self.assertEqual(classify_error('unable to download video data: HTTP Error 403: Forbidden'),
+                         'forbidden')
+        self.assertEqual(classify_error('Read timed out.'), 'network')
+        self.assertEqual(classify_error('Unable to extract initial player response'), 'extractor')
+        self.assertEqual(classify_error('Private video. Sign in if you\'ve been granted access'), 'fatal')
+        self.assertEqual(classify_error(DownloadFailed(['Video unavailable', 'HTTP Error 429'])),
+                         'throttled')
+    
+    def test_backoff_grows_with_jitter(self):
+        """Тест: задержка растёт экспоненциально и ограничена сверху"""
+        policy = RetryPolicy(base_delay=1, max_delay=10, throttle_factor=4)
+        for attempt in range(1, 6):
+            delay = policy.delay(attempt, 'network')
+            cap = min(10, 2 ** (attempt - 1))
+            self.assertGreaterEqual(delay, cap / 2)
+            self.assertLessEqual(delay, cap)
+        self.assertGreaterEqual(policy.delay(1, 'throttled'), 2)
+    
+    def test_retry_until_server_recovers(self):
+        """Тест: 429 и 503 повторяются, пока сервер не ответит 200"""
+        server = self.server([429, 503])
+        scheduler = RetryScheduler(self.policy, BreakerRegistry(failure_threshold=10))
+        retries = []
+        result = scheduler.run('local', server.fetch,
+                               on_retry=lambda attempt, kind, delay, e: retries.append(kind))
+        self.assertEqual(result, b'ok')
+        self.assertEqual(retries, ['throttled', 'network'])
+        self.assertEqual(server.requests, 3)
+    
+    def test_fatal_error_is_not_retried(self):
+        """Тест: 404 не повторяется"""
+        server = self.server([404])
+        scheduler = RetryScheduler(self.policy, BreakerRegistry())
+        with self.assertRaises(urllib.error.HTTPError):
+            scheduler.run('local', server.fetch)
+        self.assertEqual(server.requests, 1)
+    
+    def test_breaker_pauses_only_failing_host(self):
+        """Тест: открытый circuit breaker одного хоста не мешает другому"""
+        failing = self.server([], default=429)
+        healthy = self.server([])
+        registry = BreakerRegistry(failure_threshold=2, reset_timeout=60)
+        scheduler = RetryScheduler(RetryPolicy(max_attempts=2, base_delay=0.01, max_delay=0.01),
+                                   registry)
+        with self.assertRaises(urllib.error.HTTPError):
+            scheduler.run('youtube', failing.fetch)
+        self.assertFalse(registry.get('youtube').allow())
+        
+        # Другой сервис продолжает работать
+        self.assertEqual(scheduler.run('tiktok', healthy.fetch), b'ok')
+        
+        # Задача приостановленного сервиса ждёт и отменяется, не обращаясь к серверу
+        cancel = threading.Event()
+        paused = []
+        
+        def on_pause(remaining):
+            paused.append(remaining)
+            cancel.set()
+        
+        requests_before = failing.requests
+        with self.assertRaises(Exception):
+            scheduler.run('youtube', failing.fetch, cancel_event=cancel, on_pause=on_pause)
+        self.assertTrue(paused)
+        self.assertEqual(failing.requests, requests_before)
+    
+    def test_breaker_half_open(self):
+        """Тест: после паузы разрешается пробная попытка"""
+        now = [0.0]
+        breaker = CircuitBreaker('x', failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure('throttled')
+        self.assertFalse(breaker.allow())
+        now[0] = 11
+        self.assertTrue(breaker.allow())
+        breaker.record_failure('throttled')
+        self.assertFalse(breaker.allow())
+        now[0] = 22
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+    
+    def test_breaker_half_open_single_probe(self):
+        """Тест: после паузы проходит одна пробная попытка, остальные ждут её итога"""
+        now = [0.0]
+        breaker = CircuitBreaker('x', failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure('throttled')
+        now[0] = 11
+        allowed = []
+        barrier = threading.Barrier(20)
+        
+        def caller():
+            barrier.wait()
+            allowed.append(breaker.allow())
+        
+        threads = [threading.Thread(target=caller) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(allowed.count(True), 1)
+        self.assertFalse(breaker.allow())
+        
+        # Попытка отменена — пробу может выполнить следующий
+        breaker.record_failure('cancelled')
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertTrue(all(breaker.allow() for _ in range(5)))
+
+    def test_scheduler_does_not_claim_probe(self):
+        """Тест: планировщик не занимает пробную попытку — задача выполняет её сама"""
+        registry = BreakerRegistry(failure_threshold=1, reset_timeout=0.2)
+        registry.get('youtube').record_failure('throttled')
+        slots = ServiceSlots()
+        slots.set_limit('youtube', 1)
+        scheduler = JobScheduler(slots, registry, max_workers=1)
+        retry = RetryScheduler(self.policy, registry)
+        job = scheduler.submit(Job('a', 'youtube'),
+                               lambda job: retry.run('youtube', lambda: 'ok', job.cancel_event))
+        self.assertTrue(wait_until(lambda: job.is_finished, timeout=3))
+        self.assertEqual(job.state, COMPLETED)
+        self.assertEqual(registry.get('youtube').state, CircuitBreaker.CLOSED)
+    
+    def test_probe_closes_breaker_on_first_data(self):
+        """Тест: пробная попытка закрывает breaker по первому успешному запросу, а не в конце задачи"""
+        now = [0.0]
+        registry = BreakerRegistry(failure_threshold=1, reset_timeout=10)
+        breaker = registry.get('x')
+        breaker.clock = lambda: now[0]
+        breaker.record_failure('throttled')
+        now[0] = 11
+        scheduler = RetryScheduler(self.policy, registry)
+        seen = []
+        
+        def long_job():
+            scheduler.probe_passed()
+            # Остальные задачи сервиса уже могут выполняться
+            seen.append((breaker.state, breaker.allow()))
+        
+        scheduler.run('x', long_job)
+        self.assertEqual(seen, [(CircuitBreaker.CLOSED, True)])
+        
+        # Отмена без итога освобождает пробу
+        breaker.record_failure('throttled')
+        now[0] = 30
+        with self.assertRaises(KeyboardInterrupt):
+            scheduler.run('x', lambda: (_ for _ in ()).throw(KeyboardInterrupt()))
+        self.assertFalse(breaker.is_open())
+        self.assertTrue(breaker.allow())
+
+
+class MemoryConfig:
+    """Конфигурация в памяти (без записи в ~/.vd_settings.json)"""
+    
+    def __init__(self, **data):
+        self.data = dict(data)
+    
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+    
+    def set(self, key, value):
+        self.data[key] = value
+
+
+class TestServiceProfiles(unittest.TestCase):
+    """Тесты профилей сервисов и слотов планировщика"""
+    
+    def test_profiles_differ_per_service(self):
+        """Тест: у YouTube и TikTok разные встроенные профили"""
+        config = MemoryConfig()
+        youtube = get_profile(config, 'youtube')
+        tiktok = get_profile(config, 'tiktok')
+        self.assertNotEqual(youtube['concurrent_frags'], tiktok['concurrent_frags'])
+        self.assertNotEqual(youtube['max_jobs'], tiktok['max_jobs'])
+    
+    def test_user_override_is_per_service(self):
+        """Тест: изменение профиля одного сервиса не влияет на другой"""
+        config = MemoryConfig()
+        profile = get_profile(config, 'tiktok')
+        profile['ratelimit_kbps'] = 500
+        save_profile(config, 'tiktok', profile)
+        self.assertEqual(config.get('service_profiles')['tiktok'], {'ratelimit_kbps': 500})
+        self.assertEqual(get_profile(config, 'tiktok')['ratelimit_kbps'], 500)
+        self.assertEqual(get_profile(config, 'youtube')['ratelimit_kbps'], 0)
+    
+    def test_unknown_service_uses_global_settings(self):
+        """Тест: для сервиса без профиля используются общие настройки"""
+        config = MemoryConfig(concurrent_frags=7, ratelimit_kbps=100)
+        profile = get_profile(config, 'other')
+        self.assertEqual(profile['concurrent_frags'], 7)
+        self.assertEqual(profile['ratelimit_kbps'], 100)
+    
+    def test_service_slots_limit(self):
+        """Тест: лимит одновременных задач применяется отдельно к каждому сервису"""
+        slots = ServiceSlots()
+        slots.set_limit('youtube', 1)
+        slots.set_limit('tiktok', 2)
+        self.assertTrue(slots.try_acquire('youtube'))
+        self.assertFalse(slots.try_acquire('youtube'))
+        self.assertTrue(slots.try_acquire('tiktok'))
+        self.assertTrue(slots.try_acquire('tiktok'))
+        self.assertFalse(slots.try_acquire('tiktok'))
+        
+        cancel = threading.Event()
+        with self.assertRaises(SlotWaitCancelled):
+            slots.acquire('youtube', cancel, on_wait=cancel.set)
+        
+        slots.release('youtube')
+        slots.acquire('youtube')
+        self.assertEqual(slots.active('youtube'), 1)
+
+
+def wait_until(condition, timeout=5.0):
+    """Дождаться выполнения условия (False по истечении времени)"""
+    event = threading.Event()
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return True
+        event.wait(0.01)
+    return condition()
+
+
+class TestJobScheduler(unittest.TestCase):
+    """Тесты очереди задач с приоритетами"""
+    
+    def make_scheduler(self, limit=1, max_workers=1):
+        slots = ServiceSlots()
+        slots.set_limit('youtube', limit)
+        return JobScheduler(slots, max_workers=max_workers)
+    
+    def test_priority_order(self):
+        """Тест: задачи выполняются по приоритету, внутри приоритета — по порядку"""
+        scheduler = self.make_scheduler()
+        gate = threading.Event()
+        order = []
+        
+        def runner(job):
+            if job.url == 'first':
+                gate.wait(5)
+            order.append(job.url)
+        
+        first = scheduler.submit(Job('first', 'youtube'), runner)
+        self.assertTrue(wait_until(lambda: first.started))
+        jobs = [scheduler.submit(Job(url, 'youtube', priority=priority), runner)
+                for url, priority in [('bulk', 'bulk'), ('normal-1', 'normal'), ('normal-2', 'normal')]]
+        self.assertEqual(scheduler.queued_count(), 3)
+        gate.set()
+        
+        self.assertTrue(wait_until(lambda: all(job.is_finished for job in jobs)))
+        self.assertEqual(order, ['first', 'normal-1', 'normal-2', 'bulk'])
+        self.assertTrue(all(job.state == COMPLETED for job in jobs))
+    
+    def test_interactive_preempts_bulk(self):
+        """Тест: интерактивная задача запускается сразу и ставит фоновую на паузу"""
+        scheduler = self.make_scheduler()
+        changes = []
+        scheduler.on_pause_change = lambda job, paused: changes.append(paused)
+        stop = threading.Event()
+        seen = {}
+        
+        def bulk_runner(job):
+            stop.wait(5)
+        
+        def interactive_runner(job):
+            seen['bulk_paused'] = bulk.paused
+        
+        bulk = scheduler.submit(Job('playlist', 'youtube', priority='bulk'), bulk_runner)
+        self.assertTrue(wait_until(lambda: bulk.started))
+        interactive = scheduler.submit(Job('video', 'youtube', priority='interactive'),
+                                       interactive_runner)
+        
+        self.assertTrue(wait_until(lambda: interactive.is_finished))
+        self.assertTrue(seen['bulk_paused'])
+        self.assertEqual(interactive.state, COMPLETED)
+        # После интерактивной задачи фоновая продолжается
+        self.assertFalse(bulk.paused)
+        self.assertEqual(changes, [True, False])
+        stop.set()
+        self.assertTrue(wait_until(lambda: bulk.is_finished))
+    
+    def test_interactive_overcommit_is_bounded(self):
+        """Тест: повторные интерактивные задачи не превышают лимиты больше чем на interactive_extra"""
+        scheduler = self.make_scheduler()
+        stop = threading.Event()
+        running = []
+        peak = []
+        
+        def runner(job):
+            running.append(job)
+            peak.append(len(running))
+            stop.wait(5)
+            running.remove(job)
+        
+        bulk = scheduler.submit(Job('playlist', 'youtube', priority='bulk'), runner)
+        self.assertTrue(wait_until(lambda: bulk.started))
+        clicks = [scheduler.submit(Job(f'video-{n}', 'youtube', priority='interactive'), runner)
+                  for n in range(4)]
+        self.assertTrue(wait_until(lambda: clicks[0].started))
+        time.sleep(0.2)
+        self.assertEqual(len(scheduler.running_jobs()), 2)
+        self.assertLessEqual(scheduler._workers, 2)
+        self.assertEqual(scheduler.queued_count(), 3)
+        stop.set()
+        self.assertTrue(wait_until(lambda: all(job.is_finished for job in clicks + [bulk])))
+        self.assertEqual(max(peak), 2)
+    
+    def test_job_group_cancels_only_its_jobs(self):
+        """Тест: отмена на странице не трогает фоновые задачи сервиса, запущенные не с неё"""
+        downloader = mock.Mock()
+        downloader.cancel_download.side_effect = lambda job: job.cancel_event.set()
+        group = JobGroup()
+        video = group.add(Job('video', 'youtube', priority='interactive'))
+        playlist = group.add(Job('playlist', 'youtube', priority='bulk'))
+        restored = Job('restored', 'youtube', priority='bulk')
+        self.assertTrue(group.busy())
+        
+        video.state = COMPLETED
+        # Видео скачано, но плейлист страницы ещё идёт: отмена доступна, загрузка — тоже
+        self.assertFalse(group.busy())
+        self.assertEqual(group.active(), [playlist])
+        group.cancel(downloader)
+        downloader.cancel_download.assert_called_once_with(playlist)
+        self.assertFalse(restored.cancel_event.is_set())
+        self.assertEqual(group.active(), [])
+    
+    def test_cancel_queued_job(self):
+        """Тест: отменённая задача из очереди не запускается"""
+        scheduler = self.make_scheduler()
+        gate = threading.Event()
+        started = []
+        
+        def runner(job):
+            started.append(job.url)
+            gate.wait(5)
+        
+        first = scheduler.submit(Job('first', 'youtube'), runner)
+        self.assertTrue(wait_until(lambda: first.started))
+        queued = scheduler.submit(Job('second', 'youtube'), runner)
+        scheduler.cancel(queued)
+        self.assertEqual(queued.state, CANCELED)
+        self.assertEqual(scheduler.queued_count(), 0)
+        
+        gate.set()
+        self.assertTrue(wait_until(lambda: first.is_finished))
+        self.assertEqual(started, ['first'])
+    
+    def test_service_limit_respected(self):
+        """Тест: фоновые задачи не превышают лимит слотов сервиса"""
+        scheduler = self.make_scheduler(limit=2, max_workers=4)
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+        
+        def runner(job):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            threading.Event().wait(0.05)
+            with lock:
+                state['active'] -= 1
+        
+        jobs = [scheduler.submit(Job(str(i), 'youtube', priority='bulk'), runner) for i in range(6)]
+        self.assertTrue(wait_until(lambda: all(job.is_finished for job in jobs)))
+        self.assertEqual(state['peak'], 2)
+
+
+class TestTimeWindows(unittest.TestCase):
+    """Тесты временных окон и журнала задач"""
+    
+    def at(self, hour, minute=0):
+        return datetime.datetime(2024, 1, 1, hour, minute)
+    
+    def test_window_across_midnight(self):
+        """Тест: окно 22:00–07:00 переходит через полночь"""
+        window = TimeWindow('22:00', '07:00')
+        policy = WindowPolicy([window])
+        self.assertTrue(policy.bulk_allowed(self.at(23, 30)))
+        self.assertTrue(policy.bulk_allowed(self.at(6, 59)))
+        self.assertFalse(policy.bulk_allowed(self.at(7, 0)))
+        self.assertFalse(policy.bulk_allowed(self.at(12)))
+        with self.assertRaises(ValueError):
+            TimeWindow('25:00', '07:00')
+    
+    def test_window_settings(self):
+        """Тест: лимит скорости и число потоков берутся из текущего окна"""
+        policy = WindowPolicy([TimeWindow('22:00', '07:00', ratelimit_kbps=0, max_workers=6),
+                               TimeWindow('12:00', '13:00', ratelimit_kbps=200)])
+        self.assertEqual(policy.ratelimit_kbps(50, self.at(23)), 0)
+        self.assertEqual(policy.max_workers(2, self.at(23)), 6)
+        self.assertEqual(policy.ratelimit_kbps(50, self.at(12, 30)), 200)
+        self.assertEqual(policy.max_workers(2, self.at(12, 30)), 2)
+        self.assertEqual(policy.ratelimit_kbps(50, self.at(9)), 50)
+        # Без окон фоновые задачи не ограничены
+        self.assertTrue(WindowPolicy([]).bulk_allowed(self.at(9)))
+    
+    def test_bulk_waits_for_window(self):
+        """Тест: фоновая задача ждёт окна и встаёт на паузу на его границе"""
+        now = {'time': self.at(12)}
+        policy = WindowPolicy([TimeWindow('22:00', '07:00')], clock=lambda: now['time'])
+        slots = ServiceSlots()
+        slots.set_limit('youtube', 2)
+        scheduler = JobScheduler(slots, windows=policy, tick_interval=3600)
+        stop = threading.Event()
+        
+        bulk = scheduler.submit(Job('playlist', 'youtube', priority='bulk'), lambda job: stop.wait(5))
+        normal = scheduler.submit(Job('video', 'youtube'), lambda job: None)
+        self.assertTrue(wait_until(lambda: normal.is_finished))
+        self.assertIsNone(bulk.started)
+        
+        now['time'] = self.at(22, 30)
+        scheduler.refresh()
+        self.assertTrue(wait_until(lambda: bulk.started))
+        
+        now['time'] = self.at(7, 5)
+        scheduler.refresh()
+        self.assertTrue(bulk.paused)
+        self.assertEqual(bulk.pause_reason, 'window')
+        
+        now['time'] = self.at(22, 0)
+        scheduler.refresh()
+        self.assertFalse(bulk.paused)
+        stop.set()
+        self.assertTrue(wait_until(lambda: bulk.is_finished))
+    
+    def test_journal_roundtrip(self):
+        """Тест: задача из журнала восстанавливается с тем же id и параметрами"""
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = JobJournal(os.path.join(tmp, 'jobs.json'))
+            job = Job('https://youtube.com/playlist?list=x', 'youtube',
+                      {'playlist': True, 'quality': '720p'}, priority='bulk')
+            journal.add(job)
+            
+            data = JobJournal(os.path.join(tmp, 'jobs.json')).load()
+            restored = Job.from_dict(data[job.id])
+            self.assertEqual(restored.id, job.id)
+            self.assertEqual(restored.priority, 'bulk')
+            self.assertEqual(restored.params, job.params)
+            
+            journal.remove(job.id)
+            self.assertEqual(journal.load(), {})
+    
+    def test_journal_compaction(self):
+        """Тест: журнал дописывается построчно, сжимается и читает прежний формат"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'jobs.json')
+            legacy = Job('https://youtube.com/playlist?list=old', 'youtube', priority='bulk')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({legacy.id: legacy.to_dict()}, f)
+            
+            journal = JobJournal(path)
+            self.assertIn(legacy.id, journal.load())
+            for index in range(300):
+                job = Job(f'https://youtube.com/playlist?list={index}', 'youtube',
+                          priority='bulk')
+                journal.add(job)
+                journal.remove(job.id)
+            
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            self.assertLess(len(lines), 110)
+            self.assertEqual(list(JobJournal(path).load()), [legacy.id])
+    
+    def test_canceled_running_job_not_restored(self):
+        """Тест: отменённая выполняющаяся задача сразу удаляется из журнала"""
+        with tempfile.TemporaryDirectory() as tmp:
+            downloader = Downloader(MemoryConfig(dns_cache_ttl=0), I18n('ru'))
+            downloader.journal = JobJournal(os.path.join(tmp, 'jobs.json'))
+            job = Job('https://youtube.com/playlist?list=x', 'youtube',
+                      {'playlist': True}, priority='bulk')
+            downloader.journal.add(job)
+            # Задача выполняется: рабочий поток ещё не дошёл до finally
+            with downloader._lock:
+                downloader._jobs[job.id] = job
+            downloader.cancel_download(job)
+            self.assertTrue(job.cancel_event.is_set())
+            self.assertEqual(downloader.restore_jobs(), [])
+
+
+class TestPlaylistSync(unittest.TestCase):
+    """Тесты инкрементальной синхронизации плейлистов"""
+    
+    def entries(self, ids, pulled):
+        """Ленивый список элементов плейлиста (как страницы yt-dlp)"""
+        for video_id in ids:
+            pulled.append(video_id)
+            yield {'id': video_id, 'ie_key': 'Youtube', 'url': video_id}
+    
+    def test_stops_after_known_entries(self):
+        """Тест: обход прекращается после нескольких известных элементов подряд"""
+        ids = ['new1', 'new2', 'old1', 'old2', 'old3'] + [f'old{i}' for i in range(4, 1000)]
+        known = {f'youtube old{i}' for i in range(1, 1000)}
+        pulled = []
+        new_entries, scanned = select_new_entries(self.entries(ids, pulled), known, stop_after_known=3)
+        self.assertEqual([entry['id'] for entry in new_entries], ['new1', 'new2'])
+        self.assertEqual(scanned, 5)
+        self.assertEqual(len(pulled), 5)
+    
+    def test_known_entry_between_new_ones(self):
+        """Тест: отдельный известный элемент (закреплённое видео) не прерывает обход"""
+        ids = ['pinned', 'new1', 'new2', 'old1', 'old2']
+        known = {'youtube pinned', 'youtube old1', 'youtube old2'}
+        new_entries, _ = select_new_entries(self.entries(ids, []), known, stop_after_known=2)
+        self.assertEqual([entry['id'] for entry in new_entries], ['new1', 'new2'])
+    
+    def test_limit(self):
+        """Тест: ограничение числа новых элементов"""
+        pulled = []
+        new_entries, _ = select_new_entries(self.entries(['a', 'b', 'c', 'd'], pulled), set(), limit=2)
+        self.assertEqual(len(new_entries), 2)
+        self.assertEqual(pulled, ['a', 'b'])
+    
+    def test_store_reads_archive(self):
+        """Тест: известные элементы читаются из архива yt-dlp плейлиста"""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SyncStore(tmp)
+            url = 'https://www.youtube.com/@channel/videos'
+            self.assertEqual(store.known_ids(url), set())
+            with open(store.archive_path(url), 'w', encoding='utf-8') as f:
+                f.write('youtube abc\nyoutube def\n')
+            self.assertEqual(store.known_ids(url + '/'), {'youtube abc', 'youtube def'})
+            self.assertEqual(archive_id({'id': 'abc', 'extractor_key': 'Youtube'}), 'youtube abc')
+            
+            store.record_sync(url, 'Channel', scanned=12, new_count=2)
+            record = list(store.load_index().values())[0]
+            self.assertEqual((record['scanned'], record['new']), (12, 2))
+
+
+class TestWatchFolder(unittest.TestCase):
+    """Тесты папки входящих файлов со ссылками"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.inbox = os.path.join(self.tmp.name, 'inbox')
+        os.makedirs(self.inbox)
+        self.submitted = []
+        self.watcher = WatchFolder(self.inbox, self.submit, poll_interval=0.1)
+    
+    def tearDown(self):
+        self.watcher.stop()
+        self.tmp.cleanup()
+    
+    def submit(self, url, service, playlist):
+        self.submitted.append((url, service, playlist))
+        return Job(url, service)
+    
+    def write(self, name, text):
+        path = os.path.join(self.inbox, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+    
+    def test_parse_files(self):
+        """Тест: разбор .txt и ярлыка .url"""
+        txt = self.write('a.txt', '# комментарий\nhttps://youtu.be/abc\n\nhttps://www.tiktok.com/@u/video/1\n')
+        url = self.write('b.url', '[InternetShortcut]\nURL=https://www.youtube.com/watch?v=xyz\n')
+        self.assertEqual(parse_url_file(txt), ['https://youtu.be/abc', 'https://www.tiktok.com/@u/video/1'])
+        self.assertEqual(parse_url_file(url), ['https://www.youtube.com/watch?v=xyz'])
+    
+    def test_file_processed_with_report(self):
+        """Тест: ссылки проверяются, дубликаты отбрасываются, файл переносится с отчётом"""
+        self.write('batch.txt', 'https://youtu.be/abc\nhttps://youtu.be/abc\nhttps://example.com/v\n'
+                                'https://www.youtube.com/playlist?list=PL1\n')
+        reports = self.watcher.scan(ready=['batch.txt'])
+        
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(reports[0]['counts'], {'queued': 2, 'duplicate': 1, 'invalid': 1, 'error': 0})
+        self.assertEqual(self.submitted, [('https://youtu.be/abc', 'youtube', False),
+                                          ('https://www.youtube.com/playlist?list=PL1', 'youtube', True)])
+        self.assertFalse(os.path.exists(os.path.join(self.inbox, 'batch.txt')))
+        processed = os.listdir(self.watcher.processed_dir)
+        self.assertEqual(len(processed), 2)
+        self.assertTrue(any(name.endswith('batch.txt.report.json') for name in processed))
+        
+        # Ссылка из следующего файла, уже поставленная в очередь, — дубликат
+        self.write('again.txt', 'https://youtu.be/abc\n')
+        report = self.watcher.scan(ready=['again.txt'])[0]
+        self.assertEqual(report['counts']['duplicate'], 1)
+    
+    def test_polling_waits_for_stable_file(self):
+        """Тест: при опросе файл обрабатывается, когда он перестал меняться"""
+        self.write('slow.txt', 'https://youtu.be/abc\n')
+        self.assertEqual(self.watcher.scan(), [])
+        self.assertEqual(len(self.watcher.scan()), 1)
+    
+    def test_watch_thread(self):
+        """Тест: файл, записанный в папку, подхватывается фоновым потоком"""
+        self.watcher.start()
+        self.write('live.txt', 'https://youtu.be/live\n')
+        self.assertTrue(wait_until(lambda: self.submitted))
+        self.assertIn(self.watcher.mode, ('inotify', 'polling'))
+
+
+class TestJobsPage(unittest.TestCase):
+    """Тесты виртуального списка задач"""
+    
+    def test_row_window(self):
+        """Тест: на экране только видимая часть длинного списка"""
+        rows = RowWindow(visible=20)
+        items = list(range(5000))
+        rows.set_total(len(items))
+        self.assertEqual(rows.slice(items), list(range(20)))
+        
+        rows.scroll(100)
+        self.assertEqual(rows.slice(items)[0], 100)
+        rows.moveto(1.0)
+        self.assertEqual(rows.slice(items)[-1], 4999)
+        self.assertEqual(rows.fractions()[1], 1.0)
+        rows.scroll(-10000)
+        self.assertEqual(rows.offset, 0)
+        
+        # Список сократился — окно не выходит за его конец
+        rows.moveto(1.0)
+        rows.set_total(30)
+        self.assertEqual(rows.offset, 10)
+    
+    def test_job_row(self):
+        """Тест: строка таблицы для задачи"""
+        job = Job('https://youtu.be/abc', 'youtube')
+        row = format_job_row(1, job)
+        self.assertEqual(row[:4], (1, 'queued', 'youtube', 'https://youtu.be/abc'))
+        
+        job.state = 'running'
+        job.title = 'Видео'
+        job.downloaded_bytes = 512 * 1024
+        job.total_bytes = 1024 * 1024
+        job.speed = 1024 * 1024
+        job.eta = 65
+        row = format_job_row(2, job)
+        self.assertEqual(row[3:], ('Видео', '50.0%', '1.0 MB/s', '00:01:05', '1.0 MB'))
+    
+    def test_expanded_playlist_rows(self):
+        """Тест: элементы раскрытого плейлиста идут под его задачей и читаются окном"""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = EntryStore(tmp)
+            jobs = [Job(f'https://youtu.be/{index}', 'youtube') for index in range(3)]
+            playlist = jobs[1]
+            with store.open_table(playlist.id) as table:
+                for index in range(1, 5001):
+                    table.add(EntryRecord(index, f'v{index}', ENTRY_OK, f'/d/v{index}.mp4', 10))
+            reader = store.reader(playlist.id)
+            self.assertEqual(reader.refresh(), 5000)
+            
+            rows = visible_rows(jobs, playlist, reader, 0, 4)
+            self.assertEqual([(number, job) for number, job, _ in rows[:2]],
+                             [(1, jobs[0]), (2, playlist)])
+            self.assertEqual([record.index for _, _, record in rows[2:]], [1, 2])
+            rows = visible_rows(jobs, playlist, reader, 5000, 10)
+            self.assertEqual(rows[0][2].index, 4999)
+            self.assertEqual(rows[1][2].index, 5000)
+            self.assertEqual(rows[2][:2], (3, jobs[2]))
+            self.assertEqual(len(rows), 3)
+            self.assertEqual(format_entry_row(rows[1][2])[1:4], (ENTRY_OK, '', '    5000. v5000.mp4'))
+            
+            # Свёрнуто — только задачи
+            self.assertEqual([row[0] for row in visible_rows(jobs, None, None, 0, 10)], [1, 2, 3])
+    
+    def test_entry_reader_tail(self):
+        """Тест: дописанные строки подхватываются, недописанная строка ждёт конца"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'job.jsonl')
+            reader = EntryReader(path)
+            self.assertEqual(reader.refresh(), 0)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(EntryRecord(1, 'a', ENTRY_OK).to_json() + '\n')
+                f.write(EntryRecord(2, 'b', ENTRY_ERROR).to_json()[:10])
+            self.assertEqual(reader.refresh(), 1)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(EntryRecord(1, 'a', ENTRY_OK).to_json() + '\n')
+                f.write(EntryRecord(2, 'b', ENTRY_ERROR).to_json() + '\n')
+            self.assertEqual(reader.refresh(), 2)
+            self.assertEqual([record.id for record in reader.rows(0, 5)], ['a', 'b'])
+
+
+class TestUiWatchdog(unittest.TestCase):
+    """Тесты контроля отзывчивости интерфейса"""
+    
+    def setUp(self):
+        self.now = 0.0
+        self.watchdog = UiWatchdog(stall_ms=200, clock=lambda: self.now)
+    
+    def spend(self, ms):
+        self.now += ms / 1000
+    
+    def test_lag_percentiles(self):
+        """Тест: перцентили опозданий тактов"""
+        for lag in range(1, 101):
+            self.watchdog.record_tick(lag)
+        stats = self.watchdog.to_dict()
+        self.assertEqual(stats['ticks'], 100)
+        self.assertEqual(stats['lag_p50_ms'], 50)
+        self.assertEqual(stats['lag_p99_ms'], 99)
+        self.assertEqual(stats['lag_max_ms'], 100)
+        self.assertEqual(stats['stalls'], {})
+    
+    def test_stall_attributed_to_slowest_callback(self):
+        """Тест: зависание приписывается колбэку с наибольшим собственным временем"""
+        @self.watchdog.track('status')
+        def on_status():
+            self.spend(10)
+            save_logs()
+        
+        @self.watchdog.track('save_logs')
+        def save_logs():
+            self.spend(300)
+        
+        on_status()
+        self.watchdog.record_tick(310)
+        stats = self.watchdog.to_dict()
+        self.assertEqual(stats['callbacks']['status']['total_ms'], 10)
+        self.assertEqual(stats['callbacks']['save_logs']['total_ms'], 300)
+        self.assertEqual(stats['stalls']['save_logs']['count'], 1)
+        
+        # Следующий медленный такт без колбэков — причина неизвестна
+        self.watchdog.record_tick(250)
+        self.assertEqual(self.watchdog.to_dict()['stalls']['other']['count'], 1)
+    
+    def test_worker_thread_sections_not_blamed(self):
+        """Тест: колбэк из рабочего потока не считается причиной зависания интерфейса"""
+        @self.watchdog.track('progress')
+        def on_progress():
+            self.spend(500)
+        
+        worker = threading.Thread(target=on_progress)
+        worker.start()
+        worker.join()
+        with self.watchdog.section('redraw'):
+            self.spend(20)
+        self.watchdog.record_tick(520)
+        stats = self.watchdog.to_dict()
+        self.assertNotIn('progress', stats['callbacks'])
+        self.assertEqual(stats['stalls']['redraw']['count'], 1)
+    
+    def test_worker_callbacks_run_on_ui_thread(self):
+        """Тест: колбэки из рабочего потока выполняются в потоке Tk и учитываются там"""
+        self.watchdog.root = mock.Mock()
+        self.watchdog.ui_thread = threading.current_thread()
+        calls = []
+        
+        class Page:
+            @self.watchdog.ui_callback('progress', coalesce=True)
+            def on_progress(page, percent):
+                calls.append(('progress', percent, threading.current_thread()))
+                self.spend(300)
+            
+            @self.watchdog.ui_callback('status')
+            def on_status(page, status):
+                calls.append(('status', status, threading.current_thread()))
+        
+        page = Page()
+        
+        def worker():
+            for percent in (10, 20, 30):
+                page.on_progress(percent)
+            page.on_status('retry')
+            page.on_status('completed')
+        
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertEqual(calls, [])
+        
+        self.watchdog.drain()
+        # Из прогресса — только последний, статусы — все и по порядку
+        self.assertEqual([call[:2] for call in calls],
+                         [('progress', 30), ('status', 'retry'), ('status', 'completed')])
+        self.assertTrue(all(call[2] is threading.current_thread() for call in calls))
+        self.watchdog.record_tick(300)
+        self.assertEqual(self.watchdog.to_dict()['stalls']['progress']['count'], 1)
+
+
+class TestSegmentedDownload(unittest.TestCase):
+    """Тесты загрузки файла несколькими соединениями"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'video.mp4.part')
+        self.body = os.urandom(6 * 1024 * 1024 + 12345)
+        self.servers = []
+    
+    def tearDown(self):
+        for server in self.servers:
+            server.close()
+        self.tmp.cleanup()
+    
+    def server(self, ranges=True):
+        server = RangeServer(self.body, ranges)
+        self.servers.append(server)
+        return server
+    
+    def read_file(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+    
+    def test_plan_pieces(self):
+        """Тест: части покрывают файл без пропусков и не мельче 1 МБ"""
+        size = 10 * 1024 * 1024 + 7
+        pieces = plan_pieces(size, 4, piece_size=8 * 1024 * 1024)
+        self.assertEqual(len(pieces), 4)
+        self.assertEqual(pieces[0][0], 0)
+        self.assertEqual(pieces[-1][1], size - 1)
+        for (_, end), (start, _) in zip(pieces, pieces[1:]):
+            self.assertEqual(start, end + 1)
+        self.assertEqual(len(plan_pieces(3 * 1024 * 1024, 16)), 3)
+        self.assertEqual(parse_content_range('bytes 0-0/42'), (0, 0, 42))
+        self.assertIsNone(parse_content_range('items 0-0/42'))
+    
+    def test_segmented_download(self):
+        """Тест: файл собирается из частей по keep-alive соединениям"""
+        server = self.server()
+        download = SegmentedDownload(server.url, self.path, segments=3,
+                                     piece_size=1024 * 1024, pool=HttpPool(), hash_stream=True)
+        self.assertEqual(download.run(), len(self.body))
+        self.assertEqual(self.read_file(), self.body)
+        # Хеш посчитан по частям, пришедшим не по порядку, без чтения файла
+        expected = new_hash()
+        expected.update(self.body)
+        self.assertEqual(download.digest, expected.hexdigest())
+        self.assertFalse(os.path.exists(download.state_path))
+        # Частей больше, чем соединений: соединения переиспользуются
+        self.assertGreater(download.pool.reused, 0)
+        self.assertLessEqual(server.connections, 4)
+    
+    def test_redirects_followed(self):
+        """Тест: перенаправления проходятся, части запрашиваются по итоговой ссылке"""
+        server = self.server()
+        download = SegmentedDownload(server.redirect_url(3), self.path, segments=3,
+                                     piece_size=1024 * 1024, pool=HttpPool())
+        self.assertEqual(download.run(), len(self.body))
+        self.assertEqual(self.read_file(), self.body)
+        self.assertEqual(download.url, server.url)
+        # 3 перенаправления один раз при проверке, затем только части
+        self.assertEqual(server.requests, 4 + len(download.pieces))
+        
+        too_far = SegmentedDownload(server.redirect_url(segmented_module.MAX_REDIRECTS + 1),
+                                    self.path, pool=HttpPool())
+        with self.assertRaises(SegmentedError):
+            too_far.probe()
+    
+    def test_register_fallback(self):
+        """Тест: без реестра загрузчиков yt-dlp используется встроенный загрузчик"""
+        class FakeFD:
+            EXE_NAME = segmented_module.EXTERNAL_NAME
+        
+        def external(registry):
+            module = mock.Mock(spec=['_BY_NAME', 'get_external_downloader'])
+            module._BY_NAME = registry
+            module.get_external_downloader = lambda name: registry.get(name)
+            return module
+        
+        without_registry = mock.Mock(spec=[])
+        broken_lookup = external({})
+        broken_lookup.get_external_downloader = lambda name: None
+        cases = ((external({}), True), (without_registry, False), (broken_lookup, False))
+        for module, expected in cases:
+            with self.subTest(expected=expected), \
+                    mock.patch.object(segmented_module, 'YT_DLP_AVAILABLE', True), \
+                    mock.patch.object(segmented_module, 'SegmentedFD', FakeFD, create=True), \
+                    mock.patch.object(segmented_module, '_external', module, create=True), \
+                    mock.patch.object(segmented_module, '_fallback_reported', True):
+                self.assertEqual(segmented_module.register(), expected)
+                if module is broken_lookup:
+                    self.assertEqual(module._BY_NAME, {})
+                
+                with mock.patch.object(downloader_module, 'YT_DLP_AVAILABLE', True):
+                    downloader = Downloader(MemoryConfig(dns_cache_ttl=0), I18n('ru'))
+                    options = downloader.build_options('https://youtu.be/abcdefghijk', 'youtube')
+                self.assertEqual('external_downloader' in options, expected)
+    
+    def test_pause_stops_segment_workers(self):
+        """Тест: на паузе соединения по частям перестают качать, после неё файл докачивается"""
+        server = self.server()
+        resume = threading.Event()
+        resume.set()
+        paused_at = {}
+        
+        def progress(downloaded, total):
+            if downloaded > len(self.body) // 4 and not paused_at:
+                resume.clear()
+                paused_at['bytes'] = downloaded
+        
+        download = SegmentedDownload(server.url, self.path, segments=3, piece_size=1024 * 1024,
+                                     progress=progress, resume_event=resume, pool=HttpPool(),
+                                     ratelimit=lambda: 8 * 1024 * 1024)
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(size=download.run()))
+        thread.start()
+        self.assertTrue(wait_until(lambda: paused_at, timeout=10))
+        time.sleep(0.3)
+        stalled = download.downloaded
+        time.sleep(0.5)
+        # Каждое соединение успевает дописать не больше одного блока
+        self.assertEqual(download.downloaded, stalled)
+        self.assertLess(stalled, len(self.body))
+        resume.set()
+        thread.join(10)
+        self.assertEqual(result.get('size'), len(self.body))
+        self.assertEqual(self.read_file(), self.body)
+    
+    def test_resume_after_cancel(self):
+        """Тест: после отмены докачиваются только недостающие части"""
+        server = self.server()
+        cancel = threading.Event()
+        
+        def progress(downloaded, total):
+            if downloaded > len(self.body) // 3:
+                cancel.set()
+        
+        first = SegmentedDownload(server.url, self.path, segments=2, piece_size=1024 * 1024,
+                                  progress=progress, cancel_event=cancel,
+                                  ratelimit=lambda: 4 * 1024 * 1024)
+        with self.assertRaises(SegmentedError):
+            first.run()
+        self.assertTrue(os.path.exists(first.state_path))
+        
+        second = SegmentedDownload(server.url, self.path, segments=2, piece_size=1024 * 1024,
+                                   hash_stream=True)
+        second.run()
+        self.assertGreater(second.resumed_bytes, 0)
+        # Начало файла скачано прошлым запуском: хеш при записи неизвестен
+        self.assertIsNone(second.digest)
+        self.assertEqual(self.read_file(), self.body)
+    
+    def test_fallback_without_ranges(self):
+        """Тест: без поддержки Range файл скачивается одним запросом"""
+        server = self.server(ranges=False)
+        download = SegmentedDownload(server.url, self.path, segments=4)
+        self.assertEqual(download.run(), len(self.body))
+        self.assertEqual(self.read_file(), self.body)
+        self.assertEqual(server.requests, 2)
+
+
+class TestConnections(unittest.TestCase):
+    """Тесты общего пула соединений и кэша DNS"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = RangeServer(b'x' * 2048)
+    
+    def tearDown(self):
+        self.server.close()
+        self.tmp.cleanup()
+    
+    def test_reuse_across_downloads(self):
+        """Тест: последовательные загрузки с одного хоста идут по одному соединению"""
+        pool = HttpPool()
+        for number in range(5):
+            path = os.path.join(self.tmp.name, f'{number}.part')
+            SegmentedDownload(self.server.url, path, segments=2, pool=pool).run()
+        stats = pool.to_dict()
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(self.server.connections, 1)
+        self.assertGreater(stats['reuse_rate'], 0.8)
+        pool.close()
+    
+    def test_idle_timeout(self):
+        """Тест: долго простаивавшее соединение не используется"""
+        now = [0.0]
+        pool = HttpPool(idle_timeout=30, clock=lambda: now[0])
+        conn, response = pool.request(self.server.url)
+        response.read()
+        pool.put(self.server.url, conn)
+        now[0] = 60.0
+        conn, response = pool.request(self.server.url)
+        response.read()
+        self.assertFalse(conn.pool_reused)
+        self.assertEqual(pool.to_dict()['connections_expired'], 1)
+        conn.close()
+    
+    def test_dns_cache_ttl(self):
+        """Тест: адреса берутся из кэша до истечения TTL"""
+        now = [0.0]
+        cache = DnsCache(ttl=60, clock=lambda: now[0])
+        first = cache.getaddrinfo('127.0.0.1', 80)
+        self.assertEqual(cache.getaddrinfo('127.0.0.1', 80), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        now[0] = 61.0
+        cache.getaddrinfo('127.0.0.1', 80)
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.to_dict()['hit_rate'], 0.333)
+    
+    def test_dns_cache_eviction(self):
+        """Тест: истёкшие и давно не использованные записи удаляются"""
+        now = [0.0]
+        cache = DnsCache(ttl=60, clock=lambda: now[0], max_entries=3)
+        cache._original = lambda host, port, *args: [(host, port)]
+        cache.getaddrinfo('a', 80)
+        now[0] = 61.0
+        cache.getaddrinfo('a', 80)
+        self.assertEqual((len(cache._entries), cache.evicted), (1, 1))
+        
+        for host in ('b', 'c', 'd'):
+            cache.getaddrinfo(host, 80)
+        cache.getaddrinfo('b', 80)
+        cache.getaddrinfo('e', 80)
+        # Вытесняются давно не использованные: 'a', затем 'c' ('b' использована недавно)
+        self.assertEqual([key[0] for key in cache._entries], ['d', 'b', 'e'])
+        self.assertEqual(cache.to_dict()['evicted'], 3)
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Тесты инфраструктуры замеров"""
+    
+    def test_media_server(self):
+        """Тест: сервер замеров отдаёт диапазоны, плейлист HLS и фрагменты"""
+        server = MediaServer(size_mb=1, fragments=4).start()
+        try:
+            request = urllib.request.Request(server.progressive_url,
+                                             headers={'Range': 'bytes=10-19'})
+            with urllib.request.urlopen(request, timeout=5) as response:
+                self.assertEqual(response.status, 206)
+                self.assertEqual(response.read(), server.body[10:20])
+            with urllib.request.urlopen(server.hls_url, timeout=5) as response:
+                playlist = response.read().decode('utf-8')
+            self.assertEqual(playlist.count('.ts'), 4)
+            with urllib.request.urlopen(f"{server.base_url}/hls/seg3.ts", timeout=5) as response:
+                self.assertEqual(response.read(), server.fragment(3))
+        finally:
+            server.close()
+    
+    def test_compare(self):
+        """Тест: сравнение прогонов по общим числовым показателям"""
+        old = {'commit': 'a', 'benchmarks': {'x': {'mb_per_s': 10, 'error': 'boom'}}}
+        new = {'commit': 'b', 'benchmarks': {'x': {'mb_per_s': 15}, 'y': {'seconds': 1}}}
+        lines = compare(old, new)
+        self.assertEqual(lines, ['a -> b', '  x.mb_per_s: 10 -> 15 +50.0%'])
+
+
+class TestJobProfiler(unittest.TestCase):
+    """Тесты профилирования задач"""
+    
+    def test_disabled(self):
+        """Тест: без режима профилировщик не создаётся"""
+        job = Job('https://youtube.com/watch?v=x', 'youtube')
+        self.assertIsNone(JobProfiler.for_mode(job, tempfile.gettempdir(), ''))
+        with self.assertRaises(Exception):
+            JobProfiler.for_mode(job, tempfile.gettempdir(), 'gpu')
+    
+    def test_reports(self):
+        """Тест: .prof, сводка CPU и отчёт о памяти пишутся рядом с логом"""
+        import pstats
+        import tracemalloc
+        
+        def slow_allocation():
+            return [bytearray(1024) for _ in range(2000)]
+        
+        job = Job('https://youtube.com/watch?v=x', 'youtube')
+        with tempfile.TemporaryDirectory() as tmp:
+            with JobProfiler(job, tmp, 'all') as profiler:
+                kept = slow_allocation()
+            self.assertEqual(len(kept), 2000)
+            self.assertFalse(tracemalloc.is_tracing())
+            
+            names = sorted(os.path.basename(path) for path in profiler.files)
+            self.assertEqual(len(names), 3)
+            self.assertTrue(all(name.startswith('youtube_profile_') for name in names))
+            prof = [path for path in profiler.files if path.endswith('.prof')][0]
+            self.assertTrue(any(name[2] == 'slow_allocation'
+                                for name in pstats.Stats(prof).stats))
+            memory = [path for path in profiler.files if path.endswith('_memory.txt')][0]
+            with open(memory, 'r', encoding='utf-8') as f:
+                self.assertIn('test_app.py', f.read())
+
+    
+    def test_concurrent_cpu_profile_skipped(self):
+        """Тест: CPU профилируется у одной задачи за раз, вторая получает причину пропуска"""
+        first = Job('https://youtube.com/watch?v=a', 'youtube')
+        second = Job('https://youtube.com/watch?v=b', 'youtube')
+        with tempfile.TemporaryDirectory() as tmp:
+            with JobProfiler(first, tmp, 'cpu') as outer:
+                with JobProfiler(second, tmp, 'cpu') as inner:
+                    pass
+            self.assertIsNone(outer.skipped)
+            self.assertTrue(any(path.endswith('.prof') for path in outer.files))
+            self.assertIsNotNone(inner.skipped)
+            self.assertEqual(inner.files, [])
+            # Блокировка освобождена: следующая задача снова профилируется
+            with JobProfiler(second, tmp, 'cpu') as again:
+                pass
+            self.assertIsNone(again.skipped)
+
+class TestEntryStore(unittest.TestCase):
+    """Тесты записей элементов потоковой загрузки плейлиста"""
+    
+    def test_table_roundtrip(self):
+        """Тест: записи пишутся на диск, в памяти остаются только счётчики"""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = EntryStore(tmp)
+            with store.open_table('job1') as table:
+                table.add(EntryRecord(1, 'a', ENTRY_OK, '/tmp/видео "a".mp4', 100))
+                table.add(EntryRecord(2, 'b', ENTRY_SKIPPED))
+                table.add(EntryRecord(3, None, ENTRY_ERROR))
+            self.assertEqual(table.total, 3)
+            self.assertEqual(table.bytes, 100)
+            self.assertEqual(table.counts[ENTRY_OK], 1)
+            
+            records = list(store.read('job1'))
+            self.assertEqual([record.to_dict() for record in records],
+                             [{'index': 1, 'id': 'a', 'status': ENTRY_OK,
+                               'path': '/tmp/видео "a".mp4', 'size': 100},
+                              {'index': 2, 'id': 'b', 'status': ENTRY_SKIPPED,
+                               'path': None, 'size': 0},
+                              {'index': 3, 'id': None, 'status': ENTRY_ERROR,
+                               'path': None, 'size': 0}])
+            self.assertEqual(list(store.read('missing')), [])
+            with self.assertRaises(AttributeError):
+                records[0].extra = 1
+    
+    def test_prune(self):
+        """Тест: хранится не больше keep таблиц"""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = EntryStore(tmp, keep=2)
+            for index in range(4):
+                store.open_table(f'job{index}').close()
+            self.assertEqual(len(list(Path(tmp).glob('*.jsonl'))), 2)
+            self.assertTrue(os.path.exists(store.table_path('job3')))
+    
+    def test_entry_record(self):
+        """Тест: итог элемента по результату yt-dlp"""
+        entry = {'_type': 'url', 'id': 'v1'}
+        record = Downloader._entry_record(1, entry, None, False)
+        self.assertEqual((record.id, record.status), ('v1', ENTRY_ERROR))
+        record = Downloader._entry_record(2, entry, {'id': 'v1'}, False)
+        self.assertEqual(record.status, ENTRY_SKIPPED)
+        info = {'id': 'v1', 'filesize': 42,
+                'requested_downloads': [{'filepath': '/nonexistent/v1.mp4'}]}
+        record = Downloader._entry_record(3, entry, info, False)
+        self.assertEqual((record.status, record.path, record.size),
+                         (ENTRY_OK, '/nonexistent/v1.mp4', 42))
+        self.assertEqual(Downloader._entry_record(4, entry, info, True).status, ENTRY_ERROR)
+
+
+class TestJobProgress(unittest.TestCase):
+    """Тесты прогресса задачи целиком"""
+    
+    def setUp(self):
+        self.now = 0.0
+        self.progress = JobProgress(half_life=10.0, sample_interval=0.5,
+                                    clock=lambda: self.now)
+    
+    def hook(self, status, index, downloaded, **extra):
+        d = {'status': status, 'downloaded_bytes': downloaded,
+             'info_dict': {'id': f'v{index}', 'playlist_index': index}}
+        d.update(extra)
+        self.progress.update(d)
+    
+    def download_entry(self, index, size, seconds=1.0, steps=4):
+        """Элемент плейлиста со скоростью size / seconds"""
+        for step in range(1, steps + 1):
+            self.now += seconds / steps
+            self.hook('downloading', index, size * step // steps, total_bytes_estimate=size)
+        self.hook('finished', index, size, total_bytes=size)
+    
+    def test_playlist_does_not_reset(self):
+        """Тест: процент растёт по всему плейлисту, а не сбрасывается на каждом элементе"""
+        self.progress.set_plan(entries_total=4)
+        percents = []
+        for index in range(1, 5):
+            self.download_entry(index, 1000)
+            percents.append(self.progress.to_dict()['percent'])
+        self.progress.finish()
+        snapshot = self.progress.to_dict()
+        self.assertEqual(percents, sorted(percents))
+        self.assertAlmostEqual(percents[1], 50.0)
+        self.assertEqual(snapshot['entries_done'], 4)
+        self.assertEqual(snapshot['total_bytes'], 4000)
+        self.assertEqual(snapshot['percent'], 100.0)
+    
+    def test_size_weighted_eta(self):
+        """Тест: ETA по объёму плана и сглаженной скорости"""
+        self.progress.set_plan(entries_total=3, planned_bytes=10000)
+        self.download_entry(1, 1000, seconds=1.0)
+        snapshot = self.progress.to_dict()
+        self.assertAlmostEqual(snapshot['speed'], 1000, delta=1)
+        self.assertEqual(snapshot['total_bytes'], 10000)
+        self.assertEqual(snapshot['eta'], 9)
+    
+    def test_ewma_smoothing(self):
+        """Тест: скачок скорости сглаживается, а не подменяет оценку сразу"""
+        for index in range(1, 6):
+            self.download_entry(index, 1000, seconds=1.0)
+        self.assertAlmostEqual(self.progress.speed, 1000, delta=1)
+        self.download_entry(6, 10000, seconds=1.0)
+        self.assertGreater(self.progress.speed, 1000)
+        self.assertLess(self.progress.speed, 2000)
+    
+    def test_fragments_estimate(self):
+        """Тест: без размера объём файла оценивается по фрагментам"""
+        self.hook('downloading', 1, 200, fragment_index=2, fragment_count=10)
+        self.assertEqual(self.progress.to_dict()['total_bytes'], 1000)
+        self.assertAlmostEqual(self.progress.to_dict()['percent'], 20.0)
+    
+    def test_end_entry(self):
+        """Тест: пропущенные элементы тоже считаются готовыми"""
+        self.progress.set_plan(entries_total=3)
+        self.download_entry(1, 500)
+        self.progress.end_entry()
+        self.progress.end_entry()
+        snapshot = self.progress.to_dict()
+        self.assertEqual(snapshot['entries_done'], 2)
+        self.assertEqual(snapshot['total_bytes'], 750)
+    
+    def test_resume_resets_sample(self):
+        """Тест: время паузы не занижает скорость"""
+        self.download_entry(1, 1000, seconds=1.0)
+        speed = self.progress.speed
+        self.now += 600
+        self.progress.resume()
+        self.download_entry(2, 1000, seconds=1.0)
+        self.assertAlmostEqual(self.progress.speed, speed, delta=1)
+
+
+class TestThroughputHistory(unittest.TestCase):
+    """Тесты истории скорости"""
+    
+    def test_ring_buffer(self):
+        """Тест: буфер выделен заранее и хранит последние capacity значений"""
+        ring = RingBuffer(3, 'f')
+        self.assertEqual(len(ring._data), 3)
+        self.assertIsNone(ring.last())
+        for value in range(1, 6):
+            ring.append(value)
+        self.assertEqual(ring.values(), [3.0, 4.0, 5.0])
+        self.assertEqual(ring.last(), 5.0)
+        self.assertEqual(len(ring._data), 3)
+    
+    def test_history_and_csv(self):
+        """Тест: скорость по приросту байтов и экспорт в CSV"""
+        import csv
+        import io
+        
+        history = ThroughputHistory(capacity=10)
+        self.assertEqual(history.sample(1000.0, 0), 0)
+        history.sample(1001.0, 1000)
+        history.sample(1003.0, 1100)
+        self.assertEqual(history.rows(), [(1001.0, 1000.0), (1003.0, 50.0)])
+        
+        out = io.StringIO()
+        history.write_csv(out)
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(rows[0], ['time', 'timestamp', 'bytes_per_s'])
+        self.assertEqual([row[1:] for row in rows[1:]],
+                         [['1001.000', '1000'], ['1003.000', '50']])
+    
+    def test_monitor(self):
+        """Тест: отсчёты задач и суммарная скорость; ждущие задачи буферы не получают"""
+        now = [0.0]
+        monitor = ThroughputMonitor(job_capacity=5, clock=lambda: now[0])
+        first = Job('https://youtube.com/watch?v=1', 'youtube')
+        second = Job('https://youtube.com/watch?v=2', 'youtube')
+        queued = Job('https://youtube.com/watch?v=3', 'youtube')
+        first.state = second.state = 'running'
+        jobs = [first, second, queued]
+        
+        monitor.tick(jobs)
+        for step in range(1, 4):
+            now[0] = float(step)
+            first.downloaded_bytes += 100
+            second.downloaded_bytes += 300
+            monitor.tick(jobs)
+        self.assertEqual(first.throughput.rates.values(), [100.0] * 3)
+        self.assertEqual(second.throughput.rates.values(), [300.0] * 3)
+        self.assertEqual(monitor.total.rates.values(), [400.0] * 3)
+        self.assertIsNone(queued.throughput)
+        self.assertEqual(monitor.to_dict()['bytes_per_s'], 400.0)
+    
+    def test_sparkline(self):
+        """Тест: точки графика и подпись"""
+        self.assertEqual(sparkline_points([5], 100, 20), [])
+        coords = sparkline_points([0, 50, 100], 104, 24)
+        self.assertEqual(coords, [2, 22, 52, 12, 102, 2])
+        self.assertEqual(sparkline_label([2048, 51200, 1024 * 1024]),
+                         '1.0 MB/s (min 2.0 KB/s)')
+
+
+class TestHistoryStore(unittest.TestCase):
+    """Тесты истории загрузок"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = HistoryStore(os.path.join(self.tmp.name, 'history.sqlite3'))
+        day = datetime.datetime(2026, 3, 1).timestamp()
+        self.store.record_many([
+            {'service': 'youtube', 'url': 'https://youtu.be/a', 'title': 'Котики играют',
+             'channel': 'Cat TV', 'size': 50 * 1024 * 1024, 'downloaded': day},
+            {'service': 'youtube', 'url': 'https://youtu.be/b', 'title': 'Rust "async" talk',
+             'channel': 'RustConf', 'size': 700 * 1024 * 1024, 'downloaded': day + 86400},
+            {'service': 'tiktok', 'url': 'https://tiktok.com/@cat/video/1', 'title': 'cat dance',
+             'channel': 'Cat TV', 'size': 5 * 1024 * 1024, 'downloaded': day + 2 * 86400},
+        ])
+    
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+    
+    def titles(self, **filters):
+        return [row['title'] for row in self.store.search(**filters).rows]
+    
+    def test_fts_query(self):
+        """Тест: слова запроса — префиксы, кавычки экранируются"""
+        self.assertEqual(fts_query('кот "x'), '"кот"* AND "x"*')
+        self.assertEqual(fts_query('', 'cat tv'), 'channel : ("cat"* AND "tv"*)')
+        self.assertEqual(fts_query(' !? '), '')
+    
+    def test_search_filters(self):
+        """Тест: поиск по тексту, каналу, сервису, датам и размеру; новые сверху"""
+        self.assertTrue(self.store.fts)
+        self.assertEqual(self.titles(), ['cat dance', 'Rust "async" talk', 'Котики играют'])
+        self.assertEqual(self.titles(text='КОТ'), ['Котики играют'])
+        self.assertEqual(self.titles(text='async'), ['Rust "async" talk'])
+        self.assertEqual(self.titles(channel='cat'), ['cat dance', 'Котики играют'])
+        self.assertEqual(self.titles(channel='cat', service='youtube'), ['Котики играют'])
+        self.assertEqual(self.titles(date_from=parse_date('2026-03-02'),
+                                     date_to=parse_date('2026-03-02', end=True)),
+                         ['Rust "async" talk'])
+        self.assertEqual(self.titles(min_size=parse_size_mb('10'), max_size=parse_size_mb('100')),
+                         ['Котики играют'])
+        self.assertEqual(self.store.count(channel='cat tv'), 2)
+    
+    def test_pagination(self):
+        """Тест: страницы по курсору без пропусков и повторов"""
+        self.store.record_many({'service': 'youtube', 'url': f'https://youtu.be/{index}',
+                                'title': f'video {index}', 'downloaded': 1000.0}
+                               for index in range(25))
+        seen = []
+        cursor = None
+        while True:
+            page = self.store.search(text='video', limit=10, cursor=cursor)
+            seen.extend(row['title'] for row in page.rows)
+            cursor = page.cursor
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+    
+    def test_like_fallback(self):
+        """Тест: без FTS5 поиск работает по подстроке"""
+        self.store.count()
+        self.store.fts = False
+        self.assertEqual(self.titles(text='otik'), [])
+        self.assertEqual(self.titles(text='отик'), ['Котики играют'])
+        self.assertEqual(self.titles(channel='conf'), ['Rust "async" talk'])
+    
+    def test_record_info_and_row(self):
+        """Тест: запись по info yt-dlp и строка таблицы"""
+        entry_id = self.store.record_info('youtube', {
+            'id': 'xyz', 'title': 'Lecture', 'uploader': 'MIT',
+            'webpage_url': 'https://www.youtube.com/watch?v=xyz', 'filesize': 1024,
+        }, '/nonexistent/Lecture.mp4', {'quality': '720p'})
+        row = self.store.get(entry_id)
+        self.assertEqual((row['channel'], row['size'], row['video_id']), ('MIT', 1024, 'xyz'))
+        values = format_history_row(row)
+        self.assertEqual(values[1:], ('youtube', 'Lecture', 'MIT', '1.0 KB', '720p'))
+        with self.assertRaises(ValueError):
+            parse_date('01.03.2026')
+
+
+class TestDirectoryIndex(unittest.TestCase):
+    """Тесты индекса папки загрузки"""
+    
+    TEMPLATE = '%(playlist_title,playlist)s/%(playlist_index>03d)s - %(title).95s [%(id)s].%(ext)s'
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write('Lectures/001 - Intro [x] [dQw4w9WgXcQ].mp4', 100)
+        self.write('Lectures/002 - Next [abc-_123456].mp4.part', 10)
+        self.write('notes.txt', 5)
+        self.index = DirectoryIndex()
+        self.index.configure(self.root, self.TEMPLATE, background=False)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def write(self, rel, size):
+        path = os.path.join(self.root, *rel.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        return path
+    
+    def test_template_regex(self):
+        """Тест: id разбирается из пути по шаблону; шаблон без id не индексирует id"""
+        pattern = template_regex(self.TEMPLATE)
+        match = pattern.fullmatch('My list/001 - Title [with] brackets [dQw4w9WgXcQ].webm')
+        self.assertEqual(match.group('id'), 'dQw4w9WgXcQ')
+        self.assertIsNone(pattern.fullmatch('001 - Title [dQw4w9WgXcQ].webm'))
+        self.assertIsNone(template_regex('%(title)s.%(ext)s'))
+        self.assertTrue(is_partial('a.mp4.part'))
+        self.assertTrue(is_partial('a.f137.mp4'))
+        self.assertFalse(is_partial('a.mp4'))
+    
+    def test_scan_and_lookup(self):
+        """Тест: просмотр папки пропускает незавершённые файлы"""
+        self.assertTrue(self.index.ready.is_set())
+        self.assertEqual(len(self.index), 2)
+        path = self.index.find_id('dQw4w9WgXcQ')
+        self.assertEqual(path, os.path.join(self.root, 'Lectures',
+                                            '001 - Intro [x] [dQw4w9WgXcQ].mp4'))
+        self.assertEqual(self.index.lookup(path)[0], 100)
+        self.assertIsNone(self.index.find_id('abc-_123456'))
+        self.assertIsNone(self.index.lookup(os.path.join(self.root, os.pardir, 'notes.txt')))
+    
+    def test_incremental_updates(self):
+        """Тест: готовые файлы добавляются без нового просмотра, удалённые забываются"""
+        path = self.write('Lectures/002 - Next [abc-_123456].mp4', 20)
+        self.assertIsNone(self.index.find_id('abc-_123456'))
+        self.index.add(path)
+        self.assertEqual(self.index.find_id('abc-_123456'), path)
+        self.index.remove(path)
+        self.assertIsNone(self.index.find_id('abc-_123456'))
+        
+        # Файл удалён вне приложения: индекс исправляется при проверке
+        os.remove(self.index.find_id('dQw4w9WgXcQ'))
+        self.assertIsNone(self.index.find_id('dQw4w9WgXcQ'))
+        self.assertEqual(len(self.index), 1)
+    
+    def test_existing_file_via_history(self):
+        """Тест: шаблон без id — файл находится по пути из истории"""
+        downloader = Downloader(MemoryConfig(dns_cache_ttl=0, download_dir=self.root), I18n('ru'))
+        downloader.dir_index = DirectoryIndex()
+        downloader.dir_index.configure(self.root, '%(title)s.%(ext)s', background=False)
+        downloader.history = HistoryStore(os.path.join(self.tmp.name, 'history.sqlite3'))
+        try:
+            path = os.path.join(self.root, 'notes.txt')
+            downloader.history.record('youtube', 'https://youtu.be/notes', path=path,
+                                      video_id='notes12345a')
+            downloader.history.record('youtube', 'https://youtu.be/gone', path=path + '.gone',
+                                      video_id='gone1234567')
+            self.assertEqual(downloader.existing_file('notes12345a'), path)
+            self.assertIsNone(downloader.existing_file('gone1234567'))
+            downloader.config.set('dir_index', False)
+            self.assertIsNone(downloader.existing_file('notes12345a'))
+        finally:
+            downloader.history.close()
+
+
+    def test_section_clip_not_indexed(self):
+        """Тест: фрагмент видео не засчитывается как видео целиком"""
+        for template, clip in (('%(id)s - %(title)s.%(ext)s', 'abcdefghijk - Title [10-40].mp4'),
+                               ('%(title)s [%(id)s].%(ext)s', 'Title [abcdefghijk] [10-40].mp4'),
+                               ('%(title)s [%(id)s].%(ext)s', 'Title [abcdefghijk] [10-].mp4')):
+            with self.subTest(template=template):
+                index = DirectoryIndex()
+                index.configure(self.root, template, background=False)
+                path = self.write(clip, 10)
+                index.add(path)
+                self.assertIsNone(index.find_id('abcdefghijk'))
+                self.assertIsNone(index.find_id('10-40'))
+                index.rescan(background=False)
+                self.assertIsNone(index.find_id('abcdefghijk'))
+                full = self.write(clip.replace(' [10-40]', '').replace(' [10-]', ''), 20)
+                index.add(full)
+                self.assertEqual(index.find_id('abcdefghijk'), full)
+                os.remove(path)
+                os.remove(full)
+    
+    def test_full_download_after_clip(self):
+        """Тест: после фрагмента видео целиком скачивается, а не пропускается как 'exists'"""
+        template = '%(id)s - %(title)s.%(ext)s'
+        downloader = Downloader(MemoryConfig(dns_cache_ttl=0, download_dir=self.root,
+                                             outtmpl=template, disk_preflight=False),
+                                I18n('ru'))
+        downloader.dir_index = DirectoryIndex()
+        downloader.dir_index.configure(self.root, template, background=False)
+        downloader.history = HistoryStore(os.path.join(self.tmp.name, 'history.sqlite3'))
+        downloaded = []
+        
+        class FakeYoutubeDL:
+            def __init__(self, params):
+                self.params = params
+            
+            def __enter__(self):
+                return self
+            
+            def __exit__(self, *exc):
+                return False
+            
+            def add_post_processor(self, pp, when='post_process'):
+                pass
+            
+            def download(self, urls):
+                downloaded.extend(urls)
+                # Готовый файл попадает в индекс через post_hooks, как у yt-dlp
+                name = 'abcdefghijk - Title [10-40].mp4' if 'download_ranges' in self.params \
+                    else 'abcdefghijk - Title.mp4'
+                path = os.path.join(self.params['outtmpl_dir'], name)
+                with open(path, 'wb') as f:
+                    f.write(b'x')
+                for hook in self.params.get('post_hooks', []):
+                    hook(path)
+        
+        url = 'https://www.youtube.com/watch?v=abcdefghijk'
+        fake = mock.Mock(YoutubeDL=FakeYoutubeDL)
+        try:
+            with mock.patch.object(downloader_module, 'yt_dlp', fake, create=True):
+                clip = Job(url, 'youtube', {'section': [10, 40]}, 'interactive')
+                options = {'download_ranges': object(), 'outtmpl_dir': self.root,
+                           'post_hooks': [downloader.dir_index.add]}
+                downloader._run_attempt(clip, options, self.root, None)
+                downloader.history.record('youtube', url, path=os.path.join(
+                    self.root, 'abcdefghijk - Title [10-40].mp4'), video_id='abcdefghijk',
+                    section='10-40')
+                
+                statuses = []
+                full = Job(url, 'youtube', {}, 'interactive',
+                           status_callback=lambda status, message: statuses.append(status))
+                options = {'outtmpl_dir': self.root, 'post_hooks': [downloader.dir_index.add]}
+                downloader._run_attempt(full, options, self.root, None)
+            self.assertEqual(downloaded, [url, url])
+            self.assertNotIn('exists', statuses)
+            self.assertIsNotNone(downloader.existing_file('abcdefghijk'))
+        finally:
+            downloader.history.close()
+
+
+class TestVerify(unittest.TestCase):
+    """Тесты проверки скачанных файлов"""
+    
+    def test_evaluate(self):
+        """Тест: потоки и длительность по выводу ffprobe"""
+        data = {'streams': [{'codec_type': 'video'}, {'codec_type': 'audio'}],
+                'format': {'duration': '600.5'}}
+        self.assertEqual(evaluate(data, 600, True, True), ([], 600.5))
+        problems, duration = evaluate({'streams': [{'codec_type': 'video'}],
+                                       'format': {'duration': '312.0'}}, 600, True, True)
+        self.assertEqual(problems, ['нет звуковой дорожки', 'длительность 312.0 с вместо 600.0 с'])
+        # Аудио без видео: видеопоток не требуется
+        self.assertEqual(evaluate({'streams': [{'codec_type': 'audio'}], 'format': {}},
+                                  None, False, True)[0], [])
+        self.assertEqual(evaluate({}, None)[0], ['нет потоков'])
+    
+    def test_task_from_info(self):
+        """Тест: ожидаемые потоки по кодекам из info"""
+        task = VerifyTask.from_info('/tmp/a.m4a', {'webpage_url': 'https://youtu.be/a',
+                                                   'duration': 61, 'vcodec': 'none',
+                                                   'acodec': 'mp4a.40.2'})
+        self.assertEqual((task.url, task.duration, task.video, task.audio),
+                         ('https://youtu.be/a', 61, False, True))
+        self.assertIsNone(VerifyTask.from_info('/tmp/b.mp4', {}).video)
+    
+    def test_pool_runs_in_parallel(self):
+        """Тест: проверки идут параллельно, не больше max_workers одновременно"""
+        running = []
+        peak = []
+        lock = threading.Lock()
+        release = threading.Event()
+        
+        def check(task):
+            with lock:
+                running.append(task.path)
+                peak.append(len(running))
+            release.wait(5)
+            with lock:
+                running.remove(task.path)
+            return VerifyResult(task.path, [] if task.path != 'bad' else ['нет потоков'])
+        
+        verifier = Verifier(max_workers=2, check=check)
+        done = []
+        for path in ('a', 'bad', 'c', 'd'):
+            verifier.submit(VerifyTask(path), lambda task, result: done.append(result.ok))
+        time.sleep(0.1)
+        self.assertEqual(verifier.pending, 4)
+        release.set()
+        self.assertTrue(verifier.wait(5))
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(sorted(done), [False, True, True, True])
+        self.assertEqual((verifier.checked, verifier.failed), (4, 1))
+    
+    def test_failed_file_is_redownloaded(self):
+        """Тест: результат записывается, повреждённый файл откладывается и скачивается заново"""
+        with tempfile.TemporaryDirectory() as tmp:
+            downloader = Downloader(MemoryConfig(dns_cache_ttl=0, verify_redownloads=1),
+                                    I18n('ru'))
+            downloader.history = HistoryStore(os.path.join(tmp, 'history.sqlite3'))
+            submitted = []
+            downloader.submit = submitted.append
+            statuses = []
+            job = Job('https://www.youtube.com/playlist?list=PL1', 'youtube',
+                      {'playlist': True, 'sync': True, 'quality': '720p'}, 'bulk',
+                      status_callback=lambda status, message: statuses.append(status))
+            path = os.path.join(tmp, 'video.mp4')
+            open(path, 'wb').close()
+            task = VerifyTask(path, 'https://youtu.be/dQw4w9WgXcQ', 60, True, True)
+            try:
+                downloader._on_verified(job, task, VerifyResult(path, ['нет потоков']))
+                self.assertFalse(downloader.history.verification(path)['ok'])
+                self.assertTrue(os.path.exists(path + '.corrupt'))
+                retry = submitted[0]
+                self.assertEqual(retry.url, task.url)
+                self.assertEqual(retry.params['verify_attempt'], 1)
+                self.assertFalse(retry.params['playlist'])
+                self.assertNotIn('sync', retry.params)
+                
+                # Вторая неудача: повторных загрузок больше нет
+                downloader._on_verified(retry, task, VerifyResult(path, ['нет потоков']))
+                self.assertEqual(len(submitted), 1)
+                self.assertEqual(statuses, ['corrupt', 'verify_failed'])
+            finally:
+                downloader.history.close()
+
+
+class TestHashing(unittest.TestCase):
+    """Тесты хешей скачанных файлов"""
+    
+    def test_out_of_order_blocks(self):
+        """Тест: блоки не по порядку дают тот же хеш, что и файл целиком"""
+        data = os.urandom(10000)
+        expected = new_hash()
+        expected.update(data)
+        hasher = StreamHasher()
+        for offset in (6000, 2000, 0, 4000, 8000):
+            hasher.update_at(offset, data[offset:offset + 2000])
+        self.assertEqual(hasher.hexdigest(len(data)), expected.hexdigest())
+        self.assertIsNone(hasher.hexdigest(len(data) + 1))
+    
+    def test_broken_stream(self):
+        """Тест: перекрытие или переполнение буфера — хеш неизвестен"""
+        hasher = StreamHasher()
+        hasher.update(b'abcd')
+        hasher.update_at(2, b'cd')
+        self.assertIsNone(hasher.hexdigest())
+        
+        hasher = StreamHasher(max_buffer=4)
+        hasher.update_at(10, b'12345')
+        self.assertTrue(hasher.broken)
+        
+        hasher = StreamHasher()
+        hasher.update_at(4, b'efgh')
+        self.assertIsNone(hasher.hexdigest())
+    
+    def test_file_hashes_skip_modified_files(self):
+        """Тест: хеш не выдаётся, если файл изменён после загрузки"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'a.mp4')
+            with open(path, 'wb') as f:
+                f.write(b'1234')
+            hashes = FileHashes(limit=2)
+            hashes.remember(path, 'h1')
+            self.assertEqual(hashes.take(path), 'h1')
+            self.assertIsNone(hashes.take(path))
+            
+            hashes.remember(path, 'h1')
+            with open(path, 'ab') as f:
+                f.write(b'5')
+            self.assertIsNone(hashes.take(path))
+            
+            # Незапрошенные хеши вытесняются
+            for name in ('b', 'c', 'd'):
+                other = os.path.join(tmp, name)
+                open(other, 'wb').close()
+                hashes.remember(other, name)
+            self.assertEqual(len(hashes), 2)
+    
+    def test_history_duplicates(self):
+        """Тест: хеш в истории, поиск дубликатов и добавление столбца в старый файл"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'history.sqlite3')
+            conn = sqlite3.connect(path)
+            conn.execute('CREATE TABLE downloads (id INTEGER PRIMARY KEY, service TEXT NOT NULL, '
+                         'video_id TEXT, url TEXT NOT NULL, title TEXT NOT NULL DEFAULT \'\', '
+                         'channel TEXT NOT NULL DEFAULT \'\', path TEXT, '
+                         'size INTEGER NOT NULL DEFAULT 0, quality TEXT, '
+                         'audio_only INTEGER NOT NULL DEFAULT 0, downloaded REAL NOT NULL)')
+            conn.execute("INSERT INTO downloads (service, url, path, downloaded) "
+                         "VALUES ('youtube', 'https://youtu.be/old', '/d/old.mp4', 1)")
+            conn.commit()
+            conn.close()
+            
+            store = HistoryStore(path)
+            try:
+                self.assertIsNone(store.search().rows[0]['hash'])
+                store.record('youtube', 'https://youtu.be/a', path='/d/a.mp4', file_hash='h')
+                store.record('tiktok', 'https://tiktok.com/@x/video/1', path='/d/b.mp4')
+                store.set_hash('/d/b.mp4', 'h')
+                self.assertEqual([row['url'] for row in store.find_by_hash('h', '/d/b.mp4')],
+                                 ['https://youtu.be/a'])
+                self.assertEqual(len(store.find_by_hash('h')), 2)
+                self.assertEqual(store.find_by_hash(None), [])
+            finally:
+                store.close()
+
+
+
+class TestSections(unittest.TestCase):
+    """Тесты загрузки фрагмента видео"""
+    
+    def test_parse_time(self):
+        """Тест: секунды, мм:сс и чч:мм:сс"""
+        self.assertEqual(parse_time('90'), 90)
+        self.assertEqual(parse_time('1:30'), 90)
+        self.assertEqual(parse_time('1:02:03,5'), 3723.5)
+        self.assertIsNone(parse_time('  '))
+        for text in ('1:75', '1:60:00', 'abc', '-5'):
+            with self.assertRaises(ValueError):
+                parse_time(text)
+    
+    def test_parse_section(self):
+        """Тест: пустые поля — видео целиком, конец раньше начала — ошибка"""
+        self.assertIsNone(parse_section('', ''))
+        self.assertEqual(parse_section('', '1:00'), [0, 60])
+        self.assertEqual(parse_section('30', ''), [30, None])
+        with self.assertRaises(ValueError):
+            parse_section('2:00', '1:00')
+    
+    def test_outtmpl_with_section(self):
+        """Тест: границы фрагмента в имени файла перед расширением"""
+        self.assertEqual(outtmpl_with_section('%(title)s.%(ext)s', [10, 20]),
+                         '%(title)s [%(section_start)d-%(section_end)d].%(ext)s')
+        self.assertEqual(outtmpl_with_section('%(id)s', [10, None]),
+                         '%(id)s [%(section_start)d-]')
+    
+    def test_clip_size_and_plan(self):
+        """Тест: размер фрагмента — доля длительности видео"""
+        info = {'id': 'a', 'duration': 100, 'filesize': 1000}
+        self.assertEqual(clip_size(info, [10, 30]), (200, True))
+        self.assertEqual(clip_size(info, [90, None]), (100, True))
+        self.assertEqual(clip_size(info, [50, 500]), (500, True))
+        self.assertEqual(clip_size({'filesize': 1000}, [0, 10]), (None, True))
+        
+        plan = build_plan('https://youtu.be/a', info, tempfile.gettempdir(), section=[0, 25])
+        self.assertEqual(plan.total_bytes, 250)
+    
+    def test_section_report(self):
+        """Тест: сэкономленные байты считаются от размера форматов один раз"""
+        report = SectionReport([0, 60])
+        info = {'id': 'a', 'section_start': 0, 'format_id': '137+140',
+                'requested_formats': [{'filesize': 7000}, {'filesize': 3000}]}
+        report.update({'status': 'downloading', 'downloaded_bytes': 50, 'info_dict': info})
+        report.update({'status': 'finished', 'total_bytes': 1000, 'info_dict': info})
+        self.assertEqual(report.full_bytes, 10000)
+        self.assertEqual(report.saved_bytes, 9000)
+        self.assertIn('90%', report.message())
+        
+        unknown = SectionReport([0, None])
+        unknown.update({'status': 'finished', 'downloaded_bytes': 10, 'info_dict': {'id': 'b'}})
+        self.assertIsNone(unknown.saved_bytes)
+        self.assertIn('неизвестен', unknown.message())
+    
+    def test_history_section(self):
+        """Тест: фрагмент не считается скачанным видео целиком"""
+        self.assertIsNone(section_label({'id': 'a'}))
+        self.assertEqual(section_label({'section_start': 10.0, 'section_end': 20.5}), '10-20.5')
+        with tempfile.TemporaryDirectory() as tmp:
+            store = HistoryStore(os.path.join(tmp, 'history.db'))
+            try:
+                store.record('youtube', 'https://youtu.be/a', path='/d/a [10-20].mp4',
+                             video_id='a', section='10-20')
+                self.assertEqual(store.find_paths('a'), [])
+                store.record('youtube', 'https://youtu.be/a', path='/d/a.mp4', video_id='a')
+                self.assertEqual(store.find_paths('a'), ['/d/a.mp4'])
+            finally:
+                store.close()
+
+
 def run_tests():
     """Запуск тестов"""
     print("Запуск тестов Video Downloader...")
@@ -215,6 +2409,29 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestConfig))
     suite.addTests(loader.loadTestsFromTestCase(TestDownloadModeDetection))
     suite.addTests(loader.loadTestsFromTestCase(TestI18n))
+    suite.addTests(loader.loadTestsFromTestCase(TestPlanner))
+    suite.addTests(loader.loadTestsFromTestCase(TestDiskReservations))
+    suite.addTests(loader.loadTestsFromTestCase(TestStaging))
+    suite.addTests(loader.loadTestsFromTestCase(TestRetry))
+    suite.addTests(loader.loadTestsFromTestCase(TestServiceProfiles))
+    suite.addTests(loader.loadTestsFromTestCase(TestJobScheduler))
+    suite.addTests(loader.loadTestsFromTestCase(TestTimeWindows))
+    suite.addTests(loader.loadTestsFromTestCase(TestPlaylistSync))
+    suite.addTests(loader.loadTestsFromTestCase(TestWatchFolder))
+    suite.addTests(loader.loadTestsFromTestCase(TestJobsPage))
+    suite.addTests(loader.loadTestsFromTestCase(TestUiWatchdog))
+    suite.addTests(loader.loadTestsFromTestCase(TestSegmentedDownload))
+    suite.addTests(loader.loadTestsFromTestCase(TestConnections))
+    suite.addTests(loader.loadTestsFromTestCase(TestBenchmarks))
+    suite.addTests(loader.loadTestsFromTestCase(TestJobProfiler))
+    suite.addTests(loader.loadTestsFromTestCase(TestEntryStore))
+    suite.addTests(loader.loadTestsFromTestCase(TestJobProgress))
+    suite.addTests(loader.loadTestsFromTestCase(TestThroughputHistory))
+    suite.addTests(loader.loadTestsFromTestCase(TestHistoryStore))
+    suite.addTests(loader.loadTestsFromTestCase(TestDirectoryIndex))
+    suite.addTests(loader.loadTestsFromTestCase(TestVerify))
+    suite.addTests(loader.loadTestsFromTestCase(TestHashing))
+    suite.addTests(loader.loadTestsFromTestCase(TestSections))
     
     # Запускаем тесты
     runner = unittest.TextTestRunner(verbosity=2)
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты масштабирования Video Downloader (без сети и без Tk).
+
+Вместо yt_dlp подставляется поддельный модуль, выдающий огромные плейлисты
+и потоки вызовов хука прогресса. У каждого слоя (хук прогресса, очередь,
+журнал, синхронизация, список задач) есть бюджет; тест падает, если слой
+выходит за него. Размер плейлиста задаётся переменной VD_SCALE_ENTRIES.
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+import unittest
+from unittest import mock
+
+try:
+    import resource
+except ImportError:
+    # Windows: пиковый RSS не проверяется
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core import downloader as downloader_module
+from core.downloader import Downloader
+from core.dirindex import DirectoryIndex
+from core.entries import EntryStore, EntryRecord, ENTRY_OK
+from core.history import HistoryStore
+from core.i18n import I18n
+from core.jobs import Job, COMPLETED, CANCELED
+from core.journal import JobJournal
+from core.scheduler import ServiceSlots, JobScheduler
+from core.sync import select_new_entries
+from pages.jobs import RowWindow, format_job_row, format_entry_row, visible_rows
+
+
+# Элементов в поддельном плейлисте
+ENTRIES = int(os.environ.get('VD_SCALE_ENTRIES', 100000))
+
+# Бюджеты слоёв: с запасом относительно замеров, чтобы не зависеть от загрузки CI
+BUDGETS = {
+    # Хук прогресса: среднее время вызова и рост памяти за поток вызовов
+    'progress_hook_us': 50,
+    'progress_hook_peak_mb': 2,
+    # Задача с огромным плейлистом: элементов в секунду и пик памяти
+    'playlist_entries_per_s': 5000,
+    'playlist_peak_mb': 20,
+    # Потоковый режим: во сколько раз пик памяти может вырасти при 10× длине плейлиста
+    'streaming_peak_growth': 1.5,
+    # Отмена задачи посреди потока вызовов хука
+    'cancel_latency_ms': 500,
+    # Очередь: постановка и выполнение пустых задач
+    'scheduler_jobs_per_s': 500,
+    # Журнал: добавление и удаление фоновых задач
+    'journal_ops_per_s': 200,
+    # Синхронизация: просмотр элементов плейлиста
+    'sync_entries_per_s': 50000,
+    # История загрузок: самый медленный из типичных запросов страницы истории
+    'history_search_ms': 100,
+    # Индекс папки загрузки: просмотр файлов в секунду и проверка «уже скачано»
+    'dir_index_files_per_s': 20000,
+    'dir_index_lookup_us': 20,
+    # Список задач: обновление видимых строк не зависит от длины списка
+    'dashboard_refresh_ms': 5,
+    # Раскрытый плейлист: дочитать хвост таблицы и прочитать видимые элементы
+    'dashboard_entries_refresh_ms': 5,
+    # Пиковый RSS процесса после всех тестов
+    'peak_rss_mb': 300,
+}
+
+
+class MemoryConfig:
+    """Конфигурация в памяти (без записи в ~/.vd_settings.json)"""
+
+    def __init__(self, **data):
+        self.data = dict(data)
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+def make_fake_yt_dlp(entries, steps=3, entry_size=1024, formats=0):
+    """Поддельный модуль yt_dlp: плейлист из entries элементов, steps вызовов хука на элемент.
+
+    Как и настоящий yt-dlp, без process элементы плейлиста — ленивые ссылки, а при
+    обработке плейлиста целиком разрешённые info элементов (с formats) копятся до конца.
+    """
+    module = types.ModuleType('yt_dlp')
+
+    class DownloadCancelled(Exception):
+        pass
+
+    class YoutubeDL:
+        def __init__(self, params):
+            self.params = params
+            self.hooks = params.get('progress_hooks') or []
+            self.post_processors = []
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def extract_info(self, url, download=True, process=True, ie_key=None, extra_info=None):
+            if url.startswith('fake:'):
+                info = self._resolve(url[len('fake:'):])
+            else:
+                # Элементы создаются лениво, как страницы настоящего плейлиста
+                info = {'_type': 'playlist', 'id': 'fake', 'title': 'Fake playlist',
+                        'webpage_url': url,
+                        'entries': ({'_type': 'url', 'id': f'v{index}', 'url': f'fake:v{index}',
+                                     'ie_key': 'Youtube'}
+                                    for index in range(entries))}
+            if process:
+                return self.process_ie_result(info, download, extra_info)
+            return info
+
+        def process_ie_result(self, info, download=True, extra_info=None):
+            if info.get('_type') == 'url':
+                return self.extract_info(info['url'], download, ie_key=info.get('ie_key'),
+                                         extra_info=extra_info)
+            if info.get('_type') == 'playlist':
+                results = []
+                for index, entry in enumerate(info['entries'], 1):
+                    results.append(self.process_ie_result(
+                        entry, download, {'playlist_index': index,
+                                          'playlist_title': info.get('title')}))
+                return dict(info, entries=results)
+            info = dict(info, **(extra_info or {}))
+            if download:
+                info['requested_downloads'] = [self._download(info)]
+            return info
+
+        def _resolve(self, video_id):
+            return {'id': video_id, 'title': f'Video {video_id}', 'filesize': entry_size,
+                    'formats': [{'format_id': str(number), 'ext': 'mp4',
+                                 'url': f'https://media.example/{video_id}/{number}' + 'x' * 200}
+                                for number in range(formats)]}
+
+        def add_post_processor(self, pp, when='post_process'):
+            self.post_processors.append((when, pp))
+
+        def download(self, urls):
+            for url in urls:
+                self.extract_info(url, download=True)
+            return 0
+
+        def sanitize_info(self, info):
+            return info
+
+        def _download(self, entry):
+            filename = f"{entry['id']}.mp4"
+            for step in range(1, steps + 1):
+                self._hook({'status': 'downloading',
+                            'downloaded_bytes': entry_size * step // steps,
+                            'total_bytes': entry_size, 'speed': 1e6, 'eta': 0,
+                            'filename': filename, 'info_dict': entry})
+            self._hook({'status': 'finished', 'downloaded_bytes': entry_size,
+                        'total_bytes': entry_size, 'elapsed': 0.001,
+                        'filename': filename, 'info_dict': entry})
+            return {'filepath': filename, 'filesize': entry_size}
+
+        def _hook(self, d):
+            for hook in self.hooks:
+                hook(d)
+
+    module.YoutubeDL = YoutubeDL
+    module.utils = types.SimpleNamespace(DownloadCancelled=DownloadCancelled)
+    module.version = types.SimpleNamespace(__version__='fake')
+    return module
+
+
+def measure(func):
+    """Выполнить func и вернуть (результат, секунды, пик памяти Python в МБ)"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = func()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def wait_until(condition, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class FakeYtDlpTestCase(unittest.TestCase):
+    """Загрузчик с поддельным yt_dlp"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fake = make_fake_yt_dlp(ENTRIES)
+        patches = [
+            mock.patch.object(downloader_module, 'yt_dlp', self.fake, create=True),
+            mock.patch.object(downloader_module, 'YT_DLP_AVAILABLE', True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.config = MemoryConfig(download_dir=self.tmp.name, disk_preflight=False,
+                                   dns_cache_ttl=0,
+                                   service_profiles={'youtube': {'retry_max_attempts': 1}})
+        self.downloader = Downloader(self.config, I18n())
+        self.downloader.entry_store = EntryStore(os.path.join(self.tmp.name, 'entries'))
+        self.statuses = []
+        self.progress_calls = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def on_progress(self, percent, speed, eta, progress=None):
+        self.progress_calls += 1
+
+    def on_status(self, status, message=''):
+        self.statuses.append(status)
+
+
+class TestProgressScaling(FakeYtDlpTestCase):
+    """Бюджеты хука прогресса и задач с огромными плейлистами"""
+
+    def test_progress_hook_storm(self):
+        """Тест: поток вызовов хука не замедляется и не накапливает память"""
+        job = Job('https://www.youtube.com/playlist?list=PLfake', 'youtube',
+                  progress_callback=self.on_progress, status_callback=self.on_status)
+        calls = ENTRIES * 2
+        entry = {'id': 'v', 'title': 'Video'}
+        downloading = {'status': 'downloading', 'downloaded_bytes': 512, 'total_bytes': 1024,
+                       'speed': 1e6, 'eta': 0, 'info_dict': entry}
+        finished = {'status': 'finished', 'downloaded_bytes': 1024, 'total_bytes': 1024,
+                    'elapsed': 0.001, 'filename': 'v.mp4', 'info_dict': entry}
+
+        def storm():
+            hook = self.downloader.progress_hook
+            for index in range(calls):
+                hook(finished if index % 4 == 3 else downloading, job)
+
+        _, elapsed, peak_mb = measure(storm)
+        per_call_us = elapsed / calls * 1e6
+        self.assertLess(per_call_us, BUDGETS['progress_hook_us'])
+        self.assertLess(peak_mb, BUDGETS['progress_hook_peak_mb'])
+        self.assertEqual(self.progress_calls, calls - calls // 4)
+        self.assertEqual(job.finished_bytes, 1024 * (calls // 4))
+
+    def test_huge_playlist_job(self):
+        """Тест: задача с огромным плейлистом проходит весь путь с ограниченной памятью"""
+        def run_job():
+            job = self.downloader.download('https://www.youtube.com/playlist?list=PLfake',
+                                           'youtube', playlist=True,
+                                           progress_callback=self.on_progress,
+                                           status_callback=self.on_status)
+            self.assertTrue(wait_until(lambda: job.is_finished, timeout=120))
+            return job
+
+        job, elapsed, peak_mb = measure(run_job)
+        self.assertEqual(job.state, COMPLETED)
+        self.assertEqual(self.statuses.count('finished'), ENTRIES)
+        self.assertEqual(job.finished_bytes, ENTRIES * 1024)
+        self.assertGreater(ENTRIES / elapsed, BUDGETS['playlist_entries_per_s'])
+        self.assertLess(peak_mb, BUDGETS['playlist_peak_mb'])
+
+    def test_streaming_memory_independent_of_length(self):
+        """Тест: в потоковом режиме пик памяти не зависит от длины плейлиста"""
+        def run_playlist(count):
+            def run_job():
+                job = self.downloader.download('https://www.youtube.com/playlist?list=PLfake',
+                                               'youtube', playlist=True)
+                self.assertTrue(wait_until(lambda: job.is_finished, timeout=120))
+                return job
+
+            with mock.patch.object(downloader_module, 'yt_dlp', make_fake_yt_dlp(count, formats=8)):
+                job, _, peak_mb = measure(run_job)
+            self.assertEqual(job.state, COMPLETED)
+            records = self.downloader.entry_store.read(job.id)
+            self.assertEqual(sum(1 for record in records if record.status == ENTRY_OK), count)
+            return peak_mb
+
+        count = max(ENTRIES // 10, 1000)
+        small_peak = run_playlist(count // 10)
+        large_peak = run_playlist(count)
+        self.assertLess(large_peak, small_peak * BUDGETS['streaming_peak_growth'] + 0.5)
+
+    def test_cancel_during_storm(self):
+        """Тест: отмена прерывает огромный плейлист на ближайшем вызове хука"""
+        job = self.downloader.download('https://www.youtube.com/playlist?list=PLfake',
+                                       'youtube', playlist=True,
+                                       status_callback=self.on_status)
+        self.assertTrue(wait_until(lambda: job.finished_bytes > 0))
+        started = time.perf_counter()
+        self.downloader.cancel_download(job)
+        self.assertTrue(wait_until(lambda: job.is_finished))
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.assertEqual(job.state, CANCELED)
+        self.assertLess(latency_ms, BUDGETS['cancel_latency_ms'])
+
+
+class TestLayerScaling(unittest.TestCase):
+    """Бюджеты очереди, журнала, синхронизации и списка задач"""
+
+    def test_scheduler_throughput(self):
+        """Тест: очередь ставит и выполняет тысячи задач в секунду"""
+        count = 5000
+        scheduler = JobScheduler(ServiceSlots(), max_workers=4, keep_finished=count)
+        done = threading.Semaphore(0)
+
+        def runner(job):
+            done.release()
+
+        def run_all():
+            for index in range(count):
+                scheduler.submit(Job(f'https://example.com/{index}', 'svc'), runner)
+            for _ in range(count):
+                self.assertTrue(done.acquire(timeout=30))
+
+        _, elapsed, _ = measure(run_all)
+        self.assertGreater(count / elapsed, BUDGETS['scheduler_jobs_per_s'])
+        self.assertTrue(wait_until(lambda: scheduler.queued_count() == 0
+                                   and not scheduler.running_jobs()))
+
+    def test_journal_throughput(self):
+        """Тест: журнал выдерживает пачку фоновых задач (например, из папки входящих)"""
+        count = 1000
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = JobJournal(os.path.join(tmp, 'jobs.json'))
+            jobs = [Job(f'https://www.youtube.com/playlist?list=PL{index}', 'youtube',
+                        priority='bulk') for index in range(count)]
+
+            def churn():
+                for job in jobs:
+                    journal.add(job)
+                for job in jobs:
+                    journal.remove(job.id)
+
+            _, elapsed, _ = measure(churn)
+            self.assertEqual(journal.load(), {})
+        self.assertGreater(2 * count / elapsed, BUDGETS['journal_ops_per_s'])
+
+    def test_sync_scan(self):
+        """Тест: обход плейлиста при синхронизации — в потоке, без накопления элементов"""
+        known = {f'youtube v{index}' for index in range(ENTRIES)}
+        entries = ({'id': f'v{index}', 'ie_key': 'Youtube'} for index in range(ENTRIES))
+
+        (new, scanned), elapsed, peak_mb = measure(
+            lambda: select_new_entries(entries, known, stop_after_known=ENTRIES))
+        self.assertEqual((new, scanned), ([], ENTRIES))
+        self.assertGreater(ENTRIES / elapsed, BUDGETS['sync_entries_per_s'])
+        self.assertLess(peak_mb, 1)
+
+    def test_history_search(self):
+        """Тест: поиск и страницы истории быстрые на ENTRIES записях"""
+        words = ('cat', 'dog', 'music', 'lecture', 'rust', 'python', 'live', 'remix',
+                 'tutorial', 'vlog')
+        with tempfile.TemporaryDirectory() as tmp:
+            store = HistoryStore(os.path.join(tmp, 'history.sqlite3'))
+            store.record_many({'service': 'tiktok' if index % 3 == 0 else 'youtube',
+                               'url': f'https://youtu.be/{index}',
+                               'title': f'{words[index % 10]} video {index} {words[index * 7 % 10]}',
+                               'channel': f'Channel {index % 500}',
+                               'size': index % 1000 * 1024 * 1024,
+                               'downloaded': 1.7e9 + index * 60}
+                              for index in range(ENTRIES))
+            middle = 1.7e9 + ENTRIES * 30
+            deep = store.search(limit=100)
+            for _ in range(min(ENTRIES // 200, 500)):
+                deep = store.search(limit=100, cursor=deep.cursor)
+            queries = [
+                {},
+                {'text': 'music'},
+                {'text': 'music', 'cursor': deep.cursor},
+                {'text': 'vid', 'channel': 'Channel 42'},
+                {'service': 'tiktok', 'date_from': middle, 'date_to': middle + 86400},
+                {'min_size': 900 * 1024 * 1024},
+            ]
+            for query in queries:
+                started = time.perf_counter()
+                page = store.search(limit=100, **query)
+                if 'cursor' not in query:
+                    store.count(**query)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.assertTrue(page.rows, query)
+                self.assertLess(elapsed_ms, BUDGETS['history_search_ms'], query)
+            store.close()
+
+    def test_dir_index(self):
+        """Тест: папка просматривается один раз, проверки не зависят от числа файлов"""
+        files = min(ENTRIES // 5, 20000)
+        template = '%(playlist)s/%(title)s [%(id)s].%(ext)s'
+        with tempfile.TemporaryDirectory() as tmp:
+            for index in range(files):
+                folder = os.path.join(tmp, f'list {index % 100}')
+                if index < 100:
+                    os.mkdir(folder)
+                open(os.path.join(folder, f'video {index} [id{index:09d}].mp4'), 'wb').close()
+            index = DirectoryIndex()
+            started = time.perf_counter()
+            index.configure(tmp, template, background=False)
+            scan_seconds = time.perf_counter() - started
+            self.assertEqual(len(index), files)
+            self.assertGreater(files / scan_seconds, BUDGETS['dir_index_files_per_s'])
+
+            lookups = 20000
+            started = time.perf_counter()
+            found = sum(index.find_id(f'id{number * 7 % (2 * files):09d}') is not None
+                        for number in range(lookups))
+            elapsed_us = (time.perf_counter() - started) / lookups * 1e6
+            self.assertGreater(found, 0)
+            self.assertLess(elapsed_us, BUDGETS['dir_index_lookup_us'])
+
+    def test_dashboard_refresh(self):
+        """Тест: строки списка задач считаются только для видимого окна"""
+        # Планировщик хранит не больше keep_finished завершённых задач, поэтому
+        # в списке реально десятки тысяч задач, а не размер плейлиста
+        jobs = [Job(f'https://example.com/{index}', 'youtube') for index in range(20000)]
+        rows = RowWindow(visible=40)
+        rows.set_total(len(jobs))
+        rows.moveto(0.5)
+
+        started = time.perf_counter()
+        repeats = 100
+        for _ in range(repeats):
+            values = [format_job_row(rows.offset + slot + 1, job)
+                      for slot, job in enumerate(rows.slice(jobs))]
+        refresh_ms = (time.perf_counter() - started) / repeats * 1000
+        self.assertEqual(len(values), 40)
+        self.assertLess(refresh_ms, BUDGETS['dashboard_refresh_ms'])
+
+    def test_dashboard_expanded_playlist(self):
+        """Тест: элементы раскрытого плейлиста читаются с диска только для видимого окна"""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = EntryStore(tmp)
+            playlist = Job('https://example.com/playlist', 'youtube', {'playlist': True})
+            jobs = [Job(f'https://example.com/{index}', 'youtube') for index in range(100)]
+            jobs.insert(50, playlist)
+            with store.open_table(playlist.id) as table:
+                for index in range(1, ENTRIES + 1):
+                    table.add(EntryRecord(index, f'v{index}', ENTRY_OK, f'/d/v{index}.mp4', 1024))
+            reader = store.reader(playlist.id)
+            reader.refresh()
+            rows = RowWindow(visible=40)
+            rows.set_total(len(jobs) + len(reader))
+            rows.moveto(0.5)
+
+            started = time.perf_counter()
+            repeats = 100
+            for _ in range(repeats):
+                reader.refresh()
+                values = [format_entry_row(record) if record else format_job_row(number, job)
+                          for number, job, record in visible_rows(jobs, playlist, reader,
+                                                                  rows.offset, rows.visible)]
+            refresh_ms = (time.perf_counter() - started) / repeats * 1000
+        self.assertEqual(len(values), 40)
+        self.assertLess(refresh_ms, BUDGETS['dashboard_entries_refresh_ms'])
+
+    @unittest.skipIf(resource is None, "модуль resource недоступен")
+    def test_peak_rss(self):
+        """Тест: пиковый RSS процесса в пределах бюджета"""
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux — КБ, macOS — байты
+        peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+        self.assertLess(peak_mb, BUDGETS['peak_rss_mb'])
+
+
+def run_tests():
+    """Запуск тестов масштабирования"""
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    suite.addTests(loader.loadTestsFromTestCase(TestProgressScaling))
+    suite.addTests(loader.loadTestsFromTestCase(TestLayerScaling))
+    result = unittest.TextTestRunner(verbosity=2).run(suite)
+    return result.wasSuccessful()
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)